@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:59
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.content_storage, upload_to='avatars/%Y/%m/', verbose_name='الصورة الشخصية'),
+        ),
+    ]
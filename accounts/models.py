@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.storage import content_storage
+
 
 class User(AbstractUser):
     """
@@ -55,6 +57,7 @@ class User(AbstractUser):
     # الصورة الشخصية
     avatar = models.ImageField(
         upload_to='avatars/%Y/%m/',
+        storage=content_storage,
         blank=True,
         null=True,
         verbose_name='الصورة الشخصية'
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import MediaBlob
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('name', 'sha256')
+    # Maintained by core/storage.py; recount with convert_media_storage
+    readonly_fields = [f.name for f in MediaBlob._meta.fields]
@@ -1,5 +1,20 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .storage import blob_fields, blobs_post_delete, blobs_pre_save, remember_blobs
+
+        # Blob reference counting for every model with a content-addressed file field
+        for model in apps.get_models():
+            if not blob_fields(model):
+                continue
+            label = model._meta.label_lower
+            post_init.connect(remember_blobs, sender=model, dispatch_uid=f'blobs_init_{label}')
+            pre_save.connect(blobs_pre_save, sender=model, dispatch_uid=f'blobs_pre_save_{label}')
+            post_save.connect(remember_blobs, sender=model, dispatch_uid=f'blobs_saved_{label}')
+            post_delete.connect(blobs_post_delete, sender=model, dispatch_uid=f'blobs_deleted_{label}')
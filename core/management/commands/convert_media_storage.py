@@ -0,0 +1,117 @@
+"""
+Management command to move media files into content-addressed storage.
+Usage: python manage.py convert_media_storage [--dry-run] [--keep-originals] [--prune]
+
+Every file field stored with core/storage.py (question recordings, avatars)
+is scanned. Files saved under their old upload_to names are stored once
+per content under cas/, the rows are pointed at the blobs, and the old
+files are deleted. Then the reference count of every blob is recounted
+from the rows. Safe to run again, e.g. after restoring an old backup.
+"""
+
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from core.models import MediaBlob
+from core.storage import PREFIX, blob_fields, content_storage, is_blob
+
+
+def _blob_fields():
+    """(model, field name) of every file field stored in content-addressed storage."""
+    return [(model, field) for model in apps.get_models() for field in blob_fields(model)]
+
+
+def _legacy_rows(model, field):
+    return (
+        model._default_manager.exclude(**{f'{field}__isnull': True})
+        .exclude(**{field: ''})
+        .exclude(**{f'{field}__startswith': f'{PREFIX}/'})
+        .values_list('pk', field)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Store media files once per content (cas/) and recount blob references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be converted without changing anything',
+        )
+        parser.add_argument(
+            '--keep-originals',
+            action='store_true',
+            help='Leave the old files in place after converting them',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete blobs that no row references',
+        )
+
+    def handle(self, *args, **options):
+        storage = content_storage()
+        legacy = FileSystemStorage(location=storage.location)
+        fields = _blob_fields()
+
+        if options['dry_run']:
+            for model, field in fields:
+                count = _legacy_rows(model, field).count()
+                self.stdout.write(f'  {model._meta.label}.{field}: {count} files to convert')
+            return
+
+        converted = {}
+        missing = rows = 0
+        for model, field in fields:
+            for pk, old in _legacy_rows(model, field).iterator():
+                new = converted.get(old)
+                if new is None:
+                    if not legacy.exists(old):
+                        self.stdout.write(self.style.WARNING(f'  Missing: {old} ({model._meta.label} {pk})'))
+                        missing += 1
+                        continue
+                    with legacy.open(old, 'rb') as content:
+                        new = storage.save(old, content)
+                    converted[old] = new
+                # .update(): the file name is all that changes
+                model._default_manager.filter(pk=pk).update(**{field: new})
+                rows += 1
+
+        if not options['keep_originals']:
+            for old in converted:
+                legacy.delete(old)
+
+        blobs, pruned = self._recount(storage, fields, options['prune'])
+        self.stdout.write(self.style.SUCCESS(
+            f'  Converted {len(converted)} files for {rows} rows into {len(set(converted.values()))} blobs '
+            f'({missing} missing); {blobs} blobs referenced, {pruned} pruned'
+        ))
+
+    def _recount(self, storage, fields, prune):
+        references = Counter()
+        for model, field in fields:
+            names = model._default_manager.filter(**{f'{field}__startswith': f'{PREFIX}/'})
+            references.update(names.values_list(field, flat=True).iterator())
+
+        pruned = 0
+        for blob in MediaBlob.objects.iterator():
+            count = references.pop(blob.name, 0)
+            if count == 0 and prune:
+                # Down to the last reference, which delete() drops with the file
+                MediaBlob.objects.filter(name=blob.name).update(refcount=1)
+                storage.delete(blob.name)
+                pruned += 1
+            elif count != blob.refcount:
+                MediaBlob.objects.filter(name=blob.name).update(refcount=count)
+
+        # Referenced blobs whose row was lost (e.g. files restored from a backup)
+        for name, count in references.items():
+            if is_blob(name) and storage.exists(name):
+                sha256 = os.path.splitext(os.path.basename(name))[0]
+                MediaBlob.objects.create(name=name, sha256=sha256, size=storage.size(name), refcount=count)
+        return MediaBlob.objects.filter(refcount__gt=0).count(), pruned
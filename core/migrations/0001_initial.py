@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='المسار')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='بصمة SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='الحجم (بايت)')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='عدد المراجع')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'ملف وسائط',
+                'verbose_name_plural': 'ملفات الوسائط',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """ملف وسائط مخزَّن مرة واحدة باسم مشتق من محتواه (انظر core/storage.py)"""
+    name = models.CharField(max_length=100, primary_key=True, verbose_name='المسار')
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name='بصمة SHA-256')
+    size = models.PositiveBigIntegerField(verbose_name='الحجم (بايت)')
+    # Number of stored references (file fields) to this blob
+    refcount = models.PositiveIntegerField(default=0, verbose_name='عدد المراجع')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+
+    class Meta:
+        verbose_name = 'ملف وسائط'
+        verbose_name_plural = 'ملفات الوسائط'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,223 @@
+"""
+Content-addressed media storage.
+
+Uploaded recordings and avatars are stored once per distinct content. While
+a file is saved its bytes are streamed into a temporary file and hashed in
+the same pass; the file is then stored as
+
+    cas/<h[0:2]>/<h[2:4]>/<sha256><.ext>
+
+(the extension of the uploaded name is kept for MIME types). Saving bytes
+that are already stored only adds a reference. A name always holds the
+same bytes, so its URL can be cached forever: in development
+taibah_voice/urls.py serves cas/ with `Cache-Control: immutable`, and the
+production web server should do the same for MEDIA_URL + 'cas/'.
+
+Each blob has a MediaBlob row counting the file fields that reference it.
+`delete()` drops one reference and removes the file with the last one, so
+deleting one user's upload never breaks another's. Saving and deleting
+hold the MediaBlob row's lock while they touch the file, so the last
+reference going away cannot race a new save of the same content; a blob
+without a row is never deleted. The receivers below (connected in
+core/apps.py for every model with a field in this storage) drop the
+reference of a row that is deleted, or whose file is replaced, once the
+transaction commits. Only saving a file adds a reference, so
+code that copies a stored name onto another row must hand the reference
+over: archive.py copies an Inquiry into ArchivedInquiry and raw-deletes
+it, and the archived row releases it on deletion.
+
+Files derived from a blob (e.g. the normalized recording of
+service/normalization.py) are stored beside it as `<sha256>.<tag>.<ext>`
+with a plain FileSystemStorage, and are removed when no blob with that
+hash is left. `manage.py convert_media_storage` moves files saved before
+this storage into it, and recounts the references of every blob.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from functools import partial
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F, FileField
+
+PREFIX = 'cas'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_EXTENSION = re.compile(r'^\.[a-z0-9]{1,8}$')
+
+
+def blob_name(sha256, extension=''):
+    return f'{PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{PREFIX}/')
+
+
+def derived_name(name, tag, extension):
+    """Name of a file derived from blob `name`, e.g. ('16k', '.wav') -> <sha256>.16k.wav."""
+    return f'{os.path.splitext(name)[0]}.{tag}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Replaced by the content-derived name in _save(); identical
+        # content is meant to end up under the same name
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if not _EXTENSION.match(extension):
+            extension = ''
+
+        incoming = os.path.join(self.location, PREFIX, 'incoming')
+        os.makedirs(incoming, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            name = blob_name(digest.hexdigest(), extension)
+            self._store(name, temp_path, digest.hexdigest(), size)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        return name
+
+    def _store(self, name, temp_path, sha256, size):
+        """
+        Count one reference to `name`, moving the upload into place if the
+        file is missing. Both happen under the MediaBlob row's lock, so a
+        concurrent delete of the last reference cannot unlink the file in
+        between.
+        """
+        from .models import MediaBlob
+
+        path = self.path(name)
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+                    if blob is None:
+                        MediaBlob.objects.create(name=name, sha256=sha256, size=size, refcount=1)
+                    else:
+                        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                        os.replace(temp_path, path)
+                return
+            except IntegrityError:
+                # Created concurrently by another save; count on its row
+                if attempt == 2:
+                    raise
+
+    def delete(self, name):
+        """Drop one reference to `name`; the file goes with the last one."""
+        if not is_blob(name):
+            return super().delete(name)
+
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            # Saves of the same content wait on this lock until the file is gone
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Not counted (stored before convert_media_storage recounted):
+                # whether anything else uses the file is unknown, so keep it
+                return
+            if blob.refcount > 1:
+                MediaBlob.objects.filter(name=name).update(refcount=F('refcount') - 1)
+                return
+            if not MediaBlob.objects.filter(name=name, refcount__lte=1).delete()[0]:
+                return
+            super().delete(name)
+            sha256 = os.path.basename(os.path.splitext(name)[0])
+            if not MediaBlob.objects.filter(sha256=sha256).exists():
+                self._delete_derived(name)
+
+    def _delete_derived(self, name):
+        directory, stem = os.path.split(self.path(os.path.splitext(name)[0]))
+        try:
+            entries = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            # <sha256>.<tag>.<ext>; blobs themselves have one extension at most
+            if entry.startswith(f'{stem}.') and entry.count('.') >= 2:
+                try:
+                    os.unlink(os.path.join(directory, entry))
+                except FileNotFoundError:
+                    pass
+
+
+_storage = None
+
+
+def content_storage():
+    """The shared ContentAddressedStorage (callable for FileField(storage=...))."""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def blob_fields(model):
+    """Names of the file fields of `model` stored in content-addressed storage."""
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+# --------------------------------------------------
+# Signal receivers (connected in apps.py)
+# --------------------------------------------------
+
+def _release_on_commit(storage, name):
+    # A rolled-back change keeps its reference
+    transaction.on_commit(partial(storage.delete, name))
+
+
+def remember_blobs(sender, instance, **kwargs):
+    """post_init / post_save: the blob names the row holds in the database."""
+    instance._stored_blobs = {
+        name: value if isinstance(value, str) else value.name
+        for name in blob_fields(sender)
+        if (value := instance.__dict__.get(name)) is not None
+    }
+
+
+def blobs_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Release the blob a field held before its file was replaced."""
+    if raw or instance._state.adding:
+        return
+    stored = getattr(instance, '_stored_blobs', {})
+    for name in blob_fields(sender):
+        if name not in instance.__dict__ or (update_fields is not None and name not in update_fields):
+            continue
+        file = getattr(instance, name)
+        if name in stored:
+            old = stored[name]
+        else:
+            # Loaded after the instance was created (deferred field)
+            old = sender._base_manager.filter(pk=instance.pk).values_list(name, flat=True).first()
+        if (file.name or '') == (old or ''):
+            continue
+        if old:
+            _release_on_commit(file.storage, old)
+
+
+def blobs_post_delete(sender, instance, **kwargs):
+    for name in blob_fields(sender):
+        file = getattr(instance, name)
+        if file:
+            _release_on_commit(file.storage, file.name)
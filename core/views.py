@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
+
+from .storage import IMMUTABLE_CACHE_CONTROL
 
 def home(request):
     return render(request, 'core/home.html')
@@ -11,3 +15,9 @@ def services(request):
 
 def contact(request):
     return render(request, 'core/contact.html')
+
+def media_blob(request, path):
+    """Content-addressed media (development server only); a name never changes content."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
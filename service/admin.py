@@ -1,6 +1,18 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
 
-from .models import GlossaryCategory, GlossaryTerm, Inquiry
+from . import bulk
+from .models import (
+    AnswerDigest,
+    ArchivedInquiry,
+    AudioUpload,
+    GlossaryCategory,
+    GlossaryTerm,
+    Inquiry,
+    InquiryClaim,
+    InquiryCounter,
+    TranscriptionJob,
+)
 
 
 @admin.register(GlossaryCategory)
@@ -16,8 +28,74 @@ class InquiryAdmin(admin.ModelAdmin):
     list_display = ('title', 'status', 'priority', 'created_by', 'created_at')
     list_filter = ('status', 'priority', 'created_at')
     search_fields = ('title', 'question_text', 'transcription_text', 'answer_text')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = (
+        'created_at', 'updated_at', 'audio_format', 'audio_codec', 'audio_duration', 'audio_sha256',
+    )
+    date_hierarchy = 'created_at'
+    actions = ['close_inquiries']
+
+    # Bulk actions run as single UPDATEs that keep counters, events and
+    # caches in step (see bulk.py)
+
+    def _report(self, request, results):
+        counts = bulk.summary(results)
+        self.message_user(
+            request,
+            f'تم تحديث {counts.get(bulk.UPDATED, 0)} استفسار، '
+            f'ولم يتغير {counts.get(bulk.UNCHANGED, 0)}، وتم تخطي {counts.get(bulk.SKIPPED, 0)}.',
+        )
+
+    @admin.action(description='إغلاق الاستفسارات المحددة')
+    def close_inquiries(self, request, queryset):
+        self._report(request, bulk.close(queryset))
+
+    def _status_action(self, status, label):
+        def action(modeladmin, request, queryset):
+            modeladmin._report(request, bulk.set_status(queryset, status))
+        return action, f'set_status_{status}', f'تغيير الحالة إلى: {label}'
+
+    def _priority_action(self, priority, label):
+        def action(modeladmin, request, queryset):
+            modeladmin._report(request, bulk.set_priority(queryset, priority))
+        return action, f'set_priority_{priority}', f'تغيير الأولوية إلى: {label}'
+
+    def _reassign_action(self, librarian):
+        def action(modeladmin, request, queryset):
+            modeladmin._report(request, bulk.reassign(queryset, librarian, assigned_by=request.user))
+        return action, f'reassign_{librarian.pk}', f'إسناد إلى: {librarian.get_display_name()}'
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if not self.has_change_permission(request):
+            return actions
+        generated = [self._status_action(status, label) for status, label in Inquiry.Status.choices]
+        generated += [self._priority_action(priority, label) for priority, label in Inquiry.Priority.choices]
+        User = get_user_model()
+        librarians = User.objects.filter(role=User.Role.LIBRARIAN, is_active=True).order_by('username')
+        generated += [self._reassign_action(librarian) for librarian in librarians]
+        actions.update((name, (func, name, description)) for func, name, description in generated)
+        return actions
+
+
+@admin.register(ArchivedInquiry)
+class ArchivedInquiryAdmin(admin.ModelAdmin):
+    list_display = ('title', 'status', 'priority', 'created_by', 'created_at', 'archived_at')
+    list_filter = ('priority', 'archived_at')
+    search_fields = ('title',)
     date_hierarchy = 'created_at'
+    # Written only by service/archive.py
+    readonly_fields = [f.name for f in ArchivedInquiry._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TranscriptionJob)
+class TranscriptionJobAdmin(admin.ModelAdmin):
+    list_display = ('inquiry', 'status', 'attempts', 'engine', 'confidence', 'next_attempt_at')
+    list_filter = ('status', 'engine')
+    search_fields = ('inquiry__title', 'last_error')
+    readonly_fields = ('created_at', 'updated_at')
 
 
 @admin.register(GlossaryTerm)
@@ -26,3 +104,35 @@ class GlossaryTermAdmin(admin.ModelAdmin):
     list_filter = ('category', 'created_at')
     search_fields = ('term', 'definition')
     readonly_fields = ('created_at', 'updated_at', 'view_count', 'tts_play_count')
+
+
+@admin.register(AnswerDigest)
+class AnswerDigestAdmin(admin.ModelAdmin):
+    list_display = ('user', 'inquiry_count', 'created_at')
+    search_fields = ('user__username', 'user__full_name_ar')
+    readonly_fields = ('created_at',)
+    filter_horizontal = ('inquiries',)
+
+
+@admin.register(AudioUpload)
+class AudioUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'offset', 'length', 'completed_at', 'expires_at')
+    list_filter = ('completed_at',)
+    search_fields = ('filename', 'user__username')
+    readonly_fields = ('id', 'sha256', 'created_at')
+
+
+@admin.register(InquiryCounter)
+class InquiryCounterAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'total', 'new', 'transcribed', 'in_progress', 'answered', 'closed',
+                    'unread', 'answers', 'updated_at')
+    search_fields = ('scope', 'user__username')
+    # Maintained by service/counters.py; fix drift with reconcile_inquiry_counters
+    readonly_fields = [f.name for f in InquiryCounter._meta.fields]
+
+
+@admin.register(InquiryClaim)
+class InquiryClaimAdmin(admin.ModelAdmin):
+    list_display = ('inquiry', 'claimed_by', 'assigned_by', 'claimed_at', 'expires_at')
+    list_filter = ('claimed_by',)
+    search_fields = ('inquiry__title',)
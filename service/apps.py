@@ -1,7 +1,32 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 
 
 class ServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'service'
     verbose_name = 'خدمات المكتبة'
+
+    def ready(self):
+        from . import counters, events, search, work_queue
+        from .models import ArchivedInquiry, Inquiry
+        from .stats import inquiry_changed
+
+        # Counters first, so the stats cache is invalidated after they moved.
+        # The event feed diffs against the state counters read in pre_save,
+        # so it goes before the counters' post_save replaces it.
+        pre_save.connect(counters.inquiry_pre_save, sender=Inquiry, dispatch_uid='counters_pre_save')
+        post_save.connect(events.inquiry_saved, sender=Inquiry, dispatch_uid='events_inquiry_saved')
+        post_save.connect(counters.inquiry_post_save, sender=Inquiry, dispatch_uid='counters_post_save')
+        pre_delete.connect(counters.inquiry_pre_delete, sender=Inquiry, dispatch_uid='counters_pre_delete')
+        post_delete.connect(counters.inquiry_post_delete, sender=Inquiry, dispatch_uid='counters_post_delete')
+
+        post_save.connect(inquiry_changed, sender=Inquiry, dispatch_uid='stats_inquiry_saved')
+        post_delete.connect(inquiry_changed, sender=Inquiry, dispatch_uid='stats_inquiry_deleted')
+
+        post_save.connect(search.inquiry_saved, sender=Inquiry, dispatch_uid='search_inquiry_saved')
+        post_delete.connect(search.inquiry_deleted, sender=Inquiry, dispatch_uid='search_inquiry_deleted')
+        # Archived inquiries keep their search row until they are deleted too
+        post_delete.connect(search.inquiry_deleted, sender=ArchivedInquiry, dispatch_uid='search_archived_deleted')
+
+        post_save.connect(work_queue.inquiry_saved, sender=Inquiry, dispatch_uid='work_queue_inquiry_saved')
@@ -0,0 +1,57 @@
+"""
+Arabic text normalization.
+
+Folds the spelling variants that speech recognisers and users mix freely
+(diacritics, tatweel, alef/yaa/taa-marbuta forms, Arabic-Indic digits,
+punctuation) so that texts can be compared or indexed word by word.
+"""
+
+import re
+
+_DIACRITICS = re.compile('[ؐ-ًؚ-ٰٟۖ-ۭ]')
+_TATWEEL = 'ـ'
+_PUNCTUATION = re.compile(r'[^\w\s]|_')
+_SPACES = re.compile(r'\s+')
+
+_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    **{chr(0x0660 + d): str(d) for d in range(10)},   # Arabic-Indic digits
+    **{chr(0x06F0 + d): str(d) for d in range(10)},   # Extended (Persian) digits
+})
+
+
+def normalize_arabic(text):
+    """
+    Return `text` folded for comparison: no diacritics or tatweel, unified
+    alef/yaa/taa-marbuta/hamza carriers, ASCII digits, no punctuation,
+    lower-case Latin and single spaces.
+    """
+    text = _DIACRITICS.sub('', text).replace(_TATWEEL, '')
+    text = text.translate(_FOLD).lower()
+    text = _PUNCTUATION.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def tokenize(text):
+    """Normalized words of `text`."""
+    normalized = normalize_arabic(text)
+    return normalized.split(' ') if normalized else []
+
+
+# A word as written: letters and digits with any diacritics or tatweel
+_WORD = re.compile(rf'(?:[^\W_]|{_DIACRITICS.pattern}|{_TATWEEL})+')
+
+
+def word_spans(text):
+    """
+    (start, end, normalized word) for each word of `text`, so that words
+    matched in normalized form can be shown as originally written.
+    """
+    for match in _WORD.finditer(text):
+        word = normalize_arabic(match.group())
+        if word:
+            yield match.start(), match.end(), word
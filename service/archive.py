@@ -0,0 +1,96 @@
+"""
+Archive tier for closed inquiries.
+
+Closed inquiries are history: the dashboard, statistics and work queue
+never need them again, yet they would make up most of service_inquiry.
+`archive()` moves those closed for longer than ARCHIVE_AFTER_DAYS (counted
+from both creation and last change) into ArchivedInquiry, in batches of
+ARCHIVE_BATCH_SIZE, each its own transaction. Run it periodically with
+`manage.py archive_inquiries`.
+
+An archived row keeps the inquiry's id and takes over its question_audio
+reference (the blob's reference count is unchanged, see core/storage.py);
+the audio file itself does not move, and deleting the archived row
+releases it. Because the id is kept, the inquiry's
+row in the full-text search table (see search.py) stays and serves the
+archive view, and old links to the inquiry redirect there.
+
+The hot rows are removed without the delete signals (which would drop the
+search row and update counters one row at a time). Their work is done for
+the batch: counters.apply_many() takes the inquiries out of the active
+figures, and the owners' cached statistics are invalidated. Transcription
+jobs, claims and digest links of archived inquiries are deleted.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, stats
+from .models import AnswerDigest, ArchivedInquiry, Inquiry, InquiryClaim, TranscriptionJob
+
+AFTER_DAYS = getattr(settings, 'ARCHIVE_AFTER_DAYS', 180)
+BATCH_SIZE = getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+
+# Columns copied from Inquiry (by attname, e.g. created_by_id)
+COPIED_FIELDS = tuple(
+    field.attname for field in ArchivedInquiry._meta.concrete_fields if field.name != 'archived_at'
+)
+
+
+def cutoff(days=None):
+    return timezone.now() - timedelta(days=AFTER_DAYS if days is None else days)
+
+
+def candidates(before):
+    """Closed inquiries created and last changed before `before`, oldest first."""
+    return Inquiry.objects.filter(
+        status=Inquiry.Status.CLOSED, created_at__lt=before, updated_at__lt=before,
+    ).order_by('created_at', 'pk')
+
+
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """Move up to `batch_size` candidates into the archive. Returns the number moved."""
+    with transaction.atomic():
+        rows = candidates(before)
+        if connection.features.has_select_for_update_skip_locked:
+            rows = rows.select_for_update(skip_locked=True)
+        rows = list(rows.values(*COPIED_FIELDS, 'is_read_by_user')[:batch_size])
+        if not rows:
+            return 0
+        pks = [row['id'] for row in rows]
+        now = timezone.now()
+
+        ArchivedInquiry.objects.bulk_create([
+            ArchivedInquiry(archived_at=now, **{name: row[name] for name in COPIED_FIELDS})
+            for row in rows
+        ])
+        TranscriptionJob.objects.filter(inquiry_id__in=pks).delete()
+        InquiryClaim.objects.filter(inquiry_id__in=pks).delete()
+        AnswerDigest.inquiries.through.objects.filter(inquiry_id__in=pks).delete()
+        # Bypasses the delete signals; their work for the batch follows
+        Inquiry.objects.filter(pk__in=pks)._raw_delete(Inquiry.objects.db)
+        counters.apply_many([
+            ({name: row[name] for name in counters.STATE_FIELDS}, None) for row in rows
+        ])
+
+    stats.invalidate(*{row['created_by_id'] for row in rows})
+    return len(rows)
+
+
+def archive(days=None, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Archive every inquiry closed for longer than `days` (ARCHIVE_AFTER_DAYS
+    by default). Returns the number archived.
+    """
+    before = cutoff(days)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
@@ -0,0 +1,651 @@
+"""
+Audio helpers shared by the TTS and STT services.
+
+Container parsing uses only the standard library. Voice-activity detection
+and normalization need NumPy. Ogg Opus (what the recorder in inquiry_new
+uploads) is decoded in-process when opuslib and libopus are installed;
+other compressed formats (webm, m4a, mp3, ...) go through the ffmpeg binary.
+
+Nothing in this module imports Django, so its functions can run in a
+worker process.
+"""
+
+import hashlib
+import io
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import opuslib
+except Exception:  # pragma: no cover - optional dependency (also needs libopus)
+    opuslib = None
+
+TARGET_SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload cannot be decoded to PCM."""
+
+
+# Layer III bitrates in kbps, indexed by the 4-bit bitrate field
+_MPEG1_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MPEG2_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+# Sample rates indexed by the 2-bit version field (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+_MPEG_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+
+def _id3_size(data):
+    """Length of a leading ID3v2 tag, or 0 if there is none."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (
+        ((data[6] & 0x7F) << 21)
+        | ((data[7] & 0x7F) << 14)
+        | ((data[8] & 0x7F) << 7)
+        | (data[9] & 0x7F)
+    )
+    return 10 + size
+
+
+def strip_id3(data):
+    """Return MP3 data without its leading ID3v2 tag, ready for concatenation."""
+    return data[_id3_size(data):]
+
+
+def _mp3_frame(b1, b2, b3):
+    """(seconds, length in bytes) of the Layer III frame whose header starts b1 b2 b3, or None."""
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+
+    version = (b2 >> 3) & 3
+    layer = (b2 >> 1) & 3
+    bitrate_idx = b3 >> 4
+    rate_idx = (b3 >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = (_MPEG1_BITRATES if mpeg1 else _MPEG2_BITRATES)[bitrate_idx] * 1000
+    sample_rate = _MPEG_SAMPLE_RATES[version][rate_idx]
+    samples = 1152 if mpeg1 else 576
+    padding = (b3 >> 1) & 1
+    return samples / sample_rate, samples // 8 * bitrate // sample_rate + padding
+
+
+def mp3_duration(data):
+    """Return the playing time in seconds of an MPEG Layer III stream."""
+    pos = _id3_size(data)
+    n = len(data)
+    seconds = 0.0
+
+    while pos + 4 <= n:
+        frame = _mp3_frame(data[pos], data[pos + 1], data[pos + 2])
+        if frame is None:
+            pos += 1
+            continue
+        seconds += frame[0]
+        pos += frame[1]
+
+    return seconds
+
+
+def wav_duration(data):
+    """Return the playing time in seconds of a RIFF/WAVE file."""
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        rate = wav.getframerate()
+        return wav.getnframes() / rate if rate else 0.0
+
+
+def audio_duration(data):
+    """
+    Return the duration in seconds of WAV or MP3 audio.
+
+    Args:
+        data: Raw file contents.
+
+    Returns:
+        Duration in seconds, or 0.0 if the format is not recognised.
+    """
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        try:
+            return wav_duration(data)
+        except (wave.Error, EOFError):
+            return 0.0
+    return mp3_duration(data)
+
+
+# --------------------------------------------------
+# Voice-activity detection
+# --------------------------------------------------
+
+def vad_available():
+    return np is not None
+
+
+def _frame_energy(samples, frame_len):
+    """RMS energy of consecutive, non-overlapping frames."""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def _voiced_frames(energy):
+    """Boolean mask of frames louder than an adaptive noise threshold."""
+    if not len(energy):
+        return np.zeros(0, dtype=bool)
+    noise, peak = np.percentile(energy, [5, 95])
+    threshold = max(noise + 0.1 * (peak - noise), 50.0)
+    return energy > threshold
+
+
+def _silent_runs(voiced):
+    """(start, end) frame indexes of each run of unvoiced frames."""
+    edges = np.diff(np.concatenate(([1], voiced.astype(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def speech_segments(pcm, sample_rate, frame_ms=30, min_silence_ms=500,
+                    max_segment_s=25.0, padding_ms=200):
+    """
+    Split 16-bit mono PCM on silence.
+
+    Leading and trailing silence is dropped, pauses of at least
+    `min_silence_ms` become segment boundaries, and segments longer than
+    `max_segment_s` are cut at their quietest frame.
+
+    Args:
+        pcm: Little-endian signed 16-bit samples (bytes or memoryview).
+        sample_rate: Samples per second.
+
+    Returns:
+        List of (start_sample, end_sample) tuples, in order.
+    """
+    samples = np.frombuffer(pcm, dtype='<i2')
+    frame_len = max(sample_rate * frame_ms // 1000, 1)
+    energy = _frame_energy(samples, frame_len)
+    voiced = _voiced_frames(energy)
+    if not voiced.any():
+        return []
+
+    pad = padding_ms // frame_ms
+    min_silence = max(min_silence_ms // frame_ms, 1)
+    max_frames = max(int(max_segment_s * 1000 // frame_ms), 1)
+
+    # Segment boundaries from long internal pauses
+    first = int(np.argmax(voiced))
+    last = len(voiced) - int(np.argmax(voiced[::-1]))
+    bounds = []
+    start = max(first - pad, 0)
+    for run_start, run_end in _silent_runs(voiced):
+        if run_start <= first or run_end >= last or run_end - run_start < min_silence:
+            continue
+        bounds.append((start, run_start + pad))
+        start = run_end - pad
+    bounds.append((start, min(last + pad, len(voiced))))
+
+    # Cut over-long segments at their quietest frame
+    segments = []
+    for seg_start, seg_end in bounds:
+        while seg_end - seg_start > max_frames:
+            window = energy[seg_start + max_frames // 2:seg_start + max_frames]
+            cut = seg_start + max_frames // 2 + int(np.argmin(window))
+            segments.append((seg_start, cut))
+            seg_start = cut
+        segments.append((seg_start, seg_end))
+
+    end_sample = len(samples)
+    return [
+        (a * frame_len, min(b * frame_len, end_sample))
+        for a, b in segments
+        if b > a
+    ]
+
+
+# --------------------------------------------------
+# Normalization: any upload -> 16 kHz mono 16-bit PCM
+# --------------------------------------------------
+
+def sniff_format(data):
+    """Guess the container from the first bytes ('wav', 'opus', 'ogg', 'webm', ...)."""
+    head = bytes(data[:64])
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'OggS':
+        return 'opus' if b'OpusHead' in head else 'ogg'
+    if head[:4] == b'\x1aE\xdf\xa3':
+        return 'webm'
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] in (b'FORM',):
+        return 'aiff'
+    if head[:3] == b'ID3' or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+
+def _wav_to_float(data):
+    """Decode PCM WAV to (mono float32 samples, sample_rate)."""
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f'ملف WAV غير صالح: {e}')
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 256
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 65536
+    else:
+        raise AudioDecodeError(f'عمق بت غير مدعوم: {width * 8}')
+
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def _resample(samples, src_rate, dst_rate):
+    if src_rate == dst_rate or not len(samples):
+        return samples
+    if src_rate > dst_rate:
+        # Moving-average low-pass before decimating to limit aliasing
+        width = int(np.ceil(src_rate / dst_rate))
+        if width > 1:
+            samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width, mode='same')
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _ogg_packets(data):
+    """Yield the packets of the first logical stream in an Ogg file."""
+    data = memoryview(data)
+    offset = 0
+    serial = None
+    packet = bytearray()
+    while offset + 27 <= len(data):
+        if data[offset:offset + 4] != b'OggS':
+            raise AudioDecodeError('ملف Ogg تالف')
+        page_serial, = struct.unpack_from('<I', data, offset + 14)
+        n_segments = data[offset + 26]
+        lacing = data[offset + 27:offset + 27 + n_segments]
+        body = offset + 27 + n_segments
+        if serial is None:
+            serial = page_serial
+        for size in lacing:
+            if page_serial == serial:
+                packet += data[body:body + size]
+                if size < 255:
+                    yield bytes(packet)
+                    packet = bytearray()
+            body += size
+        offset = body
+    if packet:
+        yield bytes(packet)
+
+
+def _opus_decode(data):
+    """Decode Ogg Opus to (mono float32 samples, 48000)."""
+    packets = _ogg_packets(data)
+    head = next(packets, b'')
+    if not head.startswith(b'OpusHead') or len(head) < 19:
+        raise AudioDecodeError('ترويسة Opus غير صالحة')
+    channels = head[9]
+    pre_skip, = struct.unpack_from('<H', head, 10)
+    next(packets, None)  # OpusTags
+
+    decoder = opuslib.Decoder(48000, channels)
+    pcm = bytearray()
+    try:
+        for packet in packets:
+            # 120 ms is the longest Opus frame
+            pcm += decoder.decode(packet, 5760)
+    except opuslib.OpusError as e:
+        raise AudioDecodeError(f'تعذر فك ترميز Opus: {e}')
+
+    samples = np.frombuffer(bytes(pcm), dtype='<i2').astype(np.float32)
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples[pre_skip:], 48000
+
+
+def supported_formats(ffmpeg='ffmpeg'):
+    """Formats normalize_audio() can decode with what is installed."""
+    formats = ['wav']
+    if np is not None and opuslib is not None:
+        formats.append('opus')
+    if np is not None and shutil.which(ffmpeg):
+        formats += [f for f in ('opus', 'ogg', 'webm', 'mp4', 'mp3', 'flac', 'aiff')
+                    if f not in formats]
+    return formats if np is not None else []
+
+
+def _ffmpeg_decode(data, fmt, sample_rate, ffmpeg):
+    """Decode with ffmpeg straight to 16-bit mono PCM at `sample_rate`."""
+    args = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin']
+    output = ['-ac', '1', '-ar', str(sample_rate), '-f', 's16le', 'pipe:1']
+
+    if fmt == 'mp4':
+        # MP4/M4A needs a seekable input because the index may sit at the end
+        with tempfile.NamedTemporaryFile(suffix='.m4a') as tmp:
+            tmp.write(data)
+            tmp.flush()
+            proc = subprocess.run(args + ['-i', tmp.name] + output,
+                                  capture_output=True, timeout=120)
+    else:
+        proc = subprocess.run(args + ['-i', 'pipe:0'] + output,
+                              input=bytes(data), capture_output=True, timeout=120)
+
+    if proc.returncode != 0 or not proc.stdout:
+        message = proc.stderr.decode(errors='replace').strip().splitlines()
+        raise AudioDecodeError(message[-1] if message else 'تعذر فك ترميز الملف الصوتي')
+    return proc.stdout
+
+
+def trim_silence(samples, sample_rate, padding_ms=200, frame_ms=30):
+    """Drop leading and trailing silence from float or int16 samples."""
+    frame_len = max(sample_rate * frame_ms // 1000, 1)
+    voiced = _voiced_frames(_frame_energy(samples, frame_len))
+    if not voiced.any():
+        return samples[:0]
+    pad = padding_ms // frame_ms
+    first = max(int(np.argmax(voiced)) - pad, 0)
+    last = len(voiced) - int(np.argmax(voiced[::-1])) + pad
+    return samples[first * frame_len:last * frame_len]
+
+
+def pcm_to_wav(pcm, sample_rate=TARGET_SAMPLE_RATE):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+def normalize_audio(data, sample_rate=TARGET_SAMPLE_RATE, trim=True, ffmpeg='ffmpeg'):
+    """
+    Decode an upload to trimmed 16-bit mono PCM WAV at `sample_rate`.
+
+    WAV (and Ogg Opus, with opuslib) is decoded, downmixed and resampled
+    with NumPy. Every other format goes through ffmpeg. CPU-bound; callers
+    run it in a process pool.
+
+    Returns:
+        (wav_bytes, info) where info has 'format', 'duration' and
+        'original_duration' in seconds.
+
+    Raises:
+        AudioDecodeError: the data cannot be decoded with what is installed.
+    """
+    if np is None:
+        raise AudioDecodeError('NumPy غير مثبت')
+
+    fmt = sniff_format(data)
+    if fmt == 'wav' or (fmt == 'opus' and opuslib is not None):
+        samples, rate = _wav_to_float(data) if fmt == 'wav' else _opus_decode(data)
+        samples = _resample(samples, rate, sample_rate)
+    else:
+        binary = shutil.which(ffmpeg)
+        if binary is None:
+            raise AudioDecodeError(f'صيغة {fmt or "غير معروفة"} تتطلب تثبيت ffmpeg')
+        pcm = _ffmpeg_decode(data, fmt, sample_rate, binary)
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+
+    original_duration = len(samples) / sample_rate
+    if trim:
+        samples = trim_silence(samples, sample_rate)
+
+    pcm = np.clip(np.round(samples), -32768, 32767).astype('<i2').tobytes()
+    return pcm_to_wav(pcm, sample_rate), {
+        'format': fmt,
+        'duration': round(len(samples) / sample_rate, 2),
+        'original_duration': round(original_duration, 2),
+    }
+
+
+# --------------------------------------------------
+# Incremental probing of uploads
+# --------------------------------------------------
+
+class AudioProbeError(AudioDecodeError):
+    """The upload is not usable audio or exceeds a limit."""
+
+
+_WAV_CODECS = {1: 'pcm', 3: 'pcm_float', 6: 'alaw', 7: 'mulaw', 0xFFFE: 'pcm'}
+_CONTAINER_CODECS = {
+    'webm': ((b'A_OPUS', 'opus'), (b'A_VORBIS', 'vorbis'), (b'A_AAC', 'aac')),
+    'mp4': ((b'mp4a', 'aac'), (b'Opus', 'opus'), (b'alac', 'alac'), (b'fLaC', 'flac')),
+}
+
+
+class AudioProbe:
+    """
+    Inspect an upload chunk by chunk as it arrives.
+
+    The container is sniffed from the first bytes, the codec and duration
+    are read from headers (or counted from MP3 frames / Ogg granule
+    positions), and the SHA-256 is updated with every chunk. feed() raises
+    AudioProbeError as soon as the data is clearly unusable or over a limit,
+    so the rest of the upload can be discarded.
+
+    After finish(), `info` holds format, codec, duration (seconds or None
+    when the container does not record it), sha256 and size.
+    """
+
+    HEAD_BYTES = 64
+
+    def __init__(self, max_bytes=None, max_seconds=None):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.size = 0
+        self.format = None
+        self.codec = ''
+        self.duration = None
+        self._sha256 = hashlib.sha256()
+        self._head = b''
+        self._carry = b''
+        self._skip = 0
+        self._seconds = 0.0
+        self._ogg_rate = None
+        self._ogg_pre_skip = 0
+        self._wav_data = None
+
+    # -- public -----------------------------------------------------------
+
+    def feed(self, chunk):
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise AudioProbeError(f'حجم الملف يتجاوز الحد المسموح ({self.max_bytes // (1024 * 1024)} ميجابايت)')
+
+        if self.format is None:
+            self._head += chunk
+            if len(self._head) < self.HEAD_BYTES:
+                return
+            chunk, self._head = self._head, self._head[:self.HEAD_BYTES]
+            self._detect()
+
+        getattr(self, f'_feed_{self.format}', self._feed_other)(chunk)
+        self._check_duration()
+
+    def finish(self):
+        if self.format is None:
+            if not self.size:
+                raise AudioProbeError('الملف الصوتي فارغ')
+            self._detect()
+            getattr(self, f'_feed_{self.format}', self._feed_other)(self._head)
+        if self.format == 'mp3':
+            self.duration = self._seconds
+            if not self._seconds:
+                raise AudioProbeError('لم يُعثر على إطارات MP3 صالحة في الملف')
+        elif self.format == 'wav' and self._wav_data is not None and not self.duration:
+            offset, byte_rate = self._wav_data
+            self.duration = max(self.size - offset, 0) / byte_rate
+        self._check_duration()
+
+    @property
+    def info(self):
+        return {
+            'format': self.format or '',
+            'codec': self.codec,
+            'duration': round(self.duration, 2) if self.duration is not None else None,
+            'sha256': self._sha256.hexdigest(),
+            'size': self.size,
+        }
+
+    # -- internals --------------------------------------------------------
+
+    def _detect(self):
+        self.format = sniff_format(self._head)
+        if self.format is None:
+            raise AudioProbeError('صيغة الملف غير معروفة، يرجى رفع ملف صوتي (MP3, WAV, OGG, M4A, WebM)')
+        if self.format == 'mp3':
+            self.codec = 'mp3'
+            self._skip = _id3_size(self._head)
+
+    def _check_duration(self):
+        seconds = self.duration if self.duration is not None else self._seconds
+        if self.max_seconds and seconds and seconds > self.max_seconds:
+            limit = (f'{self.max_seconds // 60} دقيقة' if self.max_seconds >= 60
+                     else f'{self.max_seconds} ثانية')
+            raise AudioProbeError(f'مدة التسجيل تتجاوز الحد المسموح ({limit})')
+
+    def _feed_wav(self, chunk):
+        if self._wav_data is not None:
+            return
+        self._carry += chunk
+        data = self._carry
+        pos = 12
+        fmt = None
+        while pos + 8 <= len(data):
+            chunk_id = data[pos:pos + 4]
+            size, = struct.unpack_from('<I', data, pos + 4)
+            if chunk_id == b'fmt ' and pos + 24 <= len(data):
+                tag, channels, rate, byte_rate, _, bits = struct.unpack_from('<HHIIHH', data, pos + 8)
+                if not byte_rate or not rate:
+                    raise AudioProbeError('ترويسة WAV غير صالحة')
+                fmt = (tag, bits, byte_rate)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise AudioProbeError('ترويسة WAV غير صالحة')
+                tag, bits, byte_rate = fmt
+                self.codec = f'{_WAV_CODECS.get(tag, f"0x{tag:04x}")}_{bits}'
+                self._wav_data = (pos + 8, byte_rate)
+                if 0 < size < 0xFFFFFFFF:
+                    self.duration = size / byte_rate
+                self._carry = b''
+                return
+            pos += 8 + size + (size & 1)
+        if len(self._carry) > 64 * 1024:
+            raise AudioProbeError('ترويسة WAV غير صالحة')
+
+    def _feed_mp3(self, chunk):
+        buf = self._carry + chunk
+        pos = self._skip
+        while pos + 4 <= len(buf):
+            frame = _mp3_frame(buf[pos], buf[pos + 1], buf[pos + 2])
+            if frame is None:
+                pos += 1
+                continue
+            self._seconds += frame[0]
+            pos += frame[1]
+        self._skip = max(pos - len(buf), 0)
+        self._carry = buf[pos:] if pos < len(buf) else b''
+
+    def _feed_opus(self, chunk):
+        self._feed_ogg(chunk)
+
+    def _feed_ogg(self, chunk):
+        buf = self._carry + chunk
+        pos = buf.find(b'OggS')
+        while pos != -1 and pos + 27 <= len(buf):
+            granule, = struct.unpack_from('<q', buf, pos + 6)
+            if self._ogg_rate is None:
+                body = buf[pos + 27 + buf[pos + 26]:]
+                if body.startswith(b'OpusHead') and len(body) >= 12:
+                    self.codec, self._ogg_rate = 'opus', 48000
+                    self._ogg_pre_skip, = struct.unpack_from('<H', body, 10)
+                elif body.startswith(b'\x01vorbis') and len(body) >= 16:
+                    self.codec = 'vorbis'
+                    self._ogg_rate, = struct.unpack_from('<I', body, 12)
+                elif body.startswith(b'\x7fFLAC'):
+                    self.codec = 'flac'
+                    self._ogg_rate = 0
+            if self._ogg_rate and granule > 0:
+                self.duration = max(granule - self._ogg_pre_skip, 0) / self._ogg_rate
+            pos = buf.find(b'OggS', pos + 4)
+        self._carry = buf[-26:]
+
+    def _feed_flac(self, chunk):
+        if self.duration is None and len(self._head) >= 26:
+            head = self._head
+            rate = (head[18] << 12) | (head[19] << 4) | (head[20] >> 4)
+            total = ((head[21] & 0x0F) << 32) | struct.unpack_from('>I', head, 22)[0]
+            self.codec = 'flac'
+            self.duration = total / rate if rate and total else None
+
+    def _feed_other(self, chunk):
+        """WebM, MP4, AIFF: pick the codec (and MP4 duration) out of the headers."""
+        buf = self._carry + chunk
+        if not self.codec:
+            for marker, codec in _CONTAINER_CODECS.get(self.format, ()):
+                if marker in buf:
+                    self.codec = codec
+                    break
+        if self.format == 'mp4' and self.duration is None:
+            pos = buf.find(b'mvhd')
+            if pos != -1 and pos + 28 <= len(buf):
+                if buf[pos + 4] == 1:
+                    timescale, duration = struct.unpack_from('>IQ', buf, pos + 24)
+                else:
+                    timescale, duration = struct.unpack_from('>II', buf, pos + 16)
+                if timescale:
+                    self.duration = duration / timescale
+        elif self.format == 'webm' and self.duration is None and self.size <= 64 * 1024:
+            pos = buf.find(b'\x44\x89')
+            if pos != -1 and pos + 11 <= len(buf) and buf[pos + 2] in (0x84, 0x88):
+                # Segment duration in TimecodeScale units (1 ms by default)
+                fmt = '>f' if buf[pos + 2] == 0x84 else '>d'
+                self.duration = struct.unpack_from(fmt, buf, pos + 3)[0] / 1000
+        self._carry = buf[-32:]
+
+
+def probe_stream(stream, max_bytes=None, max_seconds=None, block_size=64 * 1024):
+    """Run an AudioProbe over a whole file object and return its info."""
+    probe = AudioProbe(max_bytes, max_seconds)
+    for block in iter(lambda: stream.read(block_size), b''):
+        probe.feed(block)
+    probe.finish()
+    return probe.info
+
@@ -0,0 +1,54 @@
+"""
+Background task runner.
+
+A small shared thread pool for work that should not hold up the request
+that triggered it. Tasks run inside the web process, so anything that must
+survive a restart also needs a management command that can pick it up.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 4),
+                    thread_name_prefix='taibah-bg',
+                )
+    return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background pool and return its Future."""
+
+    def _run():
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+            raise
+        finally:
+            close_old_connections()
+
+    return get_executor().submit(_run)
+
+
+def schedule(delay, fn, *args, **kwargs):
+    """Submit fn to the background pool after `delay` seconds."""
+    timer = threading.Timer(delay, submit, args=(fn, *args), kwargs=kwargs)
+    timer.daemon = True
+    timer.start()
+    return timer
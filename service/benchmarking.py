@@ -0,0 +1,80 @@
+"""
+Shared helpers for the benchmark commands (bench_tts, bench_stt).
+
+Both commands run a list of cases at several concurrency levels and report
+per-level latency percentiles, error counts and per-dimension breakdowns
+in a JSON document; the statistics and report scaffolding live here.
+"""
+
+import json
+import platform
+from collections import defaultdict
+
+import django
+
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of `values` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summary(values, ndigits=4):
+    if not values:
+        return None
+    return {
+        'p50': round(percentile(values, 50), ndigits),
+        'p95': round(percentile(values, 95), ndigits),
+        'p99': round(percentile(values, 99), ndigits),
+        'mean': round(sum(values) / len(values), ndigits),
+        'max': round(max(values), ndigits),
+    }
+
+
+def request_counts(samples):
+    """Requests, errors and error rate of samples with an 'error' key."""
+    errors = sum(1 for s in samples if s['error'] is not None)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+    }
+
+
+def breakdown(samples, dimensions, aggregate):
+    """`aggregate` of the samples grouped by each of `dimensions`."""
+    result = {}
+    for dimension in dimensions:
+        groups = defaultdict(list)
+        for s in samples:
+            groups[s[dimension]].append(s)
+        result[dimension] = {key: aggregate(group) for key, group in groups.items()}
+    return result
+
+
+def error_messages(samples, limit=10):
+    return sorted({s['error'] for s in samples if s['error']})[:limit]
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+    }
+
+
+def write_report(command, report, output=None):
+    """Write `report` as JSON to `output`, or to the command's stdout."""
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        command.stdout.write(command.style.SUCCESS(f'Report written to {output}'))
+    else:
+        command.stdout.write(payload)
@@ -0,0 +1,149 @@
+"""
+Bulk inquiry operations.
+
+Status changes, closing, priority changes and reassignment applied to many
+inquiries at once, from the librarian endpoint (views.inquiry_bulk) and the
+InquiryAdmin actions; read_receipts.py flushes read flags through
+`update()`. Each operation locks its rows and changes them with a single
+UPDATE. `.update()` skips the Inquiry signals, so their work is done
+here for the whole batch:
+
+* counters: one `counters.apply_many()` call;
+* the live event feed: one `events.publish_many()` call;
+* dashboard figures: `stats.invalidate()` for the owners involved;
+* the work queue: claims on inquiries leaving the open statuses are dropped.
+
+No operation changes indexed text, so the search table is left alone.
+
+Every operation returns one result per inquiry:
+
+    {'id': 7, 'result': 'updated', 'status': 'closed', 'priority': 'normal'}
+
+where result is UPDATED, UNCHANGED (already in the requested state),
+SKIPPED (not applicable, e.g. assigning a closed inquiry) or NOT_FOUND
+(an id that matched nothing).
+"""
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, events, stats, work_queue
+from .models import Inquiry, InquiryClaim
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+SKIPPED = 'skipped'
+NOT_FOUND = 'not_found'
+
+# Columns the batch needs: counter state plus what events and results report
+_ROW_FIELDS = ('title', 'status', 'priority', 'created_by', 'answered_by', 'is_read_by_user', 'answered_at')
+
+
+def _lock(queryset):
+    rows = queryset.order_by('pk').only(*_ROW_FIELDS)
+    if connection.features.has_select_for_update:
+        of = ('self',) if connection.features.has_select_for_update_of else ()
+        rows = rows.select_for_update(of=of)
+    return list(rows)
+
+
+def _report(rows, changed=(), skipped=()):
+    outcome = {pk: UPDATED for pk in changed}
+    outcome.update({pk: SKIPPED for pk in skipped})
+    return [
+        {'id': row.pk, 'result': outcome.get(row.pk, UNCHANGED), 'status': row.status, 'priority': row.priority}
+        for row in rows
+    ]
+
+
+def update(queryset, *, touch=True, **values):
+    """
+    Set `values` on every inquiry of `queryset` that differs, in one UPDATE.
+    `touch=False` leaves updated_at alone (e.g. for read receipts).
+    """
+    with transaction.atomic():
+        rows = _lock(queryset)
+        changed = [row for row in rows if any(getattr(row, name) != value for name, value in values.items())]
+        if changed:
+            now = timezone.now()
+            pks = [row.pk for row in changed]
+            fields = {**values, 'updated_at': now} if touch else values
+            Inquiry.objects.filter(pk__in=pks).update(**fields)
+
+            batch = []
+            for row in changed:
+                before = counters.state(row)
+                for name, value in values.items():
+                    setattr(row, name, value)
+                if touch:
+                    row.updated_at = now
+                batch.append((row, before, counters.state(row)))
+            counters.apply_many([(before, after) for _, before, after in batch])
+            events.publish_many(batch)
+            if 'status' in values and values['status'] not in work_queue.OPEN_STATUSES:
+                work_queue.release_inquiries(pks)
+
+    if changed:
+        stats.invalidate(*{row.created_by_id for row in changed})
+    return _report(rows, changed=[row.pk for row in changed])
+
+
+def set_status(queryset, status):
+    return update(queryset, status=status)
+
+
+def close(queryset):
+    return update(queryset, status=Inquiry.Status.CLOSED)
+
+
+def set_priority(queryset, priority):
+    return update(queryset, priority=priority)
+
+
+def reassign(queryset, librarian, assigned_by=None):
+    """
+    Assign the open inquiries of `queryset` to `librarian` through the work
+    queue (see work_queue.assign); others are skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = _lock(queryset)
+        open_ids = [row.pk for row in rows if row.status in work_queue.OPEN_STATUSES]
+        held = set(
+            InquiryClaim.objects.filter(
+                inquiry_id__in=open_ids, claimed_by=librarian, expires_at__gt=now,
+            ).values_list('inquiry_id', flat=True)
+        )
+        assigned = work_queue.assign([pk for pk in open_ids if pk not in held], librarian, assigned_by)
+    skipped = [row.pk for row in rows if row.status not in work_queue.OPEN_STATUSES]
+    return _report(rows, changed=assigned, skipped=skipped)
+
+
+def run(action, queryset, value=None, user=None, ids=None):
+    """
+    Apply `action` ('status', 'close', 'priority' or 'reassign') with its
+    `value` (a status, a priority or a librarian). `ids`, when the targets
+    were listed, adds a NOT_FOUND result for each id that matched nothing.
+    """
+    if action == 'status':
+        results = set_status(queryset, value)
+    elif action == 'close':
+        results = close(queryset)
+    elif action == 'priority':
+        results = set_priority(queryset, value)
+    elif action == 'reassign':
+        results = reassign(queryset, value, assigned_by=user)
+    else:
+        raise ValueError(f'Unknown bulk action: {action}')
+
+    if ids is not None:
+        found = {result['id'] for result in results}
+        results += [{'id': pk, 'result': NOT_FOUND} for pk in ids if pk not in found]
+    return results
+
+
+def summary(results):
+    """Number of inquiries per result, e.g. {'updated': 40, 'unchanged': 2}."""
+    return dict(Counter(result['result'] for result in results))
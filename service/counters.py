@@ -0,0 +1,289 @@
+"""
+Denormalized inquiry counters.
+
+InquiryCounter keeps one row per user and one global row, holding totals by
+status, unread answers, answers given (as librarian) and answers given
+today. The dashboard reads these one or two rows instead of counting
+Inquiry rows, so its cost does not grow with the history.
+
+Counters follow every Inquiry save and delete. `pre_save` / `pre_delete`
+read the row's current state (locked when inside a transaction), and
+`post_save` / `post_delete` apply the difference with F() updates. Views that change an
+inquiry save it inside `transaction.atomic()`, so the counters commit or
+roll back together with the change. Bulk `.update()` calls bypass signals
+and must call `apply()` (or `apply_many()`) themselves.
+
+A missing row is rebuilt from the Inquiry table on first use. Drift (raw SQL,
+bulk updates that forgot `apply()`) is repaired by
+`manage.py reconcile_inquiry_counters`.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Inquiry, InquiryCounter
+
+STATUS_FIELDS = {
+    Inquiry.Status.NEW: 'new',
+    Inquiry.Status.TRANSCRIBED: 'transcribed',
+    Inquiry.Status.IN_PROGRESS: 'in_progress',
+    Inquiry.Status.ANSWERED: 'answered',
+    Inquiry.Status.CLOSED: 'closed',
+}
+
+STATE_FIELDS = ('created_by_id', 'answered_by_id', 'status', 'is_read_by_user', 'answered_at')
+
+GLOBAL = InquiryCounter.GLOBAL
+user_scope = InquiryCounter.user_scope
+
+logger = logging.getLogger(__name__)
+
+
+def day_start(day):
+    """Aware datetime at local midnight starting `day`."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def today_range():
+    """Start and end of the current local day, for an index-friendly range filter."""
+    start = day_start(timezone.localdate())
+    return start, start + timedelta(days=1)
+
+
+def state(inquiry):
+    """The fields of `inquiry` that counters depend on."""
+    return {name: getattr(inquiry, name) for name in STATE_FIELDS}
+
+
+def _contributions(current):
+    """Counter cells (scope, field) an inquiry in state `current` adds one to."""
+    cells = Counter()
+    if current is None:
+        return cells
+    owner = user_scope(current['created_by_id'])
+    unread = current['status'] == Inquiry.Status.ANSWERED and not current['is_read_by_user']
+    for scope in (GLOBAL, owner):
+        cells[scope, 'total'] += 1
+        cells[scope, STATUS_FIELDS[current['status']]] += 1
+        if unread:
+            cells[scope, 'unread'] += 1
+    if current['answered_by_id']:
+        answered_today = (
+            current['answered_at'] is not None
+            and timezone.localdate(current['answered_at']) == timezone.localdate()
+        )
+        for scope in (GLOBAL, user_scope(current['answered_by_id'])):
+            cells[scope, 'answers'] += 1
+            if answered_today:
+                cells[scope, 'answered_today'] += 1
+    return cells
+
+
+def _rebuild_values(scope):
+    """Counter values for `scope` computed from the Inquiry table."""
+    start, end = today_range()
+    if scope == GLOBAL:
+        owned = Inquiry.objects.all()
+        answers = Inquiry.objects.filter(answered_by__isnull=False)
+        user_id = None
+    else:
+        user_id = int(scope.split(':', 1)[1])
+        owned = Inquiry.objects.filter(created_by_id=user_id)
+        answers = Inquiry.objects.filter(answered_by_id=user_id)
+
+    values = owned.aggregate(
+        total=Count('pk'),
+        unread=Count('pk', filter=Q(status=Inquiry.Status.ANSWERED, is_read_by_user=False)),
+        **{
+            field: Count('pk', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        },
+    )
+    values.update(answers.aggregate(
+        answers=Count('pk'),
+        answered_today=Count('pk', filter=Q(answered_at__gte=start, answered_at__lt=end)),
+    ))
+    values['answered_today_date'] = timezone.localdate()
+    values['user_id'] = user_id
+    return values
+
+
+def answered_today(counter):
+    return counter.answered_today if counter.answered_today_date == timezone.localdate() else 0
+
+
+def rebuild(scope):
+    """Recompute one counter row from scratch, creating it if needed."""
+    counter, _ = InquiryCounter.objects.update_or_create(scope=scope, defaults=_rebuild_values(scope))
+    return counter
+
+
+def get_counters(scopes):
+    """Counter rows for `scopes` (one query; missing rows are rebuilt)."""
+    rows = {c.scope: c for c in InquiryCounter.objects.filter(scope__in=scopes)}
+    for scope in scopes:
+        if scope not in rows:
+            try:
+                with transaction.atomic():
+                    rows[scope] = rebuild(scope)
+            except IntegrityError:
+                # Created concurrently by another request
+                rows[scope] = InquiryCounter.objects.get(scope=scope)
+    return rows
+
+
+def apply(before, after, create_missing=True):
+    """
+    Move the counters from inquiry state `before` to `after` (either may be
+    None for a creation or deletion). Missing rows are rebuilt instead of
+    incremented, since the rebuild already sees the change.
+    """
+    apply_many([(before, after)], create_missing)
+
+
+def apply_many(changes, create_missing=True):
+    """
+    `apply()` for many (before, after) pairs at once, e.g. after a bulk
+    `.update()`: one UPDATE per affected counter row, however many inquiries
+    changed.
+    """
+    today = timezone.localdate()
+    deltas = defaultdict(dict)
+    gained, lost = Counter(), Counter()
+    for before, after in changes:
+        gained.update(_contributions(after))
+        lost.update(_contributions(before))
+    for cell in gained.keys() | lost.keys():
+        delta = gained[cell] - lost[cell]
+        if not delta:
+            continue
+        scope, field = cell
+        # Clamped so drift cannot break the unsigned columns; reconcile repairs it
+        moved = F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+        if field == 'answered_today':
+            # Yesterday's count restarts from zero
+            moved = Case(When(answered_today_date=today, then=moved), default=Value(max(delta, 0)))
+            deltas[scope]['answered_today_date'] = today
+        deltas[scope][field] = moved
+
+    for scope, updates in deltas.items():
+        updated = InquiryCounter.objects.filter(scope=scope).update(**updates, updated_at=timezone.now())
+        if not updated and create_missing:
+            get_counters([scope])
+
+
+COUNTER_FIELDS = ('total', *STATUS_FIELDS.values(), 'unread', 'answers', 'answered_today')
+
+
+def _expected():
+    """Every counter row's correct values, from two grouped queries plus the global row."""
+    start, end = today_range()
+    owned_counts = {
+        'total': Count('pk'),
+        'unread': Count('pk', filter=Q(status=Inquiry.Status.ANSWERED, is_read_by_user=False)),
+        **{field: Count('pk', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+    }
+    answer_counts = {
+        'answers': Count('pk'),
+        'answered_today': Count('pk', filter=Q(answered_at__gte=start, answered_at__lt=end)),
+    }
+    empty = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    expected = defaultdict(lambda: dict(empty))
+    expected[GLOBAL].update(Inquiry.objects.aggregate(**owned_counts))
+    expected[GLOBAL].update(Inquiry.objects.filter(answered_by__isnull=False).aggregate(**answer_counts))
+    for row in Inquiry.objects.order_by().values('created_by_id').annotate(**owned_counts):
+        expected[user_scope(row.pop('created_by_id'))].update(row)
+    for row in (Inquiry.objects.filter(answered_by__isnull=False).order_by()
+                .values('answered_by_id').annotate(**answer_counts)):
+        expected[user_scope(row.pop('answered_by_id'))].update(row)
+    return expected, empty
+
+
+def reconcile(dry_run=False):
+    """
+    Compare every counter row with the Inquiry table and repair drift.
+
+    Returns {scope: {field: (stored, actual)}} for the rows that differed
+    (stored is None for a row that was missing).
+    """
+    today = timezone.localdate()
+    drift = {}
+    with transaction.atomic():
+        rows = {c.scope: c for c in InquiryCounter.objects.select_for_update()}
+        expected, empty = _expected()
+        for scope in rows.keys() | expected.keys():
+            values = expected.get(scope, empty)
+            counter = rows.get(scope)
+            if counter is None:
+                drift[scope] = {field: (None, value) for field, value in values.items()}
+                if not dry_run:
+                    rebuild(scope)
+                continue
+
+            stored = {field: getattr(counter, field) for field in COUNTER_FIELDS}
+            stored['answered_today'] = answered_today(counter)
+            changed = {f: (stored[f], values[f]) for f in COUNTER_FIELDS if stored[f] != values[f]}
+            if changed:
+                drift[scope] = changed
+                if not dry_run:
+                    InquiryCounter.objects.filter(pk=counter.pk).update(
+                        **values, answered_today_date=today, updated_at=timezone.now(),
+                    )
+    return drift
+
+
+# --------------------------------------------------
+# Signal receivers (connected in apps.py)
+# --------------------------------------------------
+
+def _stored_state(instance):
+    """The row's state in the database, which the instance may no longer match."""
+    rows = Inquiry.objects.filter(pk=instance.pk)
+    if connection.in_atomic_block and connection.features.has_select_for_update:
+        rows = rows.select_for_update()
+    return rows.values(*STATE_FIELDS).first()
+
+
+def inquiry_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        instance._counter_state = None
+        return
+    instance._counter_state = _stored_state(instance)
+
+
+def inquiry_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = None if created else getattr(instance, '_counter_state', None)
+    if before is None and not created:
+        # pre_save did not see the row, so the difference is unknown: rebuild
+        # the rows this inquiry counts in (a previous librarian's row is left
+        # to reconcile_inquiry_counters)
+        scopes = [GLOBAL, user_scope(instance.created_by_id)]
+        if instance.answered_by_id:
+            scopes.append(user_scope(instance.answered_by_id))
+        logger.warning('Inquiry %s saved without its previous counter state; rebuilding %s',
+                       instance.pk, ', '.join(scopes))
+        for scope in scopes:
+            rebuild(scope)
+        instance._counter_state = state(instance)
+        return
+    apply(before, state(instance))
+    instance._counter_state = state(instance)
+
+
+def inquiry_pre_delete(sender, instance, **kwargs):
+    instance._counter_state = _stored_state(instance)
+
+
+def inquiry_post_delete(sender, instance, **kwargs):
+    before = getattr(instance, '_counter_state', None) or state(instance)
+    # The owner may be being deleted too; never recreate rows here
+    apply(before, None, create_missing=False)
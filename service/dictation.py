@@ -0,0 +1,255 @@
+"""
+Streaming dictation over WebSocket.
+
+The browser sends 16-bit mono PCM frames while the user speaks. Incoming
+audio is split on pauses with the same energy VAD used for long recordings,
+run in a worker thread over the audio after the last finished segment;
+each finished segment is recognised straight away and returned as a
+'final' message, and the segment still being spoken is re-recognised every
+STT_STREAM_PARTIAL_SECONDS as a 'partial'.
+
+Protocol (ws://<host>/ws/stt/?language=ar-SA&rate=16000):
+
+    client -> server   binary frames of little-endian int16 PCM
+                       {"type": "stop"} when the user stops recording
+    server -> client   {"type": "partial", "segment": n, "text": ...}
+                       {"type": "final", "segment": n, "text": ...[, "error": ...]}
+                       {"type": "done", "text": ...}  (then the socket closes)
+
+`dictation_socket` is a plain ASGI application routed from
+taibah_voice/asgi.py, so it needs an ASGI server (uvicorn, daphne). Under
+`runserver` the socket is unavailable and the page falls back to uploading
+the whole recording to `stt_transcribe`.
+"""
+
+import asyncio
+import json
+import logging
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+
+from .audio import speech_segments, vad_available
+from .stt_service import get_stt_service
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATES = (8000, 16000, 22050, 44100, 48000)
+
+# Segments with less voiced audio than this (noise bursts, clicks) are dropped
+MIN_SPEECH_SECONDS = 0.3
+
+# Audio before the last final that the VAD still sees, for its noise estimate
+LOOKBACK_SECONDS = 1.0
+
+
+class DictationStream:
+    """
+    Incremental segmentation of a growing PCM buffer.
+
+    `feed()` and `finish()` return (finals, partial): finals is a list of
+    (index, pcm) for segments that ended with a pause, partial is
+    (index, pcm) for the segment still in progress when it is due for
+    another look, else None.
+
+    Only the audio after the last final (plus LOOKBACK_SECONDS) is
+    segmented again, so each frame costs the length of the open segment,
+    not of the whole dictation.
+    """
+
+    def __init__(self, sample_rate=16000, min_silence_ms=600, partial_seconds=1.0):
+        self.sample_rate = sample_rate
+        self.min_silence_ms = min_silence_ms
+        self.buffer = bytearray()
+        self.committed = 0          # samples already handed out as finals
+        self.next_index = 0
+        self._partial_step = int(partial_seconds * sample_rate)
+        self._partial_len = 0       # open-segment length at the last partial
+
+    @property
+    def seconds(self):
+        return len(self.buffer) / (2 * self.sample_rate)
+
+    def feed(self, pcm):
+        self.buffer += pcm
+        if len(self.buffer) % 2:
+            # Keep whole samples only; the odd byte arrives with the next frame
+            return [], None
+        return self._segments(flush=False)
+
+    def finish(self):
+        del self.buffer[len(self.buffer) // 2 * 2:]
+        finals, _ = self._segments(flush=True)
+        return finals, None
+
+    def _segments(self, flush):
+        total = len(self.buffer) // 2
+        min_gap = self.sample_rate * self.min_silence_ms // 1000
+        origin = max(self.committed - int(LOOKBACK_SECONDS * self.sample_rate), 0)
+        tail = bytes(self.buffer[origin * 2:total * 2])
+        bounds = [
+            (max(origin + start, self.committed), origin + end)
+            for start, end in speech_segments(tail, self.sample_rate, min_silence_ms=self.min_silence_ms)
+            if origin + end > self.committed
+        ]
+
+        finals = []
+        partial = None
+        for i, (start, end) in enumerate(bounds):
+            closed = flush or i < len(bounds) - 1 or total - end >= min_gap
+            if closed:
+                if end - start >= MIN_SPEECH_SECONDS * self.sample_rate:
+                    finals.append((self.next_index, bytes(self.buffer[start * 2:end * 2])))
+                    self.next_index += 1
+                self.committed = end
+                self._partial_len = 0
+            elif total - start - self._partial_len >= self._partial_step:
+                self._partial_len = total - start
+                partial = (self.next_index, bytes(self.buffer[start * 2:total * 2]))
+        return finals, partial
+
+
+class DictationSession:
+    """Runs recognition for one socket and sends results back as they finish."""
+
+    def __init__(self, send, language, sample_rate):
+        self.send = send
+        self.language = language
+        self.sample_rate = sample_rate
+        self.stt = get_stt_service()
+        self.texts = {}
+        self._finals = set()
+        self._partial = None
+        self._send_lock = asyncio.Lock()
+
+    async def send_json(self, payload):
+        async with self._send_lock:
+            await self.send({'type': 'websocket.send', 'text': json.dumps(payload, ensure_ascii=False)})
+
+    def dispatch(self, finals, partial):
+        for index, pcm in finals:
+            self._finals.add(asyncio.create_task(self._final(index, pcm)))
+        if partial is not None and (self._partial is None or self._partial.done()):
+            self._partial = asyncio.create_task(self._send_partial(*partial))
+
+    async def _recognize(self, pcm):
+        return await asyncio.to_thread(
+            self.stt.transcribe_pcm, pcm, self.sample_rate, self.language,
+        )
+
+    async def _final(self, index, pcm):
+        result = await self._recognize(pcm)
+        message = {'type': 'final', 'segment': index, 'text': result.get('text', '')}
+        if result['success']:
+            self.texts[index] = result['text']
+        else:
+            message['error'] = result['error']
+        await self.send_json(message)
+
+    async def _send_partial(self, index, pcm):
+        result = await self._recognize(pcm)
+        # A partial that lost the race with its own final is stale
+        if result['success'] and index not in self.texts:
+            await self.send_json({'type': 'partial', 'segment': index, 'text': result['text']})
+
+    async def finish(self):
+        if self._partial is not None:
+            self._partial.cancel()
+        if self._finals:
+            await asyncio.gather(*self._finals, return_exceptions=True)
+        text = ' '.join(self.texts[i] for i in sorted(self.texts))
+        await self.send_json({'type': 'done', 'text': text})
+
+    def cancel(self):
+        for task in [*self._finals, self._partial]:
+            if task is not None:
+                task.cancel()
+
+
+def _same_origin(scope):
+    """Reject cross-site sockets; browsers always send Origin on WebSocket."""
+    headers = dict(scope.get('headers', []))
+    origin = headers.get(b'origin')
+    if origin is None:
+        return True
+    return urlparse(origin.decode('latin-1')).netloc == headers.get(b'host', b'').decode('latin-1')
+
+
+def load_user(scope):
+    """The session user of an ASGI connection scope (AnonymousUser if none)."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    request = SimpleNamespace(session=engine.SessionStore(morsel.value if morsel else None))
+    try:
+        return get_user(request)
+    finally:
+        close_old_connections()
+
+
+async def dictation_socket(scope, receive, send):
+    """ASGI application for /ws/stt/."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    user = await sync_to_async(load_user)(scope)
+    stt = get_stt_service()
+    if not _same_origin(scope) or not user.is_authenticated:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    if not stt.is_available or not vad_available():
+        await send({'type': 'websocket.close', 'code': 4503})
+        return
+
+    params = parse_qs(scope.get('query_string', b'').decode())
+    language = params.get('language', ['ar-SA'])[0]
+    try:
+        rate = int(params.get('rate', ['16000'])[0])
+    except ValueError:
+        rate = 16000
+    if rate not in SAMPLE_RATES:
+        rate = 16000
+
+    await send({'type': 'websocket.accept'})
+
+    stream = DictationStream(
+        sample_rate=rate,
+        min_silence_ms=getattr(settings, 'STT_STREAM_MIN_SILENCE_MS', 600),
+        partial_seconds=getattr(settings, 'STT_STREAM_PARTIAL_SECONDS', 1.0),
+    )
+    session = DictationSession(send, language, rate)
+    max_seconds = getattr(settings, 'STT_STREAM_MAX_SECONDS', 300)
+
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            session.cancel()
+            return
+
+        stop = False
+        if message.get('bytes'):
+            # The VAD is CPU work; keep it off the event loop
+            session.dispatch(*await asyncio.to_thread(stream.feed, message['bytes']))
+            stop = stream.seconds >= max_seconds
+        elif message.get('text'):
+            try:
+                stop = json.loads(message['text']).get('type') == 'stop'
+            except (ValueError, AttributeError):
+                pass
+
+        if stop:
+            session.dispatch(*await asyncio.to_thread(stream.finish))
+            await session.finish()
+            await send({'type': 'websocket.close', 'code': 1000})
+            logger.debug('Dictation by %s finished after %.1fs', user.pk, stream.seconds)
+            return
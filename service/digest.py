@@ -0,0 +1,159 @@
+"""
+Answer digests - one narrated file per blind user covering every answer
+they have not read yet.
+
+Digests are built off-peak by `manage.py build_answer_digests`. Each
+segment is synthesized through the normal TTS cache, so answers that were
+already played with `tts_inquiry_answer` are not synthesized again.
+"""
+
+import re
+from functools import partial
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+
+from .audio import strip_id3
+from .models import AnswerDigest, Inquiry
+from .tts_service import TTSService, get_tts_service
+
+_SENTENCE_END = re.compile(r'(?<=[.!؟?\n])\s+')
+
+
+def split_for_tts(text, limit=TTSService.MAX_TEXT_LENGTH):
+    """
+    Split text into pieces of at most `limit` characters.
+
+    Text that already fits is returned unchanged so its TTS cache entry is
+    shared with the single-answer endpoint. Longer text is packed sentence
+    by sentence, falling back to word boundaries for very long sentences.
+    """
+    text = text.strip()
+    if len(text) <= limit:
+        return [text] if text else []
+
+    pieces = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > limit:
+            cut = sentence.rfind(' ', 0, limit)
+            if cut <= 0:
+                cut = limit
+            head, sentence = sentence[:cut].strip(), sentence[cut:].strip()
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(head)
+        if current and len(current) + 1 + len(sentence) > limit:
+            pieces.append(current)
+            current = ''
+        current = f'{current} {sentence}'.strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def unread_answers(user):
+    return (
+        Inquiry.objects
+        .filter(created_by=user, status=Inquiry.Status.ANSWERED, is_read_by_user=False)
+        .order_by('answered_at')
+    )
+
+
+def digest_segments(inquiries):
+    """Return the ordered list of texts narrated in a digest."""
+    count = len(inquiries)
+    if count == 1:
+        segments = ['لديك إجابة جديدة واحدة.']
+    else:
+        segments = [f'لديك {count} إجابات جديدة.']
+
+    for index, inquiry in enumerate(inquiries, start=1):
+        segments.append(f'الاستفسار {index}: {inquiry.title}.')
+        segments.extend(split_for_tts(inquiry.answer_text))
+
+    segments.append('انتهى الملخص.')
+    return segments
+
+
+def recipients():
+    """Blind users who want notifications and have at least one unread answer."""
+    return (
+        User.objects
+        .filter(
+            role=User.Role.BLIND,
+            receive_notifications=True,
+            inquiries__status=Inquiry.Status.ANSWERED,
+            inquiries__is_read_by_user=False,
+        )
+        .distinct()
+    )
+
+
+def latest_digest(user):
+    """Most recent digest that still covers at least one unread answer."""
+    return (
+        AnswerDigest.objects
+        .filter(
+            user=user,
+            inquiries__status=Inquiry.Status.ANSWERED,
+            inquiries__is_read_by_user=False,
+        )
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def build_digest(user, voice='female', speed='normal'):
+    """
+    Build (or reuse) the digest for `user`.
+
+    Returns:
+        (digest, created). digest is None when the user has no unread answers;
+        created is False when the latest digest already covers the same answers.
+
+    Call it outside a transaction: the new file is only removed again if
+    this function's own transaction rolls back.
+    """
+    inquiries = list(unread_answers(user))
+    if not inquiries:
+        return None, False
+
+    ids = {i.pk for i in inquiries}
+    previous = AnswerDigest.objects.filter(user=user).order_by('-created_at').first()
+    if previous and set(previous.inquiries.values_list('pk', flat=True)) == ids:
+        return previous, False
+
+    tts = get_tts_service()
+    audio = bytearray()
+    for text in digest_segments(inquiries):
+        path, _ = tts.synthesize_with_tier(text, voice, speed, progressive=False)
+        with open(path, 'rb') as f:
+            audio += strip_id3(f.read())
+
+    # The file is written before the row, so a rolled-back row must take it along
+    digest = AnswerDigest(user=user, inquiry_count=len(inquiries))
+    digest.audio.save(
+        f'digest_{user.pk}_{timezone.localdate():%Y%m%d}.mp3',
+        ContentFile(bytes(audio)),
+        save=False,
+    )
+    old_digests = list(AnswerDigest.objects.filter(user=user))
+    try:
+        with transaction.atomic():
+            digest.save()
+            digest.inquiries.set(inquiries)
+            for old in old_digests:
+                if old.audio:
+                    # The file goes only once the row is gone for good
+                    transaction.on_commit(partial(old.audio.storage.delete, old.audio.name))
+                old.delete()
+    except BaseException:
+        digest.audio.storage.delete(digest.audio.name)
+        raise
+
+    return digest, True
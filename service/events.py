@@ -0,0 +1,378 @@
+"""
+Live inquiry events over Server-Sent Events.
+
+Inquiry changes are recorded as InquiryEvent rows when their transaction
+commits: created, transcribed, answered, status changed, and the owner's
+unread-answer count changed. Writing to the database is what makes the
+feed work across worker processes: whichever process saved the inquiry,
+every process sees the row.
+
+Each process runs one EventBus task while it has listeners. It polls for
+new rows every EVENTS_POLL_SECONDS and fans them out to the open streams,
+so the database cost does not grow with the number of dashboards open.
+Row ids are not always visible in commit order (on PostgreSQL a slower
+insert can commit after a higher id), so each poll also re-reads the rows
+created in the last EVENTS_OVERLAP_SECONDS and skips the ids it has
+already delivered.
+
+`event_stream` is a plain ASGI application routed from taibah_voice/asgi.py
+at /service/events/ (needs an ASGI server, like the dictation socket).
+Librarians receive every inquiry event; other users only the events of
+their own inquiries. A comment line is sent every EVENTS_HEARTBEAT_SECONDS
+so proxies keep the connection open. Event ids are row ids, so a browser
+reconnecting with `Last-Event-ID` is first sent what it missed (rows are
+kept for EVENTS_RETENTION_SECONDS), including rows created within
+EVENTS_OVERLAP_SECONDS of the last one it saw, which may have committed
+late with a lower id; clients skip ids they already handled. More than
+BACKLOG_LIMIT missed rows are not replayed: the client is sent a `reload`
+event instead. The dashboard renders the latest id into the page and
+opens the stream with ?last_event_id= so changes made between rendering
+and connecting are replayed.
+
+Wire format:
+
+    id: 42
+    event: answered
+    data: {"inquiry": 7, "title": ..., "status": "answered", ...}
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import counters
+from .dictation import load_user
+from .models import Inquiry, InquiryEvent
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = getattr(settings, 'EVENTS_POLL_SECONDS', 1.0)
+HEARTBEAT_SECONDS = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+RETENTION_SECONDS = getattr(settings, 'EVENTS_RETENTION_SECONDS', 3600)
+OVERLAP_SECONDS = getattr(settings, 'EVENTS_OVERLAP_SECONDS', 5)
+
+# Most events replayed to a reconnecting client; beyond it the client reloads
+BACKLOG_LIMIT = 500
+# Events buffered per stream before a slow client is dropped (it resumes)
+QUEUE_SIZE = 1000
+PRUNE_EVERY_SECONDS = 60
+RECONNECT_MS = 5000
+
+Kind = InquiryEvent.Kind
+
+
+# --------------------------------------------------
+# Publishing
+# --------------------------------------------------
+
+def _inquiry_data(instance):
+    return {
+        'inquiry': instance.pk,
+        'title': instance.title,
+        'status': instance.status,
+        'status_display': instance.get_status_display(),
+        'priority': instance.priority,
+    }
+
+
+def _unread(owner_id):
+    scope = counters.user_scope(owner_id)
+    return counters.get_counters([scope])[scope].unread
+
+
+def _is_unread(current):
+    return current['status'] == Inquiry.Status.ANSWERED and not current['is_read_by_user']
+
+
+def _kinds(before, after):
+    """Event kinds for an inquiry going from state `before` to `after`."""
+    if before is None:
+        return [Kind.CREATED]
+    if before['status'] == after['status']:
+        return []
+    if after['status'] == Inquiry.Status.TRANSCRIBED and before['status'] == Inquiry.Status.NEW:
+        return [Kind.TRANSCRIBED]
+    if after['status'] == Inquiry.Status.ANSWERED:
+        return [Kind.ANSWERED]
+    return [Kind.STATUS]
+
+
+def publish(instance, before, after):
+    """
+    Record the events of `instance` moving from counter state `before` to
+    `after` (see counters.state), once the current transaction commits.
+    """
+    publish_many([(instance, before, after)])
+
+
+def publish_many(changes):
+    """`publish()` for many (instance, before, after) triples, in one INSERT."""
+    events, unread_owners = [], {}
+    for instance, before, after in changes:
+        owner_id = after['created_by_id']
+        events.extend(
+            InquiryEvent(kind=kind, inquiry_id=instance.pk, owner_id=owner_id, data=_inquiry_data(instance))
+            for kind in _kinds(before, after)
+        )
+        if (before is not None and _is_unread(before)) != _is_unread(after):
+            # One count per owner, reported against their last changed inquiry
+            unread_owners[owner_id] = instance.pk
+    if not events and not unread_owners:
+        return
+
+    def record():
+        for owner_id, inquiry_id in unread_owners.items():
+            # Read after commit so the count includes this change
+            events.append(InquiryEvent(
+                kind=Kind.UNREAD, inquiry_id=inquiry_id, owner_id=owner_id,
+                to_librarians=False, data={'inquiry': inquiry_id, 'unread': _unread(owner_id)},
+            ))
+        InquiryEvent.objects.bulk_create(events)
+
+    transaction.on_commit(record)
+
+
+def inquiry_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    post_save receiver for Inquiry (connected in apps.py before the counters'
+    receiver, which replaces the pre-save state diffed here).
+    """
+    if raw:
+        return
+    before = None if created else getattr(instance, '_counter_state', None)
+    if before is None and not created:
+        return
+    publish(instance, before, counters.state(instance))
+
+
+# --------------------------------------------------
+# Reading
+# --------------------------------------------------
+
+def _row(event):
+    return event.pk, event.kind, event.owner_id, event.to_librarians, event.data
+
+
+def latest_id():
+    """Id of the newest event (0 if none), for a page to resume the stream from."""
+    return InquiryEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def _latest_id():
+    try:
+        return latest_id()
+    finally:
+        close_old_connections()
+
+
+def _events_after(last_id, user=None, limit=None, since=None):
+    """
+    Rows newer than `last_id`, plus any created from `since` on, oldest
+    first; only those `user` may see if given.
+    """
+    try:
+        recent = Q(pk__gt=last_id)
+        if since is not None:
+            recent |= Q(created_at__gte=since)
+        rows = InquiryEvent.objects.filter(recent)
+        if user is not None and not user.is_librarian():
+            rows = rows.filter(owner_id=user.pk)
+        elif user is not None:
+            rows = rows.filter(to_librarians=True)
+        rows = rows.order_by('pk')
+        if limit:
+            rows = rows[:limit]
+        return [_row(event) for event in rows]
+    finally:
+        close_old_connections()
+
+
+def _replay(last_id, user):
+    """
+    Rows a client that saw `last_id` may have missed: newer ids, and rows
+    created within OVERLAP_SECONDS of it. None if there are more than
+    BACKLOG_LIMIT.
+    """
+    try:
+        seen_at = InquiryEvent.objects.filter(pk=last_id).values_list('created_at', flat=True).first()
+    finally:
+        close_old_connections()
+    since = (seen_at or timezone.now()) - timedelta(seconds=OVERLAP_SECONDS)
+    rows = [row for row in _events_after(last_id, user, BACKLOG_LIMIT + 2, since) if row[0] != last_id]
+    return None if len(rows) > BACKLOG_LIMIT else rows
+
+
+def _prune():
+    try:
+        cutoff = timezone.now() - timedelta(seconds=RETENTION_SECONDS)
+        InquiryEvent.objects.filter(created_at__lt=cutoff).delete()
+    finally:
+        close_old_connections()
+
+
+class EventBus:
+    """Per-process fan-out of new InquiryEvent rows to the open streams."""
+
+    def __init__(self):
+        self._queues = set()
+        self._task = None
+        self._last_id = 0
+        self._last_prune = 0.0
+        # Event id -> monotonic time delivered, for ids the overlap re-reads
+        self._delivered = {}
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self._queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._queues.discard(queue)
+
+    async def _run(self):
+        # Rows already visible belong to the past: never deliver them
+        self._last_id = await sync_to_async(_latest_id)()
+        self._delivered = {
+            row[0]: time.monotonic()
+            for row in await sync_to_async(_events_after)(self._last_id, since=self._overlap_start())
+        }
+        while self._queues:
+            await asyncio.sleep(POLL_SECONDS)
+            try:
+                rows = await sync_to_async(_events_after)(self._last_id, since=self._overlap_start())
+                if time.monotonic() - self._last_prune > PRUNE_EVERY_SECONDS:
+                    self._last_prune = time.monotonic()
+                    await sync_to_async(_prune)()
+            except Exception:
+                logger.exception('Polling inquiry events failed')
+                continue
+            now = time.monotonic()
+            for row in rows:
+                if row[0] in self._delivered:
+                    continue
+                self._delivered[row[0]] = now
+                for queue in list(self._queues):
+                    try:
+                        queue.put_nowait(row)
+                    except asyncio.QueueFull:
+                        self._drop(queue)
+                self._last_id = max(self._last_id, row[0])
+            # Ids older than the overlap window are not read again
+            forget = now - 2 * OVERLAP_SECONDS
+            self._delivered = {pk: seen for pk, seen in self._delivered.items() if seen > forget}
+
+    @staticmethod
+    def _overlap_start():
+        return timezone.now() - timedelta(seconds=OVERLAP_SECONDS)
+
+    def _drop(self, queue):
+        """End a stream too slow to keep up; its client reconnects and resumes."""
+        self._queues.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+bus = EventBus()
+
+
+def _visible(row, user, librarian):
+    _, _, owner_id, to_librarians, _ = row
+    return to_librarians if librarian else owner_id == user.pk
+
+
+def _format(row):
+    event_id, kind, _, _, data = row
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'.encode()
+
+
+def _resume_id(scope):
+    """Last-Event-ID header (browser reconnect) or ?last_event_id= (first load)."""
+    headers = dict(scope.get('headers', []))
+    value = headers.get(b'last-event-id', b'').decode('latin-1')
+    if not value:
+        value = parse_qs(scope.get('query_string', b'').decode()).get('last_event_id', [''])[0]
+    return int(value) if value.isdigit() else None
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def event_stream(scope, receive, send):
+    """ASGI application for /service/events/."""
+    if scope['method'] != 'GET':
+        return await _respond(send, 405)
+    user = await sync_to_async(load_user)(scope)
+    if not user.is_authenticated:
+        return await _respond(send, 403)
+    librarian = user.is_librarian()
+
+    queue = bus.subscribe()
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': f'retry: {RECONNECT_MS}\n\n'.encode(), 'more_body': True})
+
+        last_id = _resume_id(scope)
+        replayed = set()
+        if last_id is not None:
+            rows = await sync_to_async(_replay)(last_id, user)
+            if rows is None:
+                # Too much was missed to patch the page event by event
+                await send({'type': 'http.response.body', 'body': b'event: reload\ndata: {}\n\n',
+                            'more_body': True})
+                rows = []
+            for row in rows:
+                await send({'type': 'http.response.body', 'body': _format(row), 'more_body': True})
+                replayed.add(row[0])
+
+        while not disconnect.done():
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get, disconnect}, timeout=HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if get not in done:
+                get.cancel()
+                if not disconnect.done():
+                    await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+                continue
+
+            row = get.result()
+            if row is None:
+                break
+            # The bus delivers each row once, but it may also have been replayed
+            # from the backlog. Late rows can carry lower ids than those sent.
+            if row[0] not in replayed and _visible(row, user, librarian):
+                await send({'type': 'http.response.body', 'body': _format(row), 'more_body': True})
+
+        if not disconnect.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        bus.unsubscribe(queue)
+        disconnect.cancel()
@@ -1,9 +1,65 @@
 from django import forms
+from django.contrib.auth import get_user_model
 
 from .models import GlossaryCategory, GlossaryTerm, Inquiry
 
 
 class InquiryCreateForm(forms.ModelForm):
+    # Id of a finished resumable upload (see uploads.py); replaces question_audio
+    audio_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.upload = None
+        self.audio_info = None
+
+    def clean_question_audio(self):
+        audio = self.cleaned_data.get('question_audio')
+        if not audio or not hasattr(audio, 'content_type'):
+            return audio
+
+        # Set by AudioUploadHandler while the file was streamed in
+        if getattr(audio, 'audio_error', None):
+            raise forms.ValidationError(audio.audio_error)
+        self.audio_info = getattr(audio, 'audio_info', None)
+        if self.audio_info is None:
+            from .audio import AudioProbeError, probe_stream
+            from .upload_handlers import audio_limits
+
+            try:
+                self.audio_info = probe_stream(audio, **audio_limits())
+            except AudioProbeError as e:
+                raise forms.ValidationError(str(e))
+            finally:
+                audio.seek(0)
+        return audio
+
+    def clean_audio_upload(self):
+        upload_id = self.cleaned_data.get('audio_upload')
+        if not upload_id:
+            return upload_id
+
+        from .audio import AudioProbeError
+        from .uploads import active_uploads, probe
+
+        self.upload = active_uploads(self.user).filter(pk=upload_id).first()
+        if self.upload is None or not self.upload.is_complete:
+            raise forms.ValidationError('لم يكتمل رفع الملف الصوتي، يرجى المحاولة مرة أخرى.')
+        try:
+            self.audio_info = probe(self.upload)
+        except AudioProbeError as e:
+            raise forms.ValidationError(str(e))
+        return upload_id
+
+    def save(self, commit=True):
+        inquiry = super().save(commit=False)
+        if self.audio_info:
+            inquiry.set_audio_info(self.audio_info)
+        if commit:
+            inquiry.save()
+        return inquiry
+
     class Meta:
         model = Inquiry
         fields = ('title', 'question_text', 'question_audio', 'priority')
@@ -82,6 +138,57 @@ class InquiryFilterForm(forms.Form):
     )
 
 
+class InquiryBulkForm(forms.Form):
+    """An operation for views.inquiry_bulk and the inquiries it applies to."""
+    ACTIONS = [
+        ('status', 'تغيير الحالة'),
+        ('close', 'إغلاق'),
+        ('priority', 'تغيير الأولوية'),
+        ('reassign', 'إسناد إلى أخصائي'),
+    ]
+
+    action = forms.ChoiceField(choices=ACTIONS)
+    status = forms.ChoiceField(required=False, choices=[('', '')] + list(Inquiry.Status.choices))
+    priority = forms.ChoiceField(required=False, choices=[('', '')] + list(Inquiry.Priority.choices))
+    librarian = forms.ModelChoiceField(required=False, queryset=get_user_model().objects.none())
+
+    # Targets: listed ids (comma separated), or the inquiries matching the filters
+    ids = forms.CharField(required=False)
+    filter_status = forms.ChoiceField(required=False, choices=[('', '')] + list(Inquiry.Status.choices))
+    filter_priority = forms.ChoiceField(required=False, choices=[('', '')] + list(Inquiry.Priority.choices))
+    search = forms.CharField(required=False)
+    created_after = forms.DateField(required=False)
+    created_before = forms.DateField(required=False)
+
+    FILTER_FIELDS = ('filter_status', 'filter_priority', 'search', 'created_after', 'created_before')
+    # The field holding each action's value
+    VALUE_FIELDS = {'status': 'status', 'priority': 'priority', 'reassign': 'librarian'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        User = get_user_model()
+        self.fields['librarian'].queryset = User.objects.filter(role=User.Role.LIBRARIAN, is_active=True)
+
+    def clean_ids(self):
+        raw = self.cleaned_data.get('ids', '').replace(',', ' ').split()
+        if not all(value.isdigit() for value in raw):
+            raise forms.ValidationError('أرقام الاستفسارات غير صالحة.')
+        return list(dict.fromkeys(int(value) for value in raw))
+
+    def clean(self):
+        cleaned = super().clean()
+        field = self.VALUE_FIELDS.get(cleaned.get('action'))
+        if field and not cleaned.get(field):
+            self.add_error(field, 'هذا الحقل مطلوب لهذه العملية.')
+        if not cleaned.get('ids') and not any(cleaned.get(name) for name in self.FILTER_FIELDS):
+            raise forms.ValidationError('حدد الاستفسارات بأرقامها أو بعامل تصفية واحد على الأقل.')
+        return cleaned
+
+    def value(self):
+        field = self.VALUE_FIELDS.get(self.cleaned_data['action'])
+        return self.cleaned_data[field] if field else None
+
+
 class GlossaryTermForm(forms.ModelForm):
     class Meta:
         model = GlossaryTerm
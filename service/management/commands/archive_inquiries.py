@@ -0,0 +1,42 @@
+"""
+Management command to move old closed inquiries into the archive.
+Usage: python manage.py archive_inquiries [--days 180] [--batch-size 500] [--dry-run]
+
+Run it periodically (e.g. nightly from cron) so service_inquiry holds only
+active inquiries (see service/archive.py).
+"""
+
+from django.core.management.base import BaseCommand
+
+from service import archive
+
+
+class Command(BaseCommand):
+    help = 'Move inquiries closed for longer than ARCHIVE_AFTER_DAYS into the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=archive.AFTER_DAYS,
+            help=f'Archive inquiries closed for longer than this (default: {archive.AFTER_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=archive.BATCH_SIZE,
+            help=f'Inquiries moved per transaction (default: {archive.BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the inquiries that would be archived without moving them',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archive.candidates(archive.cutoff(options['days'])).count()
+            self.stdout.write(self.style.SUCCESS(f'  {count} inquiries would be archived'))
+            return
+        count = archive.archive(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'  Archived {count} inquiries'))
@@ -0,0 +1,44 @@
+"""
+Management command to create transcription jobs for existing audio inquiries.
+Usage: python manage.py backfill_transcriptions [--enqueue-only] [--limit N]
+"""
+
+from django.core.management.base import BaseCommand
+
+from service.stt_jobs import backfill_candidates, enqueue, run_job
+
+
+class Command(BaseCommand):
+    help = 'Queue speech-to-text jobs for NEW inquiries that only have audio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue-only',
+            action='store_true',
+            help='Create the jobs but leave them for process_transcriptions',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Maximum number of inquiries to queue (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        inquiries = backfill_candidates()
+        if options['limit']:
+            inquiries = inquiries[:options['limit']]
+
+        jobs = [enqueue(inquiry, run=False) for inquiry in inquiries]
+        self.stdout.write(f'  Queued {len(jobs)} transcription jobs')
+
+        if options['enqueue_only']:
+            return
+
+        counts = {}
+        for job in jobs:
+            status = run_job(job.pk)
+            if status:
+                counts[status] = counts.get(status, 0) + 1
+        summary = ', '.join(f'{n} {status}' for status, n in sorted(counts.items())) or 'nothing'
+        self.stdout.write(self.style.SUCCESS(f'\nDone! Processed: {summary}'))
@@ -0,0 +1,394 @@
+"""
+Management command to benchmark speech-to-text accuracy and speed.
+Usage: python manage.py bench_stt [--corpus DIR] [--engine offline] [--concurrency 1,4,8]
+                                  [--output report.json] [--baseline previous.json]
+
+A corpus directory holds audio files (wav, ogg, webm, mp3, flac, ...) each
+with a UTF-8 reference transcript of the same name: `q01.ogg` + `q01.txt`.
+Without --corpus the offline engine runs on a synthetic corpus built from
+the fixed sentences below, which exercises the harness without network access.
+
+Engines are the STT backends (google, vosk, stub), 'chain' for the
+configured fallback order, and 'offline' for the corpus-aware stand-in.
+"""
+
+import hashlib
+import io
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from service.arabic import normalize_arabic, tokenize
+from service.audio import AudioDecodeError, pcm_to_wav, probe_stream
+from service.benchmarking import (
+    breakdown, environment, error_messages, request_counts, summary, write_report,
+)
+from service.stt_backends import BACKENDS
+from service.stt_service import STTService, get_stt_service
+
+
+# Reference sentences for the synthetic corpus
+CORPUS = [
+    ('greeting', 'مرحباً، أريد الاستفسار عن مواعيد عمل المكتبة المركزية.'),
+    ('borrowing', 'كم عدد الكتب التي يمكنني استعارتها في المرة الواحدة؟'),
+    ('catalog', 'أبحث عن كتاب في الفهرسة والتصنيف وفق نظام ديوي العشري.'),
+    ('databases', (
+        'هل تتوفر قواعد بيانات إلكترونية للرسائل الجامعية، وكيف يمكنني الوصول '
+        'إليها من خارج الحرم الجامعي باستخدام حسابي في البوابة؟'
+    )),
+    ('reference', (
+        'أحتاج إلى مساعدة في إعداد قائمة المراجع لبحث التخرج، فما هو أسلوب '
+        'التوثيق المعتمد في القسم، وهل تقدم المكتبة ورش عمل عن إدارة المراجع '
+        'وبرامجها مثل زوتيرو ومندلي؟'
+    )),
+]
+
+AUDIO_EXTENSIONS = ('.wav', '.ogg', '.opus', '.webm', '.mp3', '.m4a', '.mp4', '.flac', '.aiff', '.aif')
+
+# Duration buckets for the per-level breakdown
+LENGTHS = ((5, 'short'), (20, 'medium'), (float('inf'), 'long'))
+
+
+# --------------------------------------------------
+# Engine runners
+#
+# A runner is built once per benchmark with the corpus and called as
+# runner(audio_bytes, language); it returns the recognised text or raises.
+# --------------------------------------------------
+
+class ServiceRunner:
+    """
+    STTService limited to `backends` (None = the configured fallback
+    chain), with its result cache bypassed.
+    """
+
+    def __init__(self, corpus, backends=None):
+        self.service = STTService(backends)
+        if not self.service.is_available:
+            raise CommandError(f'STT backend not available: {", ".join(backends or ["chain"])}')
+
+    def __call__(self, data, language):
+        result = self.service.transcribe_bytes(data, language, use_cache=False)
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        return result['text']
+
+
+class OfflineRecognizer:
+    """
+    Deterministic stand-in that needs no network access.
+
+    Looks the audio up in the corpus by hash and returns its reference with
+    every DROP_EVERY-th word missing, so WER and CER are non-zero and stable.
+    Sleeps for a fixed setup cost plus a cost per second of audio.
+    """
+
+    SETUP_SECONDS = 0.05
+    SECONDS_PER_AUDIO_SECOND = 0.02
+    DROP_EVERY = 7
+
+    def __init__(self, corpus):
+        self.items = {item['sha256']: item for item in corpus}
+
+    def __call__(self, data, language):
+        item = self.items.get(hashlib.sha256(data).hexdigest())
+        if item is None:
+            raise LookupError('audio not in corpus')
+        time.sleep(self.SETUP_SECONDS + self.SECONDS_PER_AUDIO_SECOND * item['duration'])
+        words = item['reference'].split()
+        return ' '.join(w for i, w in enumerate(words, 1) if i % self.DROP_EVERY)
+
+
+RUNNERS = {
+    'chain': ServiceRunner,
+    **{name: partial(ServiceRunner, backends=[name]) for name in BACKENDS},
+    'offline': OfflineRecognizer,
+}
+
+# Engines that can run on the synthetic (near-silent) corpus
+SYNTHETIC_ENGINES = ('offline', 'stub')
+
+
+# --------------------------------------------------
+# Corpus
+# --------------------------------------------------
+
+def _corpus_item(item_id, data, reference):
+    try:
+        info = probe_stream(io.BytesIO(data))
+    except AudioDecodeError as e:
+        raise CommandError(f'{item_id}: {e}')
+    return {
+        'id': item_id,
+        'data': data,
+        'reference': reference.strip(),
+        'format': info['format'],
+        'duration': info['duration'] or 0.0,
+        'sha256': info['sha256'],
+    }
+
+
+def load_corpus(path):
+    """Read (audio, .txt reference) pairs from a directory, sorted by name."""
+    if not os.path.isdir(path):
+        raise CommandError(f'Corpus directory not found: {path}')
+
+    items = []
+    for name in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(name)
+        reference_path = os.path.join(path, stem + '.txt')
+        if ext.lower() not in AUDIO_EXTENSIONS or not os.path.exists(reference_path):
+            continue
+        with open(os.path.join(path, name), 'rb') as f:
+            data = f.read()
+        with open(reference_path, encoding='utf-8') as f:
+            items.append(_corpus_item(stem, data, f.read()))
+
+    if not items:
+        raise CommandError(f'No audio files with .txt references in {path}')
+    return items
+
+
+def synthetic_corpus(chars_per_second=14, sample_rate=16000):
+    """
+    Near-silent WAV per CORPUS sentence, as long as the sentence takes to
+    say. Each clip holds a different constant sample so no two hash alike.
+    """
+    return [
+        _corpus_item(item_id, pcm_to_wav(
+            struct.pack('<h', index) * int(len(text) / chars_per_second * sample_rate), sample_rate,
+        ), text)
+        for index, (item_id, text) in enumerate(CORPUS, 1)
+    ]
+
+
+def corpus_fingerprint(corpus):
+    """Hash of the audio and normalized references; equal hashes mean comparable runs."""
+    digest = hashlib.sha256()
+    for item in corpus:
+        digest.update(f'{item["id"]}\0{item["sha256"]}\0{normalize_arabic(item["reference"])}\n'.encode())
+    return digest.hexdigest()
+
+
+# --------------------------------------------------
+# Accuracy
+# --------------------------------------------------
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two sequences (words or characters)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,                # deletion
+                current[j - 1] + 1,             # insertion
+                previous[j - 1] + (ref != hyp),  # substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+def score(reference, hypothesis):
+    """Word and character edit counts after Arabic normalization."""
+    ref_words, hyp_words = tokenize(reference), tokenize(hypothesis)
+    ref_chars, hyp_chars = ' '.join(ref_words), ' '.join(hyp_words)
+    return {
+        'word_edits': edit_distance(ref_words, hyp_words),
+        'words': len(ref_words),
+        'char_edits': edit_distance(ref_chars, hyp_chars),
+        'chars': len(ref_chars),
+    }
+
+
+# --------------------------------------------------
+# Statistics helpers
+# --------------------------------------------------
+
+def _ratio(edits, total):
+    return round(edits / total, 4) if total else None
+
+
+def _aggregate(samples):
+    """
+    Failed requests count as empty transcripts for WER/CER, so an engine
+    cannot improve its accuracy by erroring on hard audio.
+    """
+    ok = [s for s in samples if s['error'] is None]
+    return {
+        **request_counts(samples),
+        'wer': _ratio(sum(s['word_edits'] for s in samples), sum(s['words'] for s in samples)),
+        'cer': _ratio(sum(s['char_edits'] for s in samples), sum(s['chars'] for s in samples)),
+        'latency_s': summary([s['latency'] for s in ok]),
+        'real_time_factor': summary([s['rtf'] for s in ok if s['rtf'] is not None]),
+    }
+
+
+def _length(duration):
+    return next(name for limit, name in LENGTHS if duration < limit)
+
+
+def compare(report, baseline):
+    """Per-level differences (this run minus baseline) for the headline metrics."""
+    previous = {level['concurrency']: level for level in baseline.get('levels', [])}
+    deltas = []
+    for level in report['levels']:
+        before = previous.get(level['concurrency'])
+        if before is None:
+            continue
+        delta = {'concurrency': level['concurrency']}
+        for key in ('wer', 'cer', 'error_rate', 'throughput_rps', 'audio_seconds_per_second'):
+            if level.get(key) is not None and before.get(key) is not None:
+                delta[key] = round(level[key] - before[key], 4)
+        for key in ('latency_s', 'real_time_factor'):
+            for pct in ('p50', 'p95'):
+                if level.get(key) and before.get(key):
+                    delta[f'{key}_{pct}'] = round(level[key][pct] - before[key][pct], 4)
+        deltas.append(delta)
+    return {
+        'baseline_created_at': baseline.get('created_at'),
+        'baseline_engine': baseline.get('engine'),
+        'same_corpus': baseline.get('corpus', {}).get('fingerprint') == report['corpus']['fingerprint'],
+        'levels': deltas,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark STT word/character error rate, latency and real-time factor (JSON report)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            default=getattr(settings, 'STT_BENCH_CORPUS_DIR', None),
+            help='Directory of audio files with .txt reference transcripts '
+                 '(default: STT_BENCH_CORPUS_DIR; the offline engine falls back to a synthetic corpus)',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=['auto', *RUNNERS],
+            default='auto',
+            help='Engine to benchmark: one backend, the configured fallback chain, or the '
+                 'offline stand-in (default: chain if available, else offline)',
+        )
+        parser.add_argument(
+            '--language',
+            default='ar-SA',
+            help='Recognition language (default: ar-SA)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='1,2,4,8',
+            help='Comma-separated concurrency levels (default: 1,2,4,8)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Times each corpus item is run per level',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Earlier JSON report to compare against',
+        )
+
+    def handle(self, *args, **options):
+        engine = options['engine']
+        if engine == 'auto':
+            engine = 'chain' if get_stt_service().is_available else 'offline'
+
+        try:
+            levels = [int(n) for n in options['concurrency'].split(',') if n.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+        if not levels or min(levels) < 1:
+            raise CommandError('--concurrency levels must be positive')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline report: {e}')
+
+        if options['corpus']:
+            corpus = load_corpus(options['corpus'])
+        elif engine in SYNTHETIC_ENGINES:
+            corpus = synthetic_corpus()
+        else:
+            raise CommandError(f'--corpus is required for the {engine} engine')
+
+        runner = RUNNERS[engine](corpus)
+        cases = corpus * max(options['repeat'], 1)
+
+        report = {
+            'benchmark': 'stt',
+            'created_at': timezone.now().isoformat(),
+            'engine': engine,
+            'language': options['language'],
+            'environment': environment(),
+            'corpus': {
+                'path': options['corpus'] or 'synthetic',
+                'items': len(corpus),
+                'audio_seconds': round(sum(item['duration'] for item in corpus), 2),
+                'words': sum(len(tokenize(item['reference'])) for item in corpus),
+                'fingerprint': corpus_fingerprint(corpus),
+            },
+            'levels': [
+                self._run_level(runner, cases, level, options['language']) for level in levels
+            ],
+        }
+        if isinstance(runner, ServiceRunner):
+            report['backends'] = runner.service.registry.status()
+        if baseline is not None:
+            report['comparison'] = compare(report, baseline)
+
+        write_report(self, report, options['output'])
+
+    def _run_level(self, runner, cases, level, language):
+        def _one(item):
+            sample = {
+                'item': item['id'], 'length': _length(item['duration']), 'format': item['format'],
+                'duration': item['duration'], 'latency': None, 'rtf': None, 'error': None,
+            }
+            start = time.perf_counter()
+            try:
+                hypothesis = runner(item['data'], language)
+                sample['latency'] = time.perf_counter() - start
+                if item['duration'] > 0:
+                    sample['rtf'] = sample['latency'] / item['duration']
+            except Exception as e:
+                sample['error'] = f'{type(e).__name__}: {e}'
+                hypothesis = ''
+            sample.update(score(item['reference'], hypothesis))
+            return sample
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            samples = list(pool.map(_one, cases))
+        wall = time.perf_counter() - wall_start
+
+        result = {'concurrency': level, 'wall_time_s': round(wall, 4)}
+        result.update(_aggregate(samples))
+        result['throughput_rps'] = round(len(samples) / wall, 3) if wall else None
+        result['audio_seconds_per_second'] = (
+            round(sum(s['duration'] for s in samples) / wall, 3) if wall else None
+        )
+
+        result['by'] = breakdown(samples, ('length', 'format', 'item'), _aggregate)
+
+        errors = error_messages(samples)
+        if errors:
+            result['error_messages'] = errors
+        return result
@@ -0,0 +1,273 @@
+"""
+Management command to benchmark the TTS engines.
+Usage: python manage.py bench_tts [--engine offline] [--concurrency 1,4,8] [--output report.json]
+"""
+
+import asyncio
+import os
+import shutil
+import struct
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from service.audio import audio_duration
+from service.benchmarking import (
+    breakdown, environment, error_messages, request_counts, summary, write_report,
+)
+from service.tts_service import EDGE_SPEED, EDGE_VOICES, TTSService, get_tts_service
+
+
+# Fixed corpus so that runs are comparable across releases
+CORPUS = [
+    ('short', 'مرحباً بك في منصة طيبة الصوتية.'),
+    ('medium', (
+        'تقدم المكتبة المركزية خدمات البحث والإعارة والخدمة المرجعية لجميع '
+        'المستفيدين، ويمكنك إرسال استفسارك كتابياً أو صوتياً وسيجيبك أخصائي المكتبة.'
+    )),
+    ('long', (
+        'الفهرسة هي عملية وصف مصادر المعلومات وفقاً لقواعد ومعايير محددة لتسهيل '
+        'الوصول إليها. ويعتمد التصنيف على ترتيب مصادر المعلومات في فئات ومجموعات '
+        'منطقية وفقاً لنظام تصنيف محدد مثل تصنيف ديوي العشري أو تصنيف مكتبة الكونجرس. '
+        'أما الخدمة المرجعية فهي مساعدة المستفيدين في العثور على المعلومات التي '
+        'يحتاجونها من خلال المصادر المرجعية كالموسوعات والقواميس والأدلة، وتشمل '
+        'أيضاً الإرشاد إلى قواعد البيانات والمستودعات الرقمية المتاحة عبر الإنترنت.'
+    )),
+]
+
+VOICES = ('female', 'male')
+SPEEDS = ('slow', 'normal', 'fast')
+
+
+# --------------------------------------------------
+# Engine runners
+#
+# Each runner writes the audio for one request to output_path and returns
+# the perf_counter() timestamp at which the first audio byte arrived.
+# --------------------------------------------------
+
+def _run_edge(text, voice, speed, output_path):
+    import edge_tts
+
+    async def _generate():
+        communicate = edge_tts.Communicate(
+            text=text,
+            voice=EDGE_VOICES[voice],
+            rate=EDGE_SPEED[speed],
+        )
+        first_byte = None
+        with open(output_path, 'wb') as f:
+            async for chunk in communicate.stream():
+                if chunk['type'] != 'audio':
+                    continue
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                f.write(chunk['data'])
+        return first_byte
+
+    return asyncio.run(_generate())
+
+
+def _run_gtts(text, voice, speed, output_path):
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang='ar', tld='com' if voice == 'female' else 'co.uk',
+               slow=speed == 'slow')
+    first_byte = None
+    with open(output_path, 'wb') as f:
+        for chunk in tts.stream():
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            f.write(chunk)
+    return first_byte
+
+
+class OfflineEngine:
+    """
+    Deterministic stand-in that needs no network access.
+
+    Sleeps for a fixed setup cost plus a per-character cost, then writes
+    silent 16 kHz mono WAV audio whose length follows the text length.
+    """
+
+    SETUP_SECONDS = 0.05
+    SECONDS_PER_CHAR = 0.0005
+    CHARS_PER_SECOND = {'slow': 10, 'normal': 14, 'fast': 18}
+    SAMPLE_RATE = 16000
+
+    def __call__(self, text, voice, speed, output_path):
+        time.sleep(self.SETUP_SECONDS)
+        first_byte = time.perf_counter()
+        time.sleep(self.SECONDS_PER_CHAR * len(text))
+
+        frames = int(len(text) / self.CHARS_PER_SECOND[speed] * self.SAMPLE_RATE)
+        with wave.open(output_path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(struct.pack('<h', 0) * frames)
+        return first_byte
+
+
+RUNNERS = {
+    'edge-tts': _run_edge,
+    'gtts': _run_gtts,
+    'offline': OfflineEngine(),
+}
+
+
+# --------------------------------------------------
+# Statistics helpers
+# --------------------------------------------------
+
+def _aggregate(samples):
+    ok = [s for s in samples if s['error'] is None]
+    return {
+        **request_counts(samples),
+        'latency_s': summary([s['latency'] for s in ok]),
+        'ttfb_s': summary([s['ttfb'] for s in ok if s['ttfb'] is not None]),
+        'real_time_factor': summary([s['rtf'] for s in ok if s['rtf'] is not None]),
+        'audio_bytes_per_second': summary(
+            [s['bytes_per_second'] for s in ok if s['bytes_per_second'] is not None], 1
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark TTS latency, time-to-first-byte and real-time factor (JSON report)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--engine',
+            choices=['auto', 'edge-tts', 'gtts', 'offline'],
+            default='auto',
+            help='Engine to benchmark (default: the configured engine, or offline if none)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='1,2,4,8',
+            help='Comma-separated concurrency levels (default: 1,2,4,8)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Times each corpus/voice/speed case is run per level',
+        )
+        parser.add_argument(
+            '--cache-lookups',
+            type=int,
+            default=200,
+            help='Number of cache-hit lookups used to measure cache hit cost',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+
+    def handle(self, *args, **options):
+        engine = options['engine']
+        if engine == 'auto':
+            engine = get_tts_service().get_engine_info()['engine'] or 'offline'
+        runner = RUNNERS[engine]
+
+        try:
+            levels = [int(n) for n in options['concurrency'].split(',') if n.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+        if not levels or min(levels) < 1:
+            raise CommandError('--concurrency levels must be positive')
+
+        cases = [
+            (length, text, voice, speed)
+            for length, text in CORPUS
+            for voice in VOICES
+            for speed in SPEEDS
+        ] * max(options['repeat'], 1)
+
+        work_dir = tempfile.mkdtemp(prefix='bench_tts_')
+        try:
+            report = {
+                'benchmark': 'tts',
+                'created_at': timezone.now().isoformat(),
+                'engine': engine,
+                'environment': environment(),
+                'corpus': {length: len(text) for length, text in CORPUS},
+                'levels': [
+                    self._run_level(runner, cases, level, work_dir) for level in levels
+                ],
+                'cache_hit': self._measure_cache_hits(work_dir, options['cache_lookups']),
+            }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        write_report(self, report, options['output'])
+
+    def _run_level(self, runner, cases, level, work_dir):
+        level_dir = os.path.join(work_dir, f'c{level}')
+        os.makedirs(level_dir, exist_ok=True)
+
+        def _one(index, case):
+            length, text, voice, speed = case
+            path = os.path.join(level_dir, f'{index}.audio')
+            sample = {
+                'length': length, 'voice': voice, 'speed': speed,
+                'latency': None, 'ttfb': None, 'rtf': None,
+                'bytes_per_second': None, 'error': None,
+            }
+            start = time.perf_counter()
+            try:
+                first_byte = runner(text, voice, speed, path)
+                sample['latency'] = time.perf_counter() - start
+                if first_byte is not None:
+                    sample['ttfb'] = first_byte - start
+                with open(path, 'rb') as f:
+                    data = f.read()
+                duration = audio_duration(data)
+                if duration > 0:
+                    sample['rtf'] = sample['latency'] / duration
+                    sample['bytes_per_second'] = len(data) / duration
+            except Exception as e:
+                sample['error'] = f'{type(e).__name__}: {e}'
+            return sample
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            samples = list(pool.map(_one, range(len(cases)), cases))
+        wall = time.perf_counter() - wall_start
+
+        result = {'concurrency': level, 'wall_time_s': round(wall, 4)}
+        result.update(_aggregate(samples))
+        result['throughput_rps'] = round(len(samples) / wall, 3) if wall else None
+
+        result['by'] = breakdown(samples, ('length', 'voice', 'speed'), _aggregate)
+
+        errors = error_messages(samples)
+        if errors:
+            result['error_messages'] = errors
+        return result
+
+    def _measure_cache_hits(self, work_dir, lookups):
+        """Time the TTSService cache-hit path (key hashing plus existence check)."""
+        cache_dir = os.path.join(work_dir, 'cache')
+        os.makedirs(cache_dir, exist_ok=True)
+
+        service = TTSService()
+        service.output_dir = cache_dir
+
+        keys = [(text, voice, speed) for _, text in CORPUS for voice in VOICES for speed in SPEEDS]
+        for text, voice, speed in keys:
+            open(service._cache_path(text, voice, speed), 'wb').close()
+
+        timings = []
+        for i in range(max(lookups, 1)):
+            text, voice, speed = keys[i % len(keys)]
+            start = time.perf_counter()
+            service.synthesize(text, voice, speed)
+            timings.append(time.perf_counter() - start)
+
+        return {'lookups': len(timings), 'latency_s': summary(timings, 7)}
@@ -0,0 +1,60 @@
+"""
+Management command to build the daily audio digest of unread answers.
+Usage: python manage.py build_answer_digests [--user USERNAME] [--voice male]
+
+Intended to run off-peak (e.g. from cron at night) so synthesis load does
+not compete with interactive TTS requests.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from service.digest import build_digest, recipients
+
+
+class Command(BaseCommand):
+    help = 'Build one narrated digest per blind user with unread answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only build the digest for this username',
+        )
+        parser.add_argument(
+            '--voice',
+            choices=['female', 'male'],
+            default='female',
+            help='Voice used for the digest (default: female)',
+        )
+
+    def handle(self, *args, **options):
+        users = recipients()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(
+                    f'No unread answers for "{options["user"]}" or notifications are disabled'
+                )
+
+        built = reused = failed = 0
+        for user in users:
+            try:
+                digest, created = build_digest(user, voice=options['voice'])
+            except Exception as e:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f'  Failed: {user.username} ({e})'))
+                continue
+
+            if digest is None:
+                continue
+            if created:
+                built += 1
+                self.stdout.write(
+                    f'  Built: {user.username} ({digest.inquiry_count} answers)'
+                )
+            else:
+                reused += 1
+                self.stdout.write(f'  Up to date: {user.username}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDone! Built {built} digests, {reused} already up to date, {failed} failed.'
+        ))
@@ -0,0 +1,115 @@
+"""
+Management command that guards the query plans of the hot Inquiry queries.
+Usage: python manage.py check_query_plans [--verbose-plans]
+
+Each query below is EXPLAINed against the current database. The command
+fails (non-zero exit) if any of them reads a table by full scan, so a
+dropped index or a rewritten filter cannot silently regress to scanning
+the whole history. Run it in CI after `migrate`.
+
+SQLite reports `SCAN <table>` for a full scan. `SCAN <table> USING INDEX`
+walks the whole table in index order and only passes for LIMITed queries
+(the newest page of the dashboard). `SCAN <table> VIRTUAL TABLE INDEX`
+passes when FTS5 answers a MATCH from its full-text index. PostgreSQL
+reports `Seq Scan`. On PostgreSQL sequential scans are disabled for the
+check, since the planner prefers them on small tables anyway.
+"""
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from service.counters import today_range
+from service import archive, search
+from service.digest import unread_answers
+from service.models import ArchivedInquiry, Inquiry, TranscriptionJob
+from service.stt_jobs import STALE_AFTER, backfill_candidates, due_jobs
+
+
+def _plans():
+    # Unsaved; only its primary key ends up in the SQL
+    user = get_user_model()(pk=1)
+    start, end = today_range()
+    recent = Inquiry.objects.order_by('-created_at', '-pk')
+    return [
+        ('librarian dashboard', recent[:10]),
+        ('librarian dashboard, later page', recent.filter(
+            Q(created_at__lt=start) | Q(created_at=start, pk__lt=1000), created_at__lte=start,
+        )[:10]),
+        ('librarian dashboard by status', recent.filter(status=Inquiry.Status.NEW)[:10]),
+        ('librarian dashboard by priority', recent.filter(priority=Inquiry.Priority.URGENT)[:10]),
+        ('user dashboard', recent.filter(created_by=user.pk)[:10]),
+        ('user dashboard by status', recent.filter(created_by=user.pk, status=Inquiry.Status.ANSWERED)[:10]),
+        ('dashboard search', search.search(Inquiry.objects.all(), 'مكتبة')[:10]),
+        ('user dashboard search', search.search(Inquiry.objects.filter(created_by=user.pk), 'مكتبة')[:10]),
+        ('answered today', Inquiry.objects.filter(answered_at__gte=start, answered_at__lt=end)),
+        ('answers by librarian today', Inquiry.objects.filter(
+            answered_by=user.pk, answered_at__gte=start, answered_at__lt=end,
+        )),
+        ('unread answers (digest)', unread_answers(user)),
+        ('due transcription jobs', due_jobs()),
+        ('transcription backfill', backfill_candidates()),
+        ('stale transcription jobs', TranscriptionJob.objects.filter(
+            status=TranscriptionJob.Status.RUNNING, updated_at__lt=timezone.now() - STALE_AFTER,
+        )),
+        ('archive candidates', archive.candidates(archive.cutoff())[:archive.BATCH_SIZE]),
+        ('archive', ArchivedInquiry.objects.order_by('-created_at', '-pk')[:10]),
+        ('user archive', ArchivedInquiry.objects.filter(created_by=user.pk).order_by('-created_at', '-pk')[:10]),
+        ('archive search', search.search(ArchivedInquiry.objects.all(), 'مكتبة')[:10]),
+    ]
+
+
+def _full_scans(plan, limited):
+    """Table names read by full scan in an EXPLAIN output."""
+    if connection.vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if connection.vendor == 'sqlite':
+        return [
+            m.group(1) for m in re.finditer(r'SCAN (\w+)(.*)', plan)
+            if m.group(1) != 'CONSTANT'
+            # FTS5 lookups through the full-text index (MATCH constraint)
+            and not re.match(r' VIRTUAL TABLE INDEX \d+:\S*M', m.group(2))
+            and not ('USING' in m.group(2) and (limited or 'COVERING' in m.group(2)))
+        ]
+    return []
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot Inquiry queries and fail if any does a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print every plan, not only failing ones',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.stdout.write(self.style.WARNING(f'  Plan checks are not implemented for {connection.vendor}'))
+            return
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in _plans():
+                plan = queryset.explain()
+                scans = _full_scans(plan, limited=queryset.query.high_mark is not None)
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'  FULL SCAN  {name}: {", ".join(scans)}'))
+                else:
+                    self.stdout.write(f'  ok         {name}')
+                if scans or options['verbose_plans']:
+                    self.stdout.write('\n'.join(f'               {line}' for line in plan.splitlines()))
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries fall back to a full table scan')
+        self.stdout.write(self.style.SUCCESS('  All query plans use indexes'))
@@ -0,0 +1,50 @@
+"""
+Management command to run pending background transcription jobs.
+Usage: python manage.py process_transcriptions [--loop] [--interval 30]
+
+Jobs normally run inside the web process. This command picks up retries
+and jobs that were left behind when a process restarted.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from service.stt_jobs import due_jobs, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run due speech-to-text jobs for uploaded question audio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for due jobs instead of exiting',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between polls in --loop mode (default: 30)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'  Requeued {requeued} stale jobs'))
+
+            counts = {}
+            for job_id in list(due_jobs().values_list('pk', flat=True)):
+                status = run_job(job_id)
+                if status:
+                    counts[status] = counts.get(status, 0) + 1
+
+            if counts:
+                summary = ', '.join(f'{n} {status}' for status, n in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f'  Processed: {summary}'))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
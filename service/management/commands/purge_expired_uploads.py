@@ -0,0 +1,18 @@
+"""
+Management command to delete abandoned resumable uploads.
+Usage: python manage.py purge_expired_uploads
+
+Run it periodically (e.g. hourly from cron) to free the assembly area.
+"""
+
+from django.core.management.base import BaseCommand
+
+from service.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired resumable audio uploads and their partial files'
+
+    def handle(self, *args, **options):
+        purged = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'  Purged {purged} expired uploads'))
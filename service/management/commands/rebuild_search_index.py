@@ -0,0 +1,22 @@
+"""
+Management command to rebuild the inquiry full-text search table.
+Usage: python manage.py rebuild_search_index
+
+The table normally follows every change (see service/search.py). Run this
+after raw SQL or bulk imports, or after changing the Arabic normalization.
+"""
+
+from django.core.management.base import BaseCommand
+
+from service import search
+
+
+class Command(BaseCommand):
+    help = 'Re-index every inquiry in the full-text search table'
+
+    def handle(self, *args, **options):
+        if search.search_table() is None:
+            self.stdout.write(self.style.WARNING('  No search table on this database; search uses icontains'))
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'  Indexed {count} inquiries'))
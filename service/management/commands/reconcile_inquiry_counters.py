@@ -0,0 +1,33 @@
+"""
+Management command to repair drift in the denormalized inquiry counters.
+Usage: python manage.py reconcile_inquiry_counters [--dry-run]
+
+Counters normally follow every change (see service/counters.py). Run this
+after raw SQL or bulk imports, or periodically (e.g. nightly from cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from service.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute inquiry counters from the Inquiry table and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without fixing it',
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(dry_run=options['dry_run'])
+        for scope, fields in sorted(drift.items()):
+            changes = ', '.join(
+                f'{field}: {stored} -> {actual}' for field, (stored, actual) in sorted(fields.items())
+            )
+            self.stdout.write(f'  {scope}: {changes}')
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'  {verb} drift in {len(drift)} counter rows'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audio', models.FileField(upload_to='digests/%Y/%m/', verbose_name='الملف الصوتي')),
+                ('inquiry_count', models.PositiveIntegerField(default=0, verbose_name='عدد الإجابات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('inquiries', models.ManyToManyField(blank=True, related_name='digests', to='service.inquiry', verbose_name='الاستفسارات')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_digests', to=settings.AUTH_USER_MODEL, verbose_name='المستفيد')),
+            ],
+            options={
+                'verbose_name': 'ملخص صوتي',
+                'verbose_name_plural': 'الملخصات الصوتية',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0002_answerdigest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'بالانتظار'), ('running', 'قيد التنفيذ'), ('done', 'مكتملة'), ('failed', 'فشلت')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('language', models.CharField(default='ar-SA', max_length=10, verbose_name='اللغة')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('next_attempt_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='موعد المحاولة التالية')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='آخر خطأ')),
+                ('engine', models.CharField(blank=True, default='', max_length=50, verbose_name='المحرك')),
+                ('confidence', models.FloatField(blank=True, null=True, verbose_name='درجة الثقة')),
+                ('audio_seconds', models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)')),
+                ('processing_seconds', models.FloatField(blank=True, null=True, verbose_name='مدة المعالجة (ث)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('inquiry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transcription_job', to='service.inquiry', verbose_name='الاستفسار')),
+            ],
+            options={
+                'verbose_name': 'مهمة تفريغ',
+                'verbose_name_plural': 'مهام التفريغ',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
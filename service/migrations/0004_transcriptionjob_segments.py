@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0003_transcriptionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptionjob',
+            name='segments',
+            field=models.JSONField(blank=True, default=list, verbose_name='المقاطع'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:11
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0004_transcriptionjob_segments'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('length', models.PositiveBigIntegerField(verbose_name='الحجم الكلي (بايت)')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='ما تم استلامه (بايت)')),
+                ('sha256', models.CharField(blank=True, default='', max_length=64, verbose_name='بصمة SHA-256')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='ينتهي في')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='اكتمل في')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_uploads', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'رفع صوتي',
+                'verbose_name_plural': 'عمليات الرفع الصوتي',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0005_audioupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiry',
+            name='audio_codec',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='الترميز'),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='audio_duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)'),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='audio_format',
+            field=models.CharField(blank=True, default='', max_length=10, verbose_name='صيغة الملف الصوتي'),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='audio_sha256',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='بصمة الملف'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0006_inquiry_audio_info'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=30, unique=True, verbose_name='النطاق')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='الإجمالي')),
+                ('new', models.PositiveIntegerField(default=0, verbose_name='جديد')),
+                ('transcribed', models.PositiveIntegerField(default=0, verbose_name='تم التفريغ')),
+                ('in_progress', models.PositiveIntegerField(default=0, verbose_name='قيد المعالجة')),
+                ('answered', models.PositiveIntegerField(default=0, verbose_name='تمت الإجابة')),
+                ('closed', models.PositiveIntegerField(default=0, verbose_name='مغلق')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='إجابات غير مقروءة')),
+                ('answers', models.PositiveIntegerField(default=0, verbose_name='إجابات أخصائي المكتبة')),
+                ('answered_today', models.PositiveIntegerField(default=0, verbose_name='إجابات اليوم')),
+                ('answered_today_date', models.DateField(blank=True, null=True, verbose_name='تاريخ إجابات اليوم')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inquiry_counter', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'عدّاد استفسارات',
+                'verbose_name_plural': 'عدادات الاستفسارات',
+            },
+        ),
+    ]
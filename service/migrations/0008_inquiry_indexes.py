@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0007_inquirycounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['-created_at'], name='inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['status', '-created_at'], name='inquiry_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['priority', '-created_at'], name='inquiry_priority_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['created_by', '-created_at'], name='inquiry_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['created_by', 'status', '-created_at'], name='inquiry_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['answered_at'], name='inquiry_answered_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['answered_by', 'answered_at'], name='inquiry_answerer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(condition=models.Q(('is_read_by_user', False), ('status', 'answered')), fields=['created_by', 'answered_at'], name='inquiry_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptionjob',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='job_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transcriptionjob',
+            index=models.Index(fields=['status', 'updated_at'], name='job_status_updated_idx'),
+        ),
+    ]
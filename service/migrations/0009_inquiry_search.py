@@ -0,0 +1,83 @@
+"""
+Full-text search table for inquiries (see service/search.py).
+
+SQLite gets an FTS5 virtual table, PostgreSQL a tsvector table with a GIN
+index. Other databases, and SQLite builds without FTS5, get nothing and
+search falls back to `icontains` filters. Existing inquiries are indexed.
+"""
+
+from django.db import OperationalError, migrations
+
+from service.arabic import normalize_arabic
+
+TEXT_FIELDS = ('title', 'question_text', 'transcription_text', 'answer_text')
+
+
+def create_search_table(apps, schema_editor):
+    connection = schema_editor.connection
+    Inquiry = apps.get_model('service', 'Inquiry')
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'CREATE VIRTUAL TABLE service_inquiry_fts USING fts5('
+                    'title, question_text, transcription_text, answer_text, '
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            except OperationalError:
+                # SQLite compiled without FTS5
+                return
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'CREATE TABLE service_inquiry_search ('
+                'inquiry_id bigint PRIMARY KEY REFERENCES service_inquiry (id) '
+                'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                "body text NOT NULL DEFAULT '', "
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                'CREATE INDEX service_inquiry_search_document_idx '
+                'ON service_inquiry_search USING gin (document)'
+            )
+        else:
+            return
+
+        for row in Inquiry.objects.order_by('pk').values_list('pk', *TEXT_FIELDS).iterator():
+            pk, *document = row
+            document = [normalize_arabic(text or '') for text in document]
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'INSERT INTO service_inquiry_fts '
+                    '(rowid, title, question_text, transcription_text, answer_text) '
+                    'VALUES (%s, %s, %s, %s, %s)',
+                    [pk, *document],
+                )
+            else:
+                title, *rest = document
+                cursor.execute(
+                    'INSERT INTO service_inquiry_search (inquiry_id, body, document) '
+                    "VALUES (%s, %s, setweight(to_tsvector('simple', %s), 'A') "
+                    "|| setweight(to_tsvector('simple', %s), 'B'))",
+                    [pk, ' … '.join(t for t in document if t), title, ' '.join(t for t in rest if t)],
+                )
+
+
+def drop_search_table(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('DROP TABLE IF EXISTS service_inquiry_fts')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP TABLE IF EXISTS service_inquiry_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0008_inquiry_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0009_inquiry_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inquiry',
+            name='inquiry_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inquiry',
+            name='inquiry_status_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inquiry',
+            name='inquiry_priority_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inquiry',
+            name='inquiry_owner_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='inquiry',
+            name='inquiry_owner_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='glossaryterm',
+            index=models.Index(fields=['term', 'id'], name='glossary_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='glossaryterm',
+            index=models.Index(fields=['category', 'term', 'id'], name='glossary_category_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['-created_at', '-id'], name='inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='inquiry_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['priority', '-created_at', '-id'], name='inquiry_priority_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='inquiry_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inquiry',
+            index=models.Index(fields=['created_by', 'status', '-created_at', '-id'], name='inquiry_owner_status_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0010_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='الوقت')),
+                ('kind', models.CharField(choices=[('created', 'استفسار جديد'), ('transcribed', 'تم التفريغ'), ('answered', 'تمت الإجابة'), ('status', 'تغيير الحالة'), ('unread', 'تغيّر عدد الردود غير المقروءة')], max_length=20, verbose_name='النوع')),
+                ('inquiry_id', models.BigIntegerField(blank=True, null=True, verbose_name='الاستفسار')),
+                ('owner_id', models.BigIntegerField(verbose_name='صاحب الاستفسار')),
+                ('to_librarians', models.BooleanField(default=True, verbose_name='يُرسل لأخصائيي المكتبة')),
+                ('data', models.JSONField(default=dict, verbose_name='البيانات')),
+            ],
+            options={
+                'verbose_name': 'حدث استفسار',
+                'verbose_name_plural': 'أحداث الاستفسارات',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0011_inquiryevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('claimed_at', models.DateTimeField(verbose_name='وقت الحجز')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='ينتهي الحجز')),
+                ('claimed_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inquiry_claims', to=settings.AUTH_USER_MODEL, verbose_name='أخصائي المكتبة')),
+                ('inquiry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='claim', to='service.inquiry', verbose_name='الاستفسار')),
+            ],
+            options={
+                'verbose_name': 'حجز استفسار',
+                'verbose_name_plural': 'حجوزات الاستفسارات',
+            },
+        ),
+    ]
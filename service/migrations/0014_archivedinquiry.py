@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def detach_search_table(apps, schema_editor):
+    # Archived inquiries keep their search row (see service/archive.py), so
+    # it must not be deleted with the service_inquiry row
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE IF EXISTS service_inquiry_search '
+            'DROP CONSTRAINT IF EXISTS service_inquiry_search_inquiry_id_fkey'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0013_inquiryclaim_assigned_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInquiry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='رقم الاستفسار')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(verbose_name='آخر تحديث')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الأرشفة')),
+                ('title', models.CharField(max_length=200, verbose_name='عنوان الاستفسار')),
+                ('question_text', models.TextField(blank=True, default='', verbose_name='نص السؤال')),
+                ('question_audio', models.FileField(blank=True, null=True, upload_to='inquiry_audio/%Y/%m/', verbose_name='تسجيل صوتي')),
+                ('audio_format', models.CharField(blank=True, default='', max_length=10, verbose_name='صيغة الملف الصوتي')),
+                ('audio_codec', models.CharField(blank=True, default='', max_length=20, verbose_name='الترميز')),
+                ('audio_duration', models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)')),
+                ('audio_sha256', models.CharField(blank=True, default='', max_length=64, verbose_name='بصمة الملف')),
+                ('transcription_text', models.TextField(blank=True, default='', verbose_name='نص التفريغ')),
+                ('answer_text', models.TextField(blank=True, default='', verbose_name='نص الإجابة')),
+                ('answered_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإجابة')),
+                ('status', models.CharField(choices=[('new', 'جديد'), ('transcribed', 'تم التفريغ'), ('in_progress', 'قيد المعالجة'), ('answered', 'تمت الإجابة'), ('closed', 'مغلق')], max_length=20, verbose_name='الحالة')),
+                ('priority', models.CharField(choices=[('low', 'منخفضة'), ('normal', 'عادية'), ('high', 'عالية'), ('urgent', 'عاجلة')], max_length=20, verbose_name='الأولوية')),
+                ('internal_notes', models.TextField(blank=True, default='', verbose_name='ملاحظات داخلية')),
+                ('answered_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_answers', to=settings.AUTH_USER_MODEL, verbose_name='أجاب عليه')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_inquiries', to=settings.AUTH_USER_MODEL, verbose_name='المستفسر')),
+            ],
+            options={
+                'verbose_name': 'استفسار مؤرشف',
+                'verbose_name_plural': 'أرشيف الاستفسارات',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='archive_created_idx'), models.Index(fields=['created_by', '-created_at', '-id'], name='archive_owner_created_idx')],
+            },
+        ),
+        migrations.RunPython(detach_search_table, migrations.RunPython.noop),
+    ]
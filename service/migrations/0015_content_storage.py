@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:59
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0014_archivedinquiry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedinquiry',
+            name='question_audio',
+            field=models.FileField(blank=True, null=True, storage=core.storage.content_storage, upload_to='inquiry_audio/%Y/%m/', verbose_name='تسجيل صوتي'),
+        ),
+        migrations.AlterField(
+            model_name='inquiry',
+            name='question_audio',
+            field=models.FileField(blank=True, null=True, storage=core.storage.content_storage, upload_to='inquiry_audio/%Y/%m/', verbose_name='تسجيل صوتي'),
+        ),
+    ]
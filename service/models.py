@@ -1,5 +1,10 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from core.storage import content_storage
 
 
 class GlossaryCategory(models.Model):
@@ -43,10 +48,15 @@ class Inquiry(models.Model):
     question_text = models.TextField(blank=True, default='', verbose_name='نص السؤال')
     question_audio = models.FileField(
         upload_to='inquiry_audio/%Y/%m/',
+        storage=content_storage,
         blank=True,
         null=True,
         verbose_name='تسجيل صوتي',
     )
+    audio_format = models.CharField(max_length=10, blank=True, default='', verbose_name='صيغة الملف الصوتي')
+    audio_codec = models.CharField(max_length=20, blank=True, default='', verbose_name='الترميز')
+    audio_duration = models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)')
+    audio_sha256 = models.CharField(max_length=64, blank=True, default='', verbose_name='بصمة الملف')
     transcription_text = models.TextField(blank=True, default='', verbose_name='نص التفريغ')
     answer_text = models.TextField(blank=True, default='', verbose_name='نص الإجابة')
     answered_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإجابة')
@@ -84,10 +94,322 @@ class Inquiry(models.Model):
         verbose_name = 'استفسار'
         verbose_name_plural = 'الاستفسارات'
         ordering = ['-created_at']
+        # Dashboard lists (by owner, status, priority; newest first), the
+        # "answered today" range and the unread-answers lookups. Checked by
+        # `manage.py check_query_plans`.
+        indexes = [
+            # The dashboard pages by (created_at, id) keyset; see pagination.py
+            models.Index(fields=['-created_at', '-id'], name='inquiry_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='inquiry_status_created_idx'),
+            models.Index(fields=['priority', '-created_at', '-id'], name='inquiry_priority_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='inquiry_owner_created_idx'),
+            models.Index(fields=['created_by', 'status', '-created_at', '-id'], name='inquiry_owner_status_idx'),
+            models.Index(fields=['answered_at'], name='inquiry_answered_at_idx'),
+            models.Index(fields=['answered_by', 'answered_at'], name='inquiry_answerer_idx'),
+            # Partial: only unread answers, a small slice of the table
+            models.Index(
+                fields=['created_by', 'answered_at'],
+                name='inquiry_unread_idx',
+                condition=models.Q(status='answered', is_read_by_user=False),
+            ),
+        ]
+
+    AUDIO_MIME_TYPES = {
+        'wav': 'audio/wav',
+        'mp3': 'audio/mpeg',
+        'opus': 'audio/ogg',
+        'ogg': 'audio/ogg',
+        'webm': 'audio/webm',
+        'mp4': 'audio/mp4',
+        'flac': 'audio/flac',
+        'aiff': 'audio/aiff',
+    }
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def audio_mime_type(self):
+        return self.AUDIO_MIME_TYPES.get(self.audio_format, 'audio/mpeg')
+
+    def set_audio_info(self, info):
+        """Copy the result of an AudioProbe (see audio.py) onto the inquiry."""
+        self.audio_format = info['format']
+        self.audio_codec = info['codec']
+        self.audio_duration = info['duration']
+        self.audio_sha256 = info['sha256']
+
+
+class TranscriptionJob(models.Model):
+    """مهمة تفريغ تلقائي للتسجيل الصوتي المرفق بالاستفسار"""
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'بالانتظار'
+        RUNNING = 'running', 'قيد التنفيذ'
+        DONE = 'done', 'مكتملة'
+        FAILED = 'failed', 'فشلت'
+
+    inquiry = models.OneToOneField(
+        Inquiry,
+        on_delete=models.CASCADE,
+        related_name='transcription_job',
+        verbose_name='الاستفسار',
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='الحالة',
+    )
+    language = models.CharField(max_length=10, default='ar-SA', verbose_name='اللغة')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='عدد المحاولات')
+    next_attempt_at = models.DateTimeField(
+        blank=True, null=True, db_index=True, verbose_name='موعد المحاولة التالية'
+    )
+    last_error = models.TextField(blank=True, default='', verbose_name='آخر خطأ')
+    engine = models.CharField(max_length=50, blank=True, default='', verbose_name='المحرك')
+    confidence = models.FloatField(blank=True, null=True, verbose_name='درجة الثقة')
+    audio_seconds = models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)')
+    processing_seconds = models.FloatField(blank=True, null=True, verbose_name='مدة المعالجة (ث)')
+    segments = models.JSONField(default=list, blank=True, verbose_name='المقاطع')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
+
+    class Meta:
+        verbose_name = 'مهمة تفريغ'
+        verbose_name_plural = 'مهام التفريغ'
+        ordering = ['-created_at']
+        indexes = [
+            # due_jobs() and requeue_stale()
+            models.Index(fields=['status', 'next_attempt_at'], name='job_status_due_idx'),
+            models.Index(fields=['status', 'updated_at'], name='job_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.inquiry} ({self.get_status_display()})'
+
+
+class AnswerDigest(models.Model):
+    """ملخص صوتي يجمع الإجابات غير المقروءة للمستفيد في ملف واحد"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='answer_digests',
+        verbose_name='المستفيد',
+    )
+    audio = models.FileField(upload_to='digests/%Y/%m/', verbose_name='الملف الصوتي')
+    inquiries = models.ManyToManyField(
+        Inquiry,
+        related_name='digests',
+        blank=True,
+        verbose_name='الاستفسارات',
+    )
+    inquiry_count = models.PositiveIntegerField(default=0, verbose_name='عدد الإجابات')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+
+    class Meta:
+        verbose_name = 'ملخص صوتي'
+        verbose_name_plural = 'الملخصات الصوتية'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.user} - {self.created_at:%Y/%m/%d}'
+
+
+class AudioUpload(models.Model):
+    """رفع صوتي قابل للاستئناف (على غرار بروتوكول tus) يُجمَّع قبل ربطه بالاستفسار"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='audio_uploads',
+        verbose_name='المستخدم',
+    )
+    filename = models.CharField(max_length=255, verbose_name='اسم الملف')
+    length = models.PositiveBigIntegerField(verbose_name='الحجم الكلي (بايت)')
+    offset = models.PositiveBigIntegerField(default=0, verbose_name='ما تم استلامه (بايت)')
+    sha256 = models.CharField(max_length=64, blank=True, default='', verbose_name='بصمة SHA-256')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='ينتهي في')
+    completed_at = models.DateTimeField(blank=True, null=True, verbose_name='اكتمل في')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+
+    class Meta:
+        verbose_name = 'رفع صوتي'
+        verbose_name_plural = 'عمليات الرفع الصوتي'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.length})'
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+
+class InquiryCounter(models.Model):
+    """عدادات الاستفسارات لكل مستخدم وعدّاد عام، تُحدَّث مع كل تغيير (انظر counters.py)"""
+    GLOBAL = 'global'
+
+    scope = models.CharField(max_length=30, unique=True, verbose_name='النطاق')
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='inquiry_counter',
+        verbose_name='المستخدم',
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name='الإجمالي')
+    new = models.PositiveIntegerField(default=0, verbose_name='جديد')
+    transcribed = models.PositiveIntegerField(default=0, verbose_name='تم التفريغ')
+    in_progress = models.PositiveIntegerField(default=0, verbose_name='قيد المعالجة')
+    answered = models.PositiveIntegerField(default=0, verbose_name='تمت الإجابة')
+    closed = models.PositiveIntegerField(default=0, verbose_name='مغلق')
+    unread = models.PositiveIntegerField(default=0, verbose_name='إجابات غير مقروءة')
+    answers = models.PositiveIntegerField(default=0, verbose_name='إجابات أخصائي المكتبة')
+    answered_today = models.PositiveIntegerField(default=0, verbose_name='إجابات اليوم')
+    answered_today_date = models.DateField(blank=True, null=True, verbose_name='تاريخ إجابات اليوم')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
+
+    class Meta:
+        verbose_name = 'عدّاد استفسارات'
+        verbose_name_plural = 'عدادات الاستفسارات'
+
+    def __str__(self):
+        return self.scope
+
+    @staticmethod
+    def user_scope(user_id):
+        return f'user:{user_id}'
+
+    @property
+    def pending(self):
+        return self.new + self.transcribed + self.in_progress
+
+
+class InquiryEvent(models.Model):
+    """حدث تغيير على استفسار يُبث إلى لوحات التحكم المفتوحة (انظر events.py)"""
+
+    class Kind(models.TextChoices):
+        CREATED = 'created', 'استفسار جديد'
+        TRANSCRIBED = 'transcribed', 'تم التفريغ'
+        ANSWERED = 'answered', 'تمت الإجابة'
+        STATUS = 'status', 'تغيير الحالة'
+        UNREAD = 'unread', 'تغيّر عدد الردود غير المقروءة'
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='الوقت')
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name='النوع')
+    # Plain ids: events outlive deleted inquiries until they are pruned
+    inquiry_id = models.BigIntegerField(null=True, blank=True, verbose_name='الاستفسار')
+    owner_id = models.BigIntegerField(verbose_name='صاحب الاستفسار')
+    to_librarians = models.BooleanField(default=True, verbose_name='يُرسل لأخصائيي المكتبة')
+    data = models.JSONField(default=dict, verbose_name='البيانات')
+
+    class Meta:
+        verbose_name = 'حدث استفسار'
+        verbose_name_plural = 'أحداث الاستفسارات'
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.kind} #{self.inquiry_id}'
+
+
+class InquiryClaim(models.Model):
+    """حجز أخصائي المكتبة لاستفسار يعمل عليه حتى انتهاء المهلة (انظر work_queue.py)"""
+    inquiry = models.OneToOneField(
+        Inquiry,
+        on_delete=models.CASCADE,
+        related_name='claim',
+        verbose_name='الاستفسار',
+    )
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='inquiry_claims',
+        verbose_name='أخصائي المكتبة',
+    )
+    claimed_at = models.DateTimeField(verbose_name='وقت الحجز')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='ينتهي الحجز')
+    # Set when another staff member handed the inquiry to `claimed_by`
+    assigned_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='أسنده',
+    )
+
+    class Meta:
+        verbose_name = 'حجز استفسار'
+        verbose_name_plural = 'حجوزات الاستفسارات'
+
+    def __str__(self):
+        return f'{self.inquiry_id} → {self.claimed_by_id}'
+
+    def is_active(self, now=None):
+        return self.expires_at > (now or timezone.now())
+
+
+class ArchivedInquiry(models.Model):
+    """
+    استفسار مغلق نُقل من الجدول النشط إلى الأرشيف (انظر archive.py).
+    يحتفظ بمعرّف الاستفسار الأصلي ومرجع تسجيله الصوتي.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='رقم الاستفسار')
+    created_at = models.DateTimeField(verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(verbose_name='آخر تحديث')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='تاريخ الأرشفة')
+    title = models.CharField(max_length=200, verbose_name='عنوان الاستفسار')
+    question_text = models.TextField(blank=True, default='', verbose_name='نص السؤال')
+    question_audio = models.FileField(
+        upload_to='inquiry_audio/%Y/%m/',
+        storage=content_storage,
+        blank=True,
+        null=True,
+        verbose_name='تسجيل صوتي',
+    )
+    audio_format = models.CharField(max_length=10, blank=True, default='', verbose_name='صيغة الملف الصوتي')
+    audio_codec = models.CharField(max_length=20, blank=True, default='', verbose_name='الترميز')
+    audio_duration = models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ث)')
+    audio_sha256 = models.CharField(max_length=64, blank=True, default='', verbose_name='بصمة الملف')
+    transcription_text = models.TextField(blank=True, default='', verbose_name='نص التفريغ')
+    answer_text = models.TextField(blank=True, default='', verbose_name='نص الإجابة')
+    answered_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإجابة')
+    status = models.CharField(max_length=20, choices=Inquiry.Status.choices, verbose_name='الحالة')
+    priority = models.CharField(max_length=20, choices=Inquiry.Priority.choices, verbose_name='الأولوية')
+    internal_notes = models.TextField(blank=True, default='', verbose_name='ملاحظات داخلية')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_inquiries',
+        verbose_name='المستفسر',
+    )
+    answered_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_answers',
+        verbose_name='أجاب عليه',
+    )
+
+    class Meta:
+        verbose_name = 'استفسار مؤرشف'
+        verbose_name_plural = 'أرشيف الاستفسارات'
+        ordering = ['-created_at']
+        # The archive list, for everyone and per owner, by (created_at, id) keyset
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='archive_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='archive_owner_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def audio_mime_type(self):
+        return Inquiry.AUDIO_MIME_TYPES.get(self.audio_format, 'audio/mpeg')
+
 
 class GlossaryTerm(models.Model):
     term = models.CharField(max_length=200, verbose_name='المصطلح')
@@ -120,6 +442,11 @@ class GlossaryTerm(models.Model):
         verbose_name = 'مصطلح'
         verbose_name_plural = 'المصطلحات'
         ordering = ['term']
+        indexes = [
+            # Keyset pagination of the glossary list, whole and by category
+            models.Index(fields=['term', 'id'], name='glossary_term_idx'),
+            models.Index(fields=['category', 'term', 'id'], name='glossary_category_term_idx'),
+        ]
 
     def __str__(self):
         return self.term
@@ -0,0 +1,117 @@
+"""
+Audio normalization stage for speech-to-text.
+
+Every upload is decoded once to trimmed 16 kHz mono PCM WAV, which is what
+the recognizer wants regardless of what the browser recorded. Decoding and
+resampling are CPU-bound, so they run in a small process pool instead of
+the request or background threads.
+
+The normalized copy of an inquiry's question audio is stored next to the
+original (`<sha256>.16k.wav`) so retries and re-transcriptions skip decoding.
+It is written with a plain FileSystemStorage, as content-addressed storage
+would name it by its own hash, and goes away with the original blob.
+A decode that exceeds AUDIO_NORMALIZE_TIMEOUT has its worker processes
+stopped and the pool replaced, so a stuck ffmpeg cannot hold a worker.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from core.storage import derived_name
+
+from .audio import AudioDecodeError, normalize_audio
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the web process runs threads, which fork does not copy safely
+                _pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'AUDIO_NORMALIZE_WORKERS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _pool
+
+
+def _reset_pool(pool, terminate=False):
+    """Replace `pool` on next use; `terminate` also stops its workers."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if terminate:
+        # Requests still running in the pool fail with BrokenProcessPool
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def normalize_bytes(data):
+    """
+    Normalize raw upload bytes in the process pool.
+
+    Returns:
+        (wav_bytes, info) as returned by audio.normalize_audio.
+
+    Raises:
+        AudioDecodeError: the upload cannot be decoded here.
+    """
+    ffmpeg = getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+    timeout = getattr(settings, 'AUDIO_NORMALIZE_TIMEOUT', 120)
+    pool = get_pool()
+    try:
+        future = pool.submit(normalize_audio, bytes(data), ffmpeg=ffmpeg)
+        return future.result(timeout=timeout)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise AudioDecodeError('توقفت عملية معالجة الصوت بشكل غير متوقع')
+    except FutureTimeoutError:
+        # The worker is still decoding; it would hold its slot indefinitely
+        _reset_pool(pool, terminate=True)
+        raise AudioDecodeError('انتهت مهلة معالجة الملف الصوتي')
+
+
+def normalized_name(name):
+    return derived_name(name, '16k', '.wav')
+
+
+def normalized_audio(inquiry):
+    """
+    Return normalized WAV bytes for the inquiry's question audio.
+
+    The result is stored beside the original on first use and read back
+    afterwards. Raises AudioDecodeError or OSError on failure.
+    """
+    field = inquiry.question_audio
+    storage = FileSystemStorage(location=field.storage.location)
+    name = normalized_name(field.name)
+
+    if storage.exists(name):
+        with storage.open(name, 'rb') as f:
+            return f.read()
+
+    with field.open('rb') as f:
+        data = f.read()
+    wav, info = normalize_bytes(data)
+    saved = storage.save(name, ContentFile(wav))
+    if saved != name:
+        # Normalized concurrently; the first copy is the one read back
+        storage.delete(saved)
+    logger.debug('Normalized %s (%s, %.1fs -> %.1fs)', field.name,
+                 info['format'], info['original_duration'], info['duration'])
+    return wav
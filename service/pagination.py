@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination.
+
+Django's Paginator counts the whole result set and reaches page N with
+OFFSET, so both get slower the deeper the page. KeysetPaginator orders by
+a unique key instead (e.g. created_at, id) and asks for the rows after, or
+before, the edge row of the current page, which an index answers directly
+at any depth. Rows inserted while someone pages through a list do not
+shift the later pages.
+
+Cursors are opaque URL-safe strings holding the key of the edge row. A
+malformed cursor starts over from the first page. Key columns must not be
+NULL.
+"""
+
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def _json_default(value):
+    # Full precision: a key rounded to milliseconds would skip or repeat rows
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot use {type(value).__name__} in a pagination key')
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterable like a Paginator page."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate `queryset` by `ordering`, a sequence of field or annotation
+    names as for order_by() ('-created_at', '-pk') whose values together
+    identify a row. Defaults to the queryset's own order_by().
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        ordering = ordering or queryset.query.order_by
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        """The page following cursor `after`, or preceding cursor `before`."""
+        backwards = bool(before)
+        key = self._decode(before if backwards else after)
+        if key is None:
+            backwards = False
+
+        queryset = self.queryset
+        if key is not None:
+            queryset = queryset.filter(self._seek(key, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = more if not backwards else True
+        has_previous = more if backwards else key is not None
+        return KeysetPage(
+            rows,
+            next_cursor=self._encode(rows[-1]) if rows and has_next else None,
+            previous_cursor=self._encode(rows[0]) if rows and has_previous else None,
+        )
+
+    def _seek(self, key, backwards):
+        """Rows strictly after `key` in the ordering (before it if `backwards`)."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, key):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # Redundant bound on the leading column, so the index seeks to the
+        # cursor instead of filtering every row before it
+        (name, descending), value = self.ordering[0], key[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{name}__{lookup}': value}) & condition
+
+    def _encode(self, row):
+        key = [getattr(row, name) for name, _ in self.ordering]
+        data = json.dumps(key, default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            key = json.loads(data)
+            if not isinstance(key, list) or len(key) != len(self.ordering):
+                return None
+            return [self._to_python(name, value) for (name, _), value in zip(self.ordering, key)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _to_python(self, name, value):
+        opts = self.queryset.model._meta
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation (e.g. a search rank); JSON keeps its value as is
+            return value
+        return field.to_python(value)
+
+
+def capped_count(queryset, cap):
+    """
+    Number of rows in `queryset`, counting no further than `cap`.
+    Returns (count, exact); when inexact the true count exceeds `cap`.
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count <= cap
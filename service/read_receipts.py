@@ -0,0 +1,138 @@
+"""
+Write-behind read receipts.
+
+Opening an inquiry marks it read: `is_read_by_librarian` when a librarian
+opens it, `is_read_by_user` when its owner opens their answer. Saving the
+flag on every page view turned browsing into a stream of single-row
+UPDATEs competing for the database write lock. Instead `mark_read()`
+records the read in this process and a background flush, at most
+READ_RECEIPT_FLUSH_SECONDS later, writes all pending reads of a kind with
+one UPDATE ... WHERE id IN (...). The detail page itself never writes.
+
+Owner reads change the unread-answer counters, so they are flushed through
+bulk.update(), which keeps the counters, event feed and dashboard figures
+in step. Librarian reads change nothing else and are a plain UPDATE.
+
+Until flushed, pending reads are overlaid on what this process reads:
+`overlay()` for inquiry rows and `pending_unread()` for the unread count.
+Other processes see the read when it is flushed. A read recorded just
+before a crash is lost and the answer shows as unread again. Setting
+READ_RECEIPT_FLUSH_SECONDS to 0 writes each read immediately.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import background, bulk, stats
+from .models import Inquiry
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = getattr(settings, 'READ_RECEIPT_FLUSH_SECONDS', 5)
+
+_lock = threading.Lock()
+# Inquiry ids opened by a librarian
+_librarian_reads = set()
+# Inquiry id -> (owner id, time read) for answers opened by their owner
+_owner_reads = {}
+_timer = None
+
+
+def mark_read(inquiry, librarian):
+    """Record that `inquiry` was opened, by a librarian or by its owner."""
+    if librarian:
+        if inquiry.is_read_by_librarian:
+            return
+        with _lock:
+            _librarian_reads.add(inquiry.pk)
+        inquiry.is_read_by_librarian = True
+    else:
+        if inquiry.is_read_by_user or inquiry.status != Inquiry.Status.ANSWERED:
+            return
+        with _lock:
+            _owner_reads[inquiry.pk] = (inquiry.created_by_id, timezone.now())
+        inquiry.is_read_by_user = True
+        # The owner's cached unread count now includes this read
+        stats.invalidate(inquiry.created_by_id)
+    _schedule()
+
+
+def overlay(inquiries):
+    """Show this process's pending reads on `inquiries` (fetched Inquiry rows)."""
+    with _lock:
+        for inquiry in inquiries:
+            if inquiry.pk in _librarian_reads:
+                inquiry.is_read_by_librarian = True
+            if inquiry.pk in _owner_reads:
+                inquiry.is_read_by_user = True
+    return inquiries
+
+
+def pending_unread(owner_id):
+    """Answers of `owner_id` read here but not yet flushed."""
+    with _lock:
+        return sum(1 for owner, _ in _owner_reads.values() if owner == owner_id)
+
+
+def _schedule():
+    global _timer
+    if FLUSH_SECONDS <= 0:
+        flush()
+        return
+    with _lock:
+        if _timer is not None:
+            return
+        _timer = background.schedule(FLUSH_SECONDS, flush)
+
+
+def flush():
+    """Write every pending read. Returns the number of inquiries updated."""
+    global _timer
+    with _lock:
+        librarian_reads, owner_reads = set(_librarian_reads), dict(_owner_reads)
+        _librarian_reads.clear()
+        _owner_reads.clear()
+        _timer = None
+    if not librarian_reads and not owner_reads:
+        return 0
+
+    updated = 0
+    try:
+        if librarian_reads:
+            updated += Inquiry.objects.filter(
+                pk__in=librarian_reads, is_read_by_librarian=False,
+            ).update(is_read_by_librarian=True)
+        if owner_reads:
+            started = timezone.now()
+            # An answer replaced after it was read is still unread
+            current = Inquiry.objects.filter(
+                pk__in=owner_reads, status=Inquiry.Status.ANSWERED,
+            ).values_list('pk', 'answered_at')
+            read = [
+                pk for pk, answered_at in current
+                if answered_at is None or answered_at <= owner_reads[pk][1]
+            ]
+            # ... including one replaced while this flush runs
+            not_replaced = Q(answered_at__isnull=True) | Q(answered_at__lte=started)
+            results = bulk.update(
+                Inquiry.objects.filter(not_replaced, pk__in=read, status=Inquiry.Status.ANSWERED),
+                touch=False, is_read_by_user=True,
+            )
+            updated += bulk.summary(results).get(bulk.UPDATED, 0)
+    except Exception:
+        logger.exception('Flushing read receipts failed; retrying')
+        with _lock:
+            _librarian_reads.update(librarian_reads)
+            for pk, entry in owner_reads.items():
+                _owner_reads.setdefault(pk, entry)
+        if FLUSH_SECONDS > 0:
+            _schedule()
+    return updated
+
+
+atexit.register(flush)
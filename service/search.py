@@ -0,0 +1,267 @@
+"""
+Full-text search over inquiries.
+
+The title, question, transcription and answer of every inquiry are copied,
+Arabic-normalized (see arabic.py), into a search table keyed by inquiry id:
+
+* SQLite: the FTS5 virtual table `service_inquiry_fts`, ranked with bm25().
+* PostgreSQL: `service_inquiry_search`, a tsvector column with a GIN index,
+  ranked with ts_rank().
+
+Both are created by migration 0009. Lookups go through the inverted index,
+so their cost follows the number of matches rather than the archive size.
+On other databases, or when SQLite lacks FTS5, search falls back to
+`icontains` filters.
+
+Result excerpts (`snippets()`) are cut from the inquiry's own text, not the
+normalized index: they are shown and read aloud to the user, so they keep
+the original spelling, hamza and punctuation. Words are matched in their
+normalized form, the same way the index matches them.
+
+Archived inquiries keep their id and their row (see archive.py), so the
+same table searches the archive: `search()` joins whichever of the two
+tables its queryset reads.
+
+The table follows Inquiry saves and deletes through signals (connected in
+apps.py). Bulk `.update()` calls of the text fields must call `index()`
+themselves; `manage.py rebuild_search_index` repairs any drift.
+"""
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .arabic import normalize_arabic, tokenize, word_spans
+from .models import ArchivedInquiry, Inquiry
+
+SQLITE_TABLE = 'service_inquiry_fts'
+POSTGRES_TABLE = 'service_inquiry_search'
+
+TEXT_FIELDS = ('title', 'question_text', 'transcription_text', 'answer_text')
+
+# bm25() column weights, in TEXT_FIELDS order
+_WEIGHTS = (5.0, 1.0, 1.0, 1.0)
+
+# Excerpt length, and the fields excerpts are taken from (ties go to the first)
+SNIPPET_WORDS = 16
+SNIPPET_FIELDS = ('question_text', 'transcription_text', 'answer_text', 'title')
+_SNIPPET_LEAD = 3
+
+_SPACES = re.compile(r'\s+')
+
+_tables = {}
+
+
+def search_table():
+    """The search table of the current database, or None if there is none."""
+    table = {'sqlite': SQLITE_TABLE, 'postgresql': POSTGRES_TABLE}.get(connection.vendor)
+    if table is None:
+        return None
+    if connection.alias not in _tables:
+        _tables[connection.alias] = table in connection.introspection.table_names()
+    return table if _tables[connection.alias] else None
+
+
+def _document(values):
+    return [normalize_arabic(values.get(field) or '') for field in TEXT_FIELDS]
+
+
+def _forms(word):
+    """A query word with and without the definite article."""
+    if word.startswith('ال') and len(word) > 3:
+        word = word[2:]
+    return word, f'ال{word}'
+
+
+def _match(query):
+    """Search expression for `query`: every normalized word, as a prefix."""
+    words = tokenize(query)
+    if not words:
+        return None
+    if connection.vendor == 'postgresql':
+        return ' & '.join('({})'.format(' | '.join(f"'{form}':*" for form in _forms(word))) for word in words)
+    return ' AND '.join('({})'.format(' OR '.join(f'"{form}"*' for form in _forms(word))) for word in words)
+
+
+# --------------------------------------------------
+# Indexing
+# --------------------------------------------------
+
+def _write(cursor, table, pk, document):
+    if table == SQLITE_TABLE:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, title, question_text, transcription_text, answer_text) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [pk, *document],
+        )
+    else:
+        # `body` (from migration 0009) is no longer filled: excerpts come from the inquiry
+        title, *rest = document
+        rest = ' '.join(text for text in rest if text)
+        cursor.execute(
+            f'INSERT INTO {table} (inquiry_id, document) '
+            "VALUES (%s, setweight(to_tsvector('simple', %s), 'A') "
+            "|| setweight(to_tsvector('simple', %s), 'B')) "
+            'ON CONFLICT (inquiry_id) DO UPDATE SET document = EXCLUDED.document',
+            [pk, title, rest],
+        )
+
+
+def index(inquiry):
+    """Add or refresh `inquiry` (an Inquiry or a dict of its text fields plus 'pk')."""
+    table = search_table()
+    if table is None:
+        return
+    if isinstance(inquiry, Inquiry):
+        pk, values = inquiry.pk, {field: getattr(inquiry, field) for field in TEXT_FIELDS}
+    else:
+        pk, values = inquiry['pk'], inquiry
+    with connection.cursor() as cursor:
+        _write(cursor, table, pk, _document(values))
+
+
+def remove(pk):
+    table = search_table()
+    if table is None:
+        return
+    column = 'rowid' if table == SQLITE_TABLE else 'inquiry_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} = %s', [pk])
+
+
+def rebuild(batch_size=500):
+    """Re-index every inquiry, active and archived, from scratch. Returns the number indexed."""
+    table = search_table()
+    if table is None:
+        return 0
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+        for model in (Inquiry, ArchivedInquiry):
+            rows = model.objects.order_by('pk').values('pk', *TEXT_FIELDS)
+            for values in rows.iterator(chunk_size=batch_size):
+                _write(cursor, table, values['pk'], _document(values))
+                count += 1
+        if table == SQLITE_TABLE:
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+    return count
+
+
+# --------------------------------------------------
+# Querying
+# --------------------------------------------------
+
+def search(queryset, query):
+    """
+    Narrow an Inquiry (or ArchivedInquiry) queryset to the matches of
+    `query`, best first.
+
+    With a search table the rows are annotated with `search_rank`. The
+    returned ordering is unique, so it can drive keyset pagination.
+    """
+    table = search_table()
+    if table is None:
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(question_text__icontains=query)
+            | Q(transcription_text__icontains=query)
+            | Q(answer_text__icontains=query)
+        ).order_by('-created_at', '-pk')
+
+    match = _match(query)
+    if match is None:
+        return queryset.none()
+
+    rows = queryset.model._meta.db_table
+    if table == SQLITE_TABLE:
+        weights = ', '.join(str(w) for w in _WEIGHTS)
+        return queryset.extra(
+            tables=[table],
+            where=[f'{table}.rowid = {rows}.id', f'{table} MATCH %s'],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(f'bm25({table}, {weights})', (), output_field=FloatField()),
+        ).order_by('search_rank', '-created_at', '-pk')
+
+    return queryset.extra(
+        tables=[table],
+        where=[f'{table}.inquiry_id = {rows}.id', f"{table}.document @@ to_tsquery('simple', %s)"],
+        params=[match],
+    ).annotate(
+        search_rank=RawSQL(
+            f"ts_rank({table}.document, to_tsquery('simple', %s))", (match,), output_field=FloatField(),
+        ),
+    ).order_by('-search_rank', '-created_at', '-pk')
+
+
+def _excerpt(text, forms):
+    """
+    (number of matches, HTML) for the SNIPPET_WORDS-word window of `text`
+    with the most words starting with one of `forms`; (0, None) if none do.
+    """
+    words = list(word_spans(text))
+    hits = [any(word.startswith(form) for form in forms) for _, _, word in words]
+    if not any(hits):
+        return 0, None
+
+    size = min(SNIPPET_WORDS, len(words))
+    matched = [i for i, hit in enumerate(hits) if hit]
+
+    def lead(i):
+        # Words before the window's first match; a few give it context
+        return next(m for m in matched if m >= i) - i if any(hits[i:i + size]) else size
+
+    first = max(
+        range(len(words) - size + 1),
+        key=lambda i: (sum(hits[i:i + size]), -abs(lead(i) - _SNIPPET_LEAD), -i),
+    )
+    last = first + size
+    parts = ['… '] if first else []
+    position = words[first][0]
+    for (start, end, _), hit in zip(words[first:last], hits[first:last]):
+        parts.append(escape(_SPACES.sub(' ', text[position:start])))
+        parts.append(f'<mark>{escape(text[start:end])}</mark>' if hit else escape(text[start:end]))
+        position = end
+    # Keep closing punctuation when the window reaches the end
+    parts.append(escape(_SPACES.sub(' ', text[position:]).rstrip()) if last == len(words) else ' …')
+    return sum(hits[first:last]), mark_safe(''.join(parts))
+
+
+def snippets(pks, query, model=Inquiry):
+    """
+    {pk: highlighted HTML excerpt} for the `model` rows `pks` (one page of
+    results), cut from the original text of the field that matches best.
+    """
+    words = tokenize(query)
+    if not words or not pks:
+        return {}
+    forms = [form for word in words for form in _forms(word)]
+
+    excerpts = {}
+    for values in model.objects.filter(pk__in=pks).values('pk', *SNIPPET_FIELDS):
+        matches, html = max(
+            (_excerpt(values[field] or '', forms) for field in SNIPPET_FIELDS),
+            key=lambda excerpt: excerpt[0],
+        )
+        if matches:
+            excerpts[values['pk']] = html
+    return excerpts
+
+
+# --------------------------------------------------
+# Signal receivers (connected in apps.py)
+# --------------------------------------------------
+
+def inquiry_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not set(update_fields) & set(TEXT_FIELDS)):
+        return
+    index(instance)
+
+
+def inquiry_deleted(sender, instance, **kwargs):
+    remove(instance.pk)
@@ -0,0 +1,128 @@
+"""
+Dashboard statistics.
+
+Each role's figures are read from the denormalized InquiryCounter rows (see
+counters.py) in one query, cached for DASHBOARD_STATS_TTL seconds in the
+default cache.
+
+Cache keys embed a generation number: a global one for librarian figures
+(which cover every inquiry) and one per user for a blind user's own
+figures. Saving or deleting an inquiry bumps both generations it affects,
+so stale figures are never read after a change in this process. Other
+processes may serve stale figures for up to the TTL.
+
+When an entry expires, one request recomputes it under a short lock while
+the others keep serving the expired value. On a cold miss, the others wait
+briefly for the result instead of all running the query at once.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import counters, read_receipts
+
+TTL = getattr(settings, 'DASHBOARD_STATS_TTL', 30)
+
+# Expired entries are kept this long to be served while one request refreshes
+STALE_SECONDS = 60
+LOCK_SECONDS = 10
+COLD_WAIT_SECONDS = 2.0
+
+# Saves touching only these fields do not change any figure
+_IGNORED_FIELDS = {'is_read_by_librarian', 'updated_at'}
+
+
+def _generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(key):
+    # Any new value orphans the old entries; no atomic increment needed
+    cache.set(key, time.time_ns(), None)
+
+
+def _global_key():
+    return 'stats:gen'
+
+
+def _user_key(user_id):
+    return f'stats:gen:user:{user_id}'
+
+
+def _librarian_stats(user):
+    rows = counters.get_counters([counters.GLOBAL, counters.user_scope(user.pk)])
+    everyone, own = rows[counters.GLOBAL], rows[counters.user_scope(user.pk)]
+    return {
+        'total': everyone.total,
+        'pending': everyone.pending,
+        'answered_today': counters.answered_today(everyone),
+        'my_answers': own.answers,
+    }
+
+
+def _user_stats(user):
+    own = counters.get_counters([counters.user_scope(user.pk)])[counters.user_scope(user.pk)]
+    return {
+        'total': own.total,
+        'pending': own.pending,
+        'answered': own.answered,
+        # Answers read moments ago may not be written yet (see read_receipts.py)
+        'unread': max(own.unread - read_receipts.pending_unread(user.pk), 0),
+    }
+
+
+def _cached(key, compute):
+    """Return compute() through the cache with stampede protection."""
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, LOCK_SECONDS):
+        try:
+            value = compute()
+            cache.set(key, (value, time.time() + TTL), TTL + STALE_SECONDS)
+        finally:
+            cache.delete(lock)
+        return value
+
+    if entry is not None:
+        return entry[0]
+
+    deadline = now + COLD_WAIT_SECONDS
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
+
+
+def user_stats(user, librarian):
+    """Dashboard figures for `user`, as librarian or as inquiry owner."""
+    if librarian:
+        key = f'stats:librarian:{user.pk}:{_generation(_global_key())}'
+        return _cached(key, lambda: _librarian_stats(user))
+    key = f'stats:user:{user.pk}:{_generation(_user_key(user.pk))}'
+    return _cached(key, lambda: _user_stats(user))
+
+
+def invalidate(*user_ids):
+    """Drop cached figures affected by a change to inquiries of `user_ids`."""
+    _bump(_global_key())
+    for user_id in user_ids:
+        _bump(_user_key(user_id))
+
+
+def inquiry_changed(sender, instance, update_fields=None, **kwargs):
+    """post_save / post_delete receiver for Inquiry (connected in apps.py)."""
+    if update_fields and set(update_fields) <= _IGNORED_FIELDS:
+        return
+    invalidate(instance.created_by_id)
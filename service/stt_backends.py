@@ -0,0 +1,310 @@
+"""
+Speech recognition backends and the registry that chooses between them.
+
+Each backend recognises one sr.AudioData clip and either returns
+{'text', 'confidence'} or raises sr.UnknownValueError (no speech) or
+sr.RequestError / OSError (the backend or the network failed and another
+backend may succeed). Any other exception is a bug and is not retried on
+the next backend.
+
+The registry tries backends in STT_BACKENDS order, or the order given for
+the language in STT_LANGUAGE_BACKENDS. It keeps per-backend health in
+memory. After STT_BACKEND_FAILURE_THRESHOLD consecutive request errors a
+backend is benched for STT_BACKEND_COOLDOWN_SECONDS: it moves to the end of
+the chain and is only tried if every healthy backend failed. A throttled
+Google API therefore stops costing a round trip per request while the
+local recognizer carries the load.
+
+Backends:
+    google  Google Web Speech API via SpeechRecognition (needs internet)
+    vosk    Offline Kaldi recognizer; needs `pip install vosk` and a model
+            directory per language in STT_VOSK_MODELS
+    stub    Deterministic stand-in for tests and local development
+"""
+
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+BACKENDS = {}
+
+
+def register(cls):
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+class STTBackend:
+    name = ''
+    label = ''
+
+    @property
+    def is_available(self):
+        return True
+
+    def supports(self, lang):
+        return True
+
+    def languages(self):
+        """Languages served, or None for any."""
+        return None
+
+    def recognize(self, audio, lang):
+        raise NotImplementedError
+
+
+@register
+class GoogleBackend(STTBackend):
+    name = 'google'
+    label = 'Google Speech Recognition'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _recognizer(self):
+        """Return this thread's Recognizer, creating it on first use."""
+        recognizer = getattr(self._local, 'recognizer', None)
+        if recognizer is None:
+            import speech_recognition as sr
+
+            recognizer = sr.Recognizer()
+            recognizer.operation_timeout = getattr(settings, 'STT_REQUEST_TIMEOUT', None)
+            self._local.recognizer = recognizer
+        return recognizer
+
+    def recognize(self, audio, lang):
+        import speech_recognition as sr
+
+        response = self._recognizer().recognize_google(audio, language=lang, show_all=True)
+        alternatives = response.get('alternative') if isinstance(response, dict) else None
+        if not alternatives:
+            raise sr.UnknownValueError()
+
+        best = alternatives[0]
+        return {'text': best['transcript'], 'confidence': best.get('confidence')}
+
+
+@register
+class VoskBackend(STTBackend):
+    name = 'vosk'
+    label = 'Vosk (محلي)'
+    SAMPLE_RATE = 16000
+
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self):
+        try:
+            import vosk
+            vosk.SetLogLevel(-1)
+            self._vosk = vosk
+        except ImportError:
+            self._vosk = None
+        self.model_paths = getattr(settings, 'STT_VOSK_MODELS', {})
+
+    @property
+    def is_available(self):
+        return self._vosk is not None and bool(self.model_paths)
+
+    def supports(self, lang):
+        return lang in self.model_paths
+
+    def languages(self):
+        return list(self.model_paths)
+
+    def _model(self, lang):
+        """Models are large; each is loaded once per process and shared."""
+        import speech_recognition as sr
+
+        path = self.model_paths[lang]
+        model = self._models.get(path)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(path)
+                if model is None:
+                    try:
+                        model = self._vosk.Model(str(path))  # vosk expects a str, settings may give a Path
+                    except Exception as e:
+                        # vosk reports a missing or broken model with a bare Exception
+                        raise sr.RequestError(f'Vosk model for {lang}: {e}')
+                    self._models[path] = model
+        return model
+
+    def recognize(self, audio, lang):
+        import speech_recognition as sr
+
+        recognizer = self._vosk.KaldiRecognizer(self._model(lang), self.SAMPLE_RATE)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        result = json.loads(recognizer.FinalResult())
+
+        text = result.get('text', '').strip()
+        if not text:
+            raise sr.UnknownValueError()
+        words = result.get('result') or []
+        confidence = sum(w.get('conf', 0) for w in words) / len(words) if words else None
+        return {'text': text, 'confidence': confidence}
+
+
+@register
+class StubBackend(STTBackend):
+    """
+    Deterministic stand-in: silent clips are 'no speech', anything else is
+    recognised as STT_STUB_TEXT. Only used when listed in STT_BACKENDS.
+    """
+
+    name = 'stub'
+    label = 'Stub'
+
+    def recognize(self, audio, lang):
+        import speech_recognition as sr
+
+        if not audio.get_raw_data().strip(b'\x00'):
+            raise sr.UnknownValueError()
+        return {'text': getattr(settings, 'STT_STUB_TEXT', 'هذا نص تجريبي'), 'confidence': 1.0}
+
+
+class BackendHealth:
+    """Counters for one backend; mutated under the registry lock."""
+
+    # Weight of the newest sample in the latency average
+    LATENCY_ALPHA = 0.2
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.last_error = ''
+        self.last_error_at = None
+        self.last_success_at = None
+        self.benched_until = 0.0
+
+    def as_dict(self, now):
+        return {
+            'healthy': self.benched_until <= now,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'latency_ms': round(self.latency * 1000) if self.latency is not None else None,
+            'last_error': self.last_error,
+            'last_error_at': self.last_error_at.isoformat() if self.last_error_at else None,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'benched_for_seconds': round(self.benched_until - now) if self.benched_until > now else 0,
+        }
+
+
+class BackendRegistry:
+    """The enabled backends in fallback order, with their health."""
+
+    def __init__(self, names=None, language_routes=None):
+        names = names if names is not None else getattr(settings, 'STT_BACKENDS', ['google'])
+        unknown = [n for n in names if n not in BACKENDS]
+        if unknown:
+            raise ValueError(f'Unknown STT backends: {", ".join(unknown)}')
+
+        self.backends = {name: BACKENDS[name]() for name in names}
+        self.order = list(names)
+        self.language_routes = (
+            language_routes if language_routes is not None
+            else getattr(settings, 'STT_LANGUAGE_BACKENDS', {})
+        )
+        self.failure_threshold = getattr(settings, 'STT_BACKEND_FAILURE_THRESHOLD', 3)
+        self.cooldown = getattr(settings, 'STT_BACKEND_COOLDOWN_SECONDS', 60)
+        self.health = {name: BackendHealth() for name in names}
+        self._lock = threading.Lock()
+
+    def available(self):
+        return [self.backends[n] for n in self.order if self.backends[n].is_available]
+
+    def languages(self):
+        """Union of the languages served, or None if some backend takes any."""
+        languages = []
+        for backend in self.available():
+            served = backend.languages()
+            if served is None:
+                return None
+            languages += [lang for lang in served if lang not in languages]
+        return languages
+
+    def candidates(self, lang):
+        """
+        Backends to try for `lang`: healthy ones in configured order, then
+        benched ones, soonest back first.
+        """
+        order = self.language_routes.get(lang, self.order)
+        usable = [
+            self.backends[n] for n in order
+            if n in self.backends and self.backends[n].is_available and self.backends[n].supports(lang)
+        ]
+        now = time.monotonic()
+        with self._lock:
+            return sorted(usable, key=lambda b: max(self.health[b.name].benched_until - now, 0))
+
+    def record_success(self, name, seconds):
+        with self._lock:
+            health = self.health[name]
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.benched_until = 0.0
+            health.last_success_at = timezone.now()
+            if health.latency is None:
+                health.latency = seconds
+            else:
+                alpha = BackendHealth.LATENCY_ALPHA
+                health.latency = alpha * seconds + (1 - alpha) * health.latency
+
+    def record_failure(self, name, error):
+        with self._lock:
+            health = self.health[name]
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+            health.last_error_at = timezone.now()
+            if health.consecutive_failures >= self.failure_threshold:
+                health.benched_until = time.monotonic() + self.cooldown
+
+    def recognize(self, audio, lang):
+        """
+        Recognise `audio` with the first backend that answers.
+
+        Returns the backend's result plus 'engine'. Raises
+        sr.UnknownValueError as soon as a backend hears no speech, or
+        sr.RequestError when every candidate failed.
+        """
+        import speech_recognition as sr
+
+        errors = []
+        for backend in self.candidates(lang):
+            start = time.perf_counter()
+            try:
+                result = backend.recognize(audio, lang)
+            except sr.UnknownValueError:
+                # The backend worked; the clip has no recognisable speech
+                self.record_success(backend.name, time.perf_counter() - start)
+                raise
+            except (sr.RequestError, OSError) as e:
+                self.record_failure(backend.name, e)
+                errors.append(f'{backend.name}: {e}')
+                continue
+            self.record_success(backend.name, time.perf_counter() - start)
+            return {**result, 'engine': backend.name}
+
+        raise sr.RequestError('; '.join(errors) or f'لا يوجد محرك متاح للغة {lang}')
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'name': name,
+                    'label': self.backends[name].label,
+                    'available': self.backends[name].is_available,
+                    'languages': self.backends[name].languages(),
+                    **self.health[name].as_dict(now),
+                }
+                for name in self.order
+            ]
@@ -0,0 +1,205 @@
+"""
+Background transcription of uploaded question audio.
+
+When a blind user submits an audio-only inquiry, a TranscriptionJob is
+created and run on the background pool. A successful job fills
+`transcription_text` and moves the inquiry from NEW to TRANSCRIBED; failed
+requests to the recognition service are retried with exponential backoff.
+
+Jobs are stored in the database, so `manage.py process_transcriptions`
+can pick up anything left behind by a restart.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import background, counters, events, search
+from .models import Inquiry, TranscriptionJob
+from .normalization import normalized_audio
+from .stt_service import get_stt_service
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'STT_JOB_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = getattr(settings, 'STT_JOB_BACKOFF_SECONDS', 30)
+
+# A RUNNING job older than this is assumed to belong to a dead process
+STALE_AFTER = timedelta(minutes=10)
+
+
+def needs_transcription(inquiry):
+    return (
+        inquiry.status == Inquiry.Status.NEW
+        and bool(inquiry.question_audio)
+        and not inquiry.transcription_text.strip()
+    )
+
+
+def enqueue(inquiry, language='ar-SA', run=True):
+    """
+    Create (or reset) the transcription job for `inquiry`.
+
+    With run=True the job is started on the background pool once the
+    current transaction commits.
+    """
+    job, _ = TranscriptionJob.objects.update_or_create(
+        inquiry=inquiry,
+        defaults={
+            'status': TranscriptionJob.Status.PENDING,
+            'language': language,
+            'attempts': 0,
+            'next_attempt_at': timezone.now(),
+            'last_error': '',
+        },
+    )
+    if run:
+        transaction.on_commit(lambda: background.submit(run_job, job.pk))
+    return job
+
+
+def _claim(job_id):
+    """Atomically move a due job from PENDING to RUNNING."""
+    now = timezone.now()
+    return TranscriptionJob.objects.filter(
+        pk=job_id,
+        status=TranscriptionJob.Status.PENDING,
+        next_attempt_at__lte=now,
+    ).update(
+        status=TranscriptionJob.Status.RUNNING,
+        attempts=F('attempts') + 1,
+        updated_at=now,
+    ) == 1
+
+
+def run_job(job_id):
+    """Run one transcription job. Returns the job's final status."""
+    if not _claim(job_id):
+        return None
+
+    job = TranscriptionJob.objects.select_related('inquiry').get(pk=job_id)
+    inquiry = job.inquiry
+
+    if not needs_transcription(inquiry):
+        job.status = TranscriptionJob.Status.DONE
+        job.last_error = 'تم التفريغ يدوياً أو لا يوجد ملف صوتي'
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        return job.status
+
+    start = time.perf_counter()
+    try:
+        # The original bytes are hashed for the result cache, so a recording
+        # already auto-transcribed in the form is not sent again. On a miss
+        # the normalized copy kept beside the upload is used.
+        with inquiry.question_audio.open('rb') as audio_file:
+            result = get_stt_service().transcribe_audio_file(
+                audio_file, job.language, normalized=lambda: normalized_audio(inquiry),
+            )
+    except OSError as e:
+        result = {'success': False, 'error': str(e), 'retryable': False}
+    except Exception as e:
+        # Never leave the job RUNNING; it is retried up to MAX_ATTEMPTS
+        logger.exception('Transcription job %s raised', job.pk)
+        result = {'success': False, 'error': str(e) or type(e).__name__, 'retryable': True}
+    job.processing_seconds = round(time.perf_counter() - start, 3)
+
+    if result['success']:
+        _complete(job, result)
+    else:
+        _fail(job, result)
+    return job.status
+
+
+def _complete(job, result):
+    job.status = TranscriptionJob.Status.DONE
+    job.engine = result.get('engine', '')
+    job.confidence = result.get('confidence')
+    job.audio_seconds = result.get('duration')
+    job.segments = result.get('segments', [])
+    job.last_error = ''
+    job.next_attempt_at = None
+
+    with transaction.atomic():
+        # Only NEW inquiries are touched so a librarian's manual work wins
+        updated = Inquiry.objects.filter(pk=job.inquiry_id, status=Inquiry.Status.NEW).update(
+            transcription_text=result['text'],
+            status=Inquiry.Status.TRANSCRIBED,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            # .update() skips the signals that keep the counters, search index
+            # and event feed in step
+            before = counters.state(job.inquiry)
+            before['status'] = Inquiry.Status.NEW
+            counters.apply(before, {**before, 'status': Inquiry.Status.TRANSCRIBED})
+            inquiry = Inquiry.objects.get(pk=job.inquiry_id)
+            search.index(inquiry)
+            events.publish(inquiry, before, counters.state(inquiry))
+        job.save()
+
+
+def _fail(job, result):
+    job.last_error = result.get('error', '')
+    if result.get('retryable') and job.attempts < MAX_ATTEMPTS:
+        delay = BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        job.status = TranscriptionJob.Status.PENDING
+        job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        job.save()
+        background.schedule(delay, run_job, job.pk)
+        logger.info('Transcription job %s failed, retrying in %ss', job.pk, delay)
+    else:
+        job.status = TranscriptionJob.Status.FAILED
+        job.next_attempt_at = None
+        job.save()
+
+
+def due_jobs():
+    """
+    Pending jobs whose next attempt is due: shortest recordings first (the
+    duration is probed at upload), then oldest first.
+    """
+    return (
+        TranscriptionJob.objects
+        .filter(status=TranscriptionJob.Status.PENDING, next_attempt_at__lte=timezone.now())
+        .order_by(F('inquiry__audio_duration').asc(nulls_last=True), 'next_attempt_at')
+    )
+
+
+def requeue_stale():
+    """
+    Return jobs stuck in RUNNING (e.g. after a crash) to the queue, or fail
+    them once they have used all their attempts. Returns the number requeued.
+    """
+    stale = TranscriptionJob.objects.filter(
+        status=TranscriptionJob.Status.RUNNING,
+        updated_at__lt=timezone.now() - STALE_AFTER,
+    )
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=TranscriptionJob.Status.FAILED,
+        next_attempt_at=None,
+        last_error='توقفت المعالجة قبل اكتمالها في كل المحاولات',
+        updated_at=timezone.now(),
+    )
+    if failed:
+        logger.warning('Failed %s stale transcription jobs out of attempts', failed)
+    return stale.update(
+        status=TranscriptionJob.Status.PENDING,
+        next_attempt_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def backfill_candidates():
+    """NEW audio inquiries with no transcription and no job yet."""
+    return (
+        Inquiry.objects
+        .filter(status=Inquiry.Status.NEW, transcription_job__isnull=True)
+        .exclude(Q(question_audio='') | Q(question_audio__isnull=True))
+        .filter(transcription_text='')
+        .order_by('created_at')
+    )
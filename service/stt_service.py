@@ -1,13 +1,41 @@
 """
 STT Service - Speech-to-Text for Arabic
-Uses SpeechRecognition library with Google's free speech API.
+Uses the SpeechRecognition library to decode audio and the backends in
+stt_backends.py (Google's free speech API, an offline Vosk recognizer) to
+recognise it, falling back from one to the next when a backend fails.
 Falls back gracefully if the library is not installed.
+
+Audio is decoded straight from the upload (or an in-memory buffer) and never
+copied to disk. Each thread keeps one configured Recognizer for reuse.
+
+Recordings longer than STT_LONG_AUDIO_SECONDS are split on silence and the
+chunks are recognised concurrently, so a multi-minute question takes about
+as long as its longest chunk.
+
+Uploads are first normalized to trimmed 16 kHz mono WAV (see
+normalization.py), so browser formats such as webm/ogg work when ffmpeg is
+installed. If normalization is unavailable the original stream is used.
+
+Successful results are cached under the SHA-256 of the uploaded bytes plus
+the language (the 'stt' cache alias), so transcribing the same recording
+again costs one hash and one cache lookup.
 """
 
-import os
-import tempfile
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.utils import timezone
+
+from .audio import AudioDecodeError, speech_segments, supported_formats, vad_available
+from .normalization import normalize_bytes
+from .stt_backends import BackendRegistry
+
+logger = logging.getLogger(__name__)
 
 _stt_instance = None
 
@@ -29,7 +57,8 @@ class STTService:
         'en-US': 'en-US',
     }
 
-    def __init__(self):
+    def __init__(self, backends=None):
+        """`backends` restricts the service to these names instead of STT_BACKENDS."""
         self._sr_available = False
         try:
             import speech_recognition  # noqa: F401
@@ -37,105 +66,342 @@ class STTService:
         except ImportError:
             pass
 
+        self.registry = BackendRegistry(backends)
+        self._local = threading.local()
+        self._chunk_pool = None
+        self._chunk_pool_lock = threading.Lock()
+        self.long_audio_seconds = getattr(settings, 'STT_LONG_AUDIO_SECONDS', 30)
+
     @property
     def is_available(self):
-        return self._sr_available
+        return self._sr_available and bool(self.registry.available())
 
-    def transcribe_audio_file(self, audio_file, language='ar-SA'):
+    # --------------------------------------------------
+    # Input helpers
+    # --------------------------------------------------
+
+    def _recognizer(self):
+        """Return this thread's Recognizer (used to read audio files), creating it on first use."""
+        recognizer = getattr(self._local, 'recognizer', None)
+        if recognizer is None:
+            import speech_recognition as sr
+
+            recognizer = self._local.recognizer = sr.Recognizer()
+        return recognizer
+
+    @staticmethod
+    def _as_stream(audio):
         """
-        Transcribe an uploaded audio file to text.
+        Return a seekable binary stream over `audio` without touching disk.
 
-        Args:
-            audio_file: Django UploadedFile or file-like object (WAV format preferred)
-            language: Language code (ar-SA, en-US)
+        Accepts bytes-like objects, Django uploaded/stored files and plain
+        file objects. Uploads that Django already holds in memory or in its
+        own temp file are read in place rather than copied.
+        """
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            return io.BytesIO(audio)
 
-        Returns:
-            dict: {'success': bool, 'text': str} or {'success': bool, 'error': str}
+        stream = getattr(audio, 'file', None) or audio
+        if hasattr(stream, 'read') and hasattr(stream, 'seek'):
+            try:
+                stream.seek(0)
+                return stream
+            except (OSError, ValueError):
+                pass
+
+        return io.BytesIO(b''.join(audio.chunks()))
+
+    @staticmethod
+    def _prepare(stream, normalize, normalized=None):
         """
-        if not self._sr_available:
-            return {
-                'success': False,
-                'error': 'خدمة التعرف على الصوت غير متاحة. يرجى تثبيت: pip install SpeechRecognition'
-            }
+        Return a stream for recognition, normalized to 16 kHz mono WAV if possible.
 
-        import speech_recognition as sr
+        `normalized` is an optional callable returning WAV bytes that were
+        already normalized (e.g. read back from storage).
+        """
+        if not normalize:
+            return stream
 
+        try:
+            if normalized is not None:
+                return io.BytesIO(normalized())
+            wav, _ = normalize_bytes(stream.read())
+            return io.BytesIO(wav)
+        except AudioDecodeError:
+            # Fall back to the original; sr.AudioFile reads WAV/AIFF/FLAC itself
+            stream.seek(0)
+            return stream
+
+    # --------------------------------------------------
+    # Result cache
+    # --------------------------------------------------
+
+    @staticmethod
+    def _result_cache():
+        try:
+            return caches['stt']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def _cache_key(self, stream, language):
+        """SHA-256 of the raw stream plus the language; rewinds the stream."""
+        digest = hashlib.sha256()
+        stream.seek(0)
+        for block in iter(lambda: stream.read(64 * 1024), b''):
+            digest.update(block)
+        stream.seek(0)
         lang = self.SUPPORTED_LANGUAGES.get(language, 'ar-SA')
+        return f'stt:{lang}:{digest.hexdigest()}'
+
+    def _cached_result(self, key):
+        entry = self._result_cache().get(key)
+        if entry is None:
+            return None
+        return {**entry, 'cached': True}
+
+    def _store_result(self, key, result):
+        if result['success']:
+            self._result_cache().set(key, {**result, 'cached_at': timezone.now().isoformat()})
+
+    def _transcribe_cached(self, stream, language, normalize, normalized=None):
+        key = self._cache_key(stream, language)
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
+
+        result = self._transcribe(self._prepare(stream, normalize, normalized), language)
+        self._store_result(key, result)
+        return result
+
+    def _recognize(self, audio, lang):
+        """
+        Recognise one clip with the first backend that answers and return
+        the best result with its confidence.
+
+        Raises sr.UnknownValueError when nothing was recognised and
+        sr.RequestError when every backend failed.
+        """
+        result = self.registry.recognize(audio, lang)
+        duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        return {
+            'success': True,
+            'text': result['text'],
+            'confidence': result.get('confidence'),
+            'engine': result['engine'],
+            'duration': round(duration, 2),
+        }
+
+    # --------------------------------------------------
+    # Long audio
+    # --------------------------------------------------
+
+    def _get_chunk_pool(self):
+        if self._chunk_pool is None:
+            with self._chunk_pool_lock:
+                if self._chunk_pool is None:
+                    self._chunk_pool = ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'STT_CHUNK_WORKERS', 4),
+                        thread_name_prefix='stt-chunk',
+                    )
+        return self._chunk_pool
+
+    def _recognize_chunk(self, audio, lang):
+        import speech_recognition as sr
+
+        try:
+            return self._recognize(audio, lang)
+        except sr.UnknownValueError:
+            return {'success': False, 'error': 'لم يتم التعرف على الكلام', 'retryable': False}
+        except sr.RequestError as e:
+            return {'success': False, 'error': str(e), 'retryable': True}
+        except Exception as e:
+            # One bad chunk must not fail the rest of the recording
+            logger.exception('Recognising an audio chunk failed')
+            return {'success': False, 'error': str(e) or type(e).__name__, 'retryable': False}
+
+    def _recognize_long(self, audio, lang):
+        """
+        Split `audio` on silence and recognise the chunks concurrently.
+
+        A failed chunk does not fail the whole recording; its error is kept
+        in the segment list and the remaining text is stitched in order.
+        """
+        import speech_recognition as sr
+
+        rate = audio.sample_rate
+        pcm = audio.get_raw_data(convert_width=2)
+        bounds = speech_segments(pcm, rate)
+        if not bounds:
+            raise sr.UnknownValueError()
+
+        chunks = [sr.AudioData(pcm[start * 2:end * 2], rate, 2) for start, end in bounds]
+        results = list(self._get_chunk_pool().map(
+            lambda chunk: self._recognize_chunk(chunk, lang), chunks
+        ))
+
+        segments = []
+        texts = []
+        engines = []
+        weighted_confidence = confident_seconds = 0.0
+        for (start, end), result in zip(bounds, results):
+            segment = {'start': round(start / rate, 2), 'end': round(end / rate, 2)}
+            if result['success']:
+                segment['text'] = result['text']
+                texts.append(result['text'])
+                if result['engine'] not in engines:
+                    engines.append(result['engine'])
+                if result.get('confidence') is not None:
+                    weighted_confidence += result['confidence'] * result['duration']
+                    confident_seconds += result['duration']
+            else:
+                segment['error'] = result['error']
+            segments.append(segment)
+
+        if not texts:
+            # Every chunk failed: surface it as a request error if any chunk
+            # could be retried, otherwise as unrecognised speech.
+            if any(r.get('retryable') for r in results):
+                raise sr.RequestError(results[0]['error'])
+            raise sr.UnknownValueError()
+
+        return {
+            'success': True,
+            'text': ' '.join(texts),
+            'confidence': (
+                round(weighted_confidence / confident_seconds, 4) if confident_seconds else None
+            ),
+            'engine': ','.join(engines),
+            'duration': round(len(pcm) / (2 * rate), 2),
+            'segments': segments,
+        }
 
-        # Save uploaded file to a temp WAV
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            for chunk in audio_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+    def _transcribe(self, stream, language):
+        import speech_recognition as sr
+
+        lang = self.SUPPORTED_LANGUAGES.get(language, 'ar-SA')
 
         try:
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(tmp_path) as source:
-                recognizer.adjust_for_ambient_noise(source, duration=0.3)
-                audio = recognizer.record(source)
+            # record() ignores the energy threshold, so no ambient-noise
+            # calibration is needed (it only dropped the first 0.3 s).
+            with sr.AudioFile(stream) as source:
+                audio = self._recognizer().record(source)
+
+            duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            if duration > self.long_audio_seconds and vad_available():
+                return self._recognize_long(audio, lang)
 
-            text = recognizer.recognize_google(audio, language=lang)
-            return {'success': True, 'text': text}
+            return self._recognize(audio, lang)
 
         except sr.UnknownValueError:
             return {
                 'success': False,
-                'error': 'لم يتم التعرف على الكلام. حاول التحدث بوضوح أكثر.'
+                'error': 'لم يتم التعرف على الكلام. حاول التحدث بوضوح أكثر.',
+                'retryable': False,
             }
         except sr.RequestError as e:
             return {
                 'success': False,
-                'error': f'خطأ في خدمة التعرف على الصوت: {e}'
+                'error': f'خطأ في خدمة التعرف على الصوت: {e}',
+                'retryable': True,
             }
         except Exception as e:
+            logger.exception('Speech recognition failed unexpectedly')
             return {
                 'success': False,
-                'error': f'خطأ في معالجة الملف الصوتي: {e}'
+                'error': f'خطأ في معالجة الملف الصوتي: {e}',
+                'retryable': False,
             }
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
 
-    def transcribe_bytes(self, audio_bytes, language='ar-SA'):
-        """Transcribe raw audio bytes (WAV format)."""
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def transcribe_audio_file(self, audio_file, language='ar-SA', normalize=True, normalized=None):
+        """
+        Transcribe an uploaded audio file to text.
+
+        Args:
+            audio_file: Django UploadedFile or file-like object in any format
+                        ffmpeg can decode (WAV, AIFF and FLAC work without it)
+            language: Language code (ar-SA, en-US)
+            normalize: Pass False when the audio is already 16 kHz mono WAV
+            normalized: Optional callable returning the normalized WAV bytes,
+                        used on a cache miss instead of decoding audio_file
+
+        Returns:
+            dict: {'success': True, 'text': str, 'confidence': float|None,
+                   'engine': str, 'duration': float[, 'segments': list]}
+                  or {'success': False, 'error': str, 'retryable': bool}
+
+            'segments' is present for long recordings and lists each chunk's
+            {'start', 'end'} in seconds with its 'text' or 'error'. Results
+            served from the cache also carry 'cached': True and 'cached_at'.
+        """
+        if not self._sr_available:
+            return {
+                'success': False,
+                'error': 'خدمة التعرف على الصوت غير متاحة. يرجى تثبيت: pip install SpeechRecognition'
+            }
+
+        return self._transcribe_cached(self._as_stream(audio_file), language, normalize, normalized)
+
+    def transcribe_bytes(self, audio_bytes, language='ar-SA', normalize=True, use_cache=True):
+        """
+        Transcribe raw audio bytes; accepts bytes or a memoryview.
+        Pass use_cache=False to always run recognition (e.g. when benchmarking).
+        """
         if not self._sr_available:
             return {
                 'success': False,
                 'error': 'خدمة التعرف على الصوت غير متاحة'
             }
 
-        import speech_recognition as sr
+        stream = self._as_stream(audio_bytes)
+        if not use_cache:
+            return self._transcribe(self._prepare(stream, normalize), language)
+        return self._transcribe_cached(stream, language, normalize)
 
-        lang = self.SUPPORTED_LANGUAGES.get(language, 'ar-SA')
+    def transcribe_pcm(self, pcm, sample_rate=16000, language='ar-SA'):
+        """
+        Recognise raw 16-bit mono PCM (one short segment, e.g. from streaming
+        dictation). Nothing is decoded or cached.
+        """
+        if not self._sr_available:
+            return {
+                'success': False,
+                'error': 'خدمة التعرف على الصوت غير متاحة'
+            }
 
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+        import speech_recognition as sr
 
-        try:
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(tmp_path) as source:
-                audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio, language=lang)
-            return {'success': True, 'text': text}
-        except sr.UnknownValueError:
-            return {'success': False, 'error': 'لم يتم التعرف على الكلام'}
-        except sr.RequestError as e:
-            return {'success': False, 'error': str(e)}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
-        finally:
-            try:
-                os.unlink(tmp_path)
-            except OSError:
-                pass
+        lang = self.SUPPORTED_LANGUAGES.get(language, 'ar-SA')
+        return self._recognize_chunk(sr.AudioData(bytes(pcm), sample_rate, 2), lang)
 
     def get_status(self):
-        """Return status info about the STT service."""
+        """
+        Return status info about the STT service. 'engine' is the backend
+        Arabic requests currently go to first.
+        """
+        formats = []
+        if self._sr_available:
+            # sr.AudioFile reads WAV/AIFF/FLAC itself; the rest need normalization
+            formats = supported_formats(getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'))
+            formats += [f for f in ('wav', 'aiff', 'flac') if f not in formats]
+        languages = []
+        engine = None
+        if self.is_available:
+            served = self.registry.languages()
+            languages = [
+                code for code, lang in self.SUPPORTED_LANGUAGES.items()
+                if served is None or lang in served
+            ]
+            candidates = self.registry.candidates('ar-SA')
+            engine = candidates[0].label if candidates else None
         return {
-            'available': self._sr_available,
-            'engine': 'Google Speech Recognition' if self._sr_available else None,
-            'languages': list(self.SUPPORTED_LANGUAGES.keys()) if self._sr_available else [],
+            'available': self.is_available,
+            'engine': engine,
+            'languages': languages,
+            'formats': formats,
+            # Live health of each backend in this process, in fallback order
+            'backends': self.registry.status(),
         }
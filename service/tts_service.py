@@ -3,6 +3,17 @@ TTS Service - Text-to-Speech for Arabic
 Uses edge-tts (Microsoft Azure Neural TTS) as the primary engine.
 Falls back to gTTS, then browser Speech Synthesis if unavailable.
 
+Quality tiers:
+  - neural: edge-tts audio
+  - draft:  gTTS audio, served on a cache miss when TTS_PROGRESSIVE is on and
+            gTTS is currently the faster engine; the neural version is then
+            synthesized in the background and served from then on.
+
+Each tier has its own cache file (tts_<voice>_<speed>_<hash>.mp3 and
+....draft.mp3), so a file's name always tells which engine rendered it.
+A superseded draft stays for TTS_DRAFT_GRACE_SECONDS, since clients replay
+and download the URL they were given, and is pruned after that.
+
 Voices:
   - Female: ar-SA-ZariyahNeural (Saudi Arabic female)
   - Male:   ar-SA-HamedNeural   (Saudi Arabic male)
@@ -11,10 +22,15 @@ Voices:
 import asyncio
 import hashlib
 import os
+import threading
+import time
+import uuid
 from pathlib import Path
 
 from django.conf import settings
 
+from . import background
+
 _tts_instance = None
 
 
@@ -26,7 +42,12 @@ def get_tts_service():
 
 
 def get_audio_url(audio_path):
-    """Convert an absolute audio file path to a media URL."""
+    """
+    Convert an absolute audio file path to a media URL.
+
+    Draft and neural audio live in different files, so their URLs differ
+    and browsers never keep playing a draft from cache.
+    """
     rel_path = os.path.relpath(audio_path, settings.MEDIA_ROOT)
     return f'{settings.MEDIA_URL}{rel_path}'
 
@@ -45,11 +66,18 @@ EDGE_SPEED = {
 }
 
 
+TIER_NEURAL = 'neural'
+TIER_DRAFT = 'draft'
+
+
 class TTSService:
     """Arabic Text-to-Speech service using edge-tts (Microsoft Neural TTS)."""
 
     MAX_TEXT_LENGTH = 2000
 
+    # Weight of the newest sample in the per-engine latency average
+    LATENCY_SMOOTHING = 0.3
+
     def __init__(self):
         self.output_dir = getattr(
             settings, 'TTS_OUTPUT_DIR',
@@ -66,25 +94,43 @@ class TTSService:
             pass
 
         self._gtts_available = False
-        if not self._edge_available:
-            try:
-                from gtts import gTTS  # noqa: F401
-                self._gtts_available = True
-            except ImportError:
-                pass
+        try:
+            from gtts import gTTS  # noqa: F401
+            self._gtts_available = True
+        except ImportError:
+            pass
+
+        self.progressive = getattr(settings, 'TTS_PROGRESSIVE', False)
+        self.draft_grace = getattr(settings, 'TTS_DRAFT_GRACE_SECONDS', 3600)
+
+        # Smoothed seconds-per-character for each engine, learned at runtime
+        self._seconds_per_char = {}
+        self._upgrades_in_flight = set()
+        self._last_prune = None
+        self._lock = threading.Lock()
 
     # --------------------------------------------------
     # Cache helpers
     # --------------------------------------------------
 
-    def _cache_key(self, text, voice, speed):
-        engine = 'edge' if self._edge_available else 'gtts'
-        raw = f'{engine}:{text}:{voice}:{speed}'
+    def _cache_key(self, text, voice, speed, tier=TIER_NEURAL):
+        # The tier is part of the name: each file is written atomically, so
+        # a file can never be served under the wrong tier.
+        raw = f'{text}:{voice}:{speed}'
         h = hashlib.md5(raw.encode()).hexdigest()[:16]
-        return f'tts_{engine}_{voice}_{speed}_{h}.mp3'
+        suffix = '.draft' if tier == TIER_DRAFT else ''
+        return f'tts_{voice}_{speed}_{h}{suffix}.mp3'
 
-    def _cache_path(self, text, voice, speed='normal'):
-        return os.path.join(self.output_dir, self._cache_key(text, voice, speed))
+    def _cache_path(self, text, voice, speed='normal', tier=TIER_NEURAL):
+        return os.path.join(self.output_dir, self._cache_key(text, voice, speed, tier))
+
+    def _cached(self, text, voice, speed):
+        """(path, tier) of the best cached rendering, or (None, None)."""
+        for tier in (TIER_NEURAL, TIER_DRAFT):
+            path = self._cache_path(text, voice, speed, tier)
+            if os.path.exists(path):
+                return path, tier
+        return None, None
 
     # --------------------------------------------------
     # Public API
@@ -102,6 +148,22 @@ class TTSService:
         Returns:
             Absolute path to the generated MP3 file.
         """
+        return self.synthesize_with_tier(text, voice, speed)[0]
+
+    def synthesize_with_tier(self, text, voice='female', speed='normal', progressive=None):
+        """
+        Synthesize Arabic text to speech and report the quality tier served.
+
+        Args:
+            progressive: Override TTS_PROGRESSIVE for this call. Batch jobs
+                pass False so they always wait for the neural voice.
+
+        Returns:
+            (path, tier) where tier is 'neural' or 'draft'.
+        """
+        if progressive is None:
+            progressive = self.progressive
+
         text = text.strip()
         if not text:
             raise ValueError('النص مطلوب')
@@ -116,18 +178,29 @@ class TTSService:
         if speed not in ('slow', 'normal', 'fast'):
             speed = 'normal'
 
-        path = self._cache_path(text, voice, speed)
-
-        if os.path.exists(path):
-            return path
+        path, tier = self._cached(text, voice, speed)
+        if tier == TIER_NEURAL or (tier == TIER_DRAFT and not self._edge_available):
+            return path, tier
+        if tier == TIER_DRAFT:
+            if progressive:
+                self._schedule_upgrade(text, voice, speed)
+                return path, tier
+            return self._render('edge', text, voice, speed), TIER_NEURAL
+
+        # Cache miss: serve a fast draft first if gTTS is currently quicker
+        if (progressive and self._edge_available and self._gtts_available
+                and self._fastest_engine() == 'gtts'):
+            path = self._render('gtts', text, voice, speed)
+            self._schedule_upgrade(text, voice, speed)
+            return path, TIER_DRAFT
 
         # Try edge-tts first (AI neural voices)
         if self._edge_available:
-            return self._synthesize_edge(text, voice, speed, path)
+            return self._render('edge', text, voice, speed), TIER_NEURAL
 
         # Fallback to gTTS
         if self._gtts_available:
-            return self._synthesize_gtts(text, voice, speed, path)
+            return self._render('gtts', text, voice, speed), TIER_DRAFT
 
         raise RuntimeError(
             'خدمة TTS غير متاحة. يرجى تثبيت edge-tts: pip install edge-tts'
@@ -176,6 +249,68 @@ class TTSService:
             }
         return {'engine': None, 'label': 'غير متاح'}
 
+    # --------------------------------------------------
+    # Rendering and background upgrades
+    # --------------------------------------------------
+
+    def _render(self, engine, text, voice, speed):
+        """
+        Render `text` with `engine` and atomically move it into the cache
+        file of its tier. Returns the cache path.
+
+        Audio is written to a temporary file first so readers never see a
+        partially written MP3 under the cache key.
+        """
+        tier = TIER_NEURAL if engine == 'edge' else TIER_DRAFT
+        path = self._cache_path(text, voice, speed, tier)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        synthesize = self._synthesize_edge if engine == 'edge' else self._synthesize_gtts
+        start = time.perf_counter()
+        try:
+            synthesize(text, voice, speed, tmp_path)
+            self._record_latency(engine, (time.perf_counter() - start) / len(text))
+            os.replace(tmp_path, path)
+        finally:
+            Path(tmp_path).unlink(missing_ok=True)
+        if tier == TIER_NEURAL:
+            # The neural file is found first from now on; a draft it
+            # supersedes is still being played, so it is pruned later
+            self._schedule_prune()
+        return path
+
+    def _record_latency(self, engine, seconds_per_char):
+        with self._lock:
+            previous = self._seconds_per_char.get(engine)
+            if previous is None:
+                self._seconds_per_char[engine] = seconds_per_char
+            else:
+                alpha = self.LATENCY_SMOOTHING
+                self._seconds_per_char[engine] = alpha * seconds_per_char + (1 - alpha) * previous
+
+    def _fastest_engine(self):
+        """Engine with the lowest observed latency; gTTS until edge proves quicker."""
+        edge = self._seconds_per_char.get('edge')
+        gtts = self._seconds_per_char.get('gtts')
+        if edge is not None and gtts is not None and edge <= gtts:
+            return 'edge'
+        return 'gtts'
+
+    def _schedule_upgrade(self, text, voice, speed):
+        key = self._cache_key(text, voice, speed)
+        with self._lock:
+            if key in self._upgrades_in_flight:
+                return
+            self._upgrades_in_flight.add(key)
+        background.submit(self._upgrade, text, voice, speed, key)
+
+    def _upgrade(self, text, voice, speed, key):
+        """Render the neural version of a cached draft."""
+        try:
+            self._render('edge', text, voice, speed)
+        finally:
+            with self._lock:
+                self._upgrades_in_flight.discard(key)
+
     # --------------------------------------------------
     # edge-tts engine (primary)
     # --------------------------------------------------
@@ -228,6 +363,33 @@ class TTSService:
     # Cache management
     # --------------------------------------------------
 
+    def _schedule_prune(self):
+        """Prune superseded drafts in the background, at most once per grace period."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_prune is not None and now - self._last_prune < self.draft_grace:
+                return
+            self._last_prune = now
+        background.submit(self.prune_drafts)
+
+    def prune_drafts(self, grace=None):
+        """
+        Remove drafts whose neural version was rendered more than `grace`
+        seconds (TTS_DRAFT_GRACE_SECONDS) ago. Returns the number removed.
+        """
+        cutoff = time.time() - (self.draft_grace if grace is None else grace)
+        count = 0
+        for draft in Path(self.output_dir).glob('tts_*.draft.mp3'):
+            neural = draft.with_name(draft.name.removesuffix('.draft.mp3') + '.mp3')
+            try:
+                superseded = neural.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            if superseded:
+                draft.unlink(missing_ok=True)
+                count += 1
+        return count
+
     def clear_cache(self):
         """Remove all cached audio files."""
         count = 0
@@ -0,0 +1,66 @@
+"""
+Upload handler for audio fields.
+
+Installed first in FILE_UPLOAD_HANDLERS. For the audio form fields it
+streams the upload to a temporary file while an AudioProbe inspects each
+chunk: the container and codec are sniffed from the first bytes, and the
+duration and SHA-256 are worked out as the data arrives. Files that are
+not audio or that exceed AUDIO_UPLOAD_MAX_BYTES / AUDIO_UPLOAD_MAX_SECONDS
+stop being written to disk as soon as that is known.
+
+The resulting UploadedFile carries `audio_info` (format, codec, duration,
+sha256, size) or `audio_error`; forms and views turn the latter into a
+validation error. Other fields fall through to Django's default handlers.
+"""
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopFutureHandlers, TemporaryFileUploadHandler
+
+from .audio import AudioProbe, AudioProbeError
+
+AUDIO_FIELDS = ('question_audio', 'audio')
+
+
+def audio_limits():
+    return {
+        'max_bytes': getattr(settings, 'AUDIO_UPLOAD_MAX_BYTES', 10 * 1024 * 1024),
+        'max_seconds': getattr(settings, 'AUDIO_UPLOAD_MAX_SECONDS', 600),
+    }
+
+
+class AudioUploadHandler(TemporaryFileUploadHandler):
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.probe = None
+        if field_name not in AUDIO_FIELDS:
+            return
+        super().new_file(field_name, *args, **kwargs)
+        self.probe = AudioProbe(**audio_limits())
+        self.error = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.probe is None:
+            return raw_data
+        if self.error is None:
+            try:
+                self.probe.feed(raw_data)
+                self.file.write(raw_data)
+            except AudioProbeError as e:
+                # Keep reading the request but stop storing the file
+                self.error = str(e)
+                self.file.truncate(0)
+
+    def file_complete(self, file_size):
+        if self.probe is None:
+            return None
+        if self.error is None:
+            try:
+                self.probe.finish()
+            except AudioProbeError as e:
+                self.error = str(e)
+
+        uploaded = super().file_complete(file_size)
+        uploaded.audio_error = self.error
+        uploaded.audio_info = None if self.error else self.probe.info
+        return uploaded
@@ -0,0 +1,218 @@
+"""
+Resumable audio uploads, following the tus 1.0 protocol (core plus the
+creation, checksum, expiration and termination extensions).
+
+The browser creates an upload with its total length, then sends the file
+in chunks, each tagged with the offset it starts at and an optional
+`Upload-Checksum`. After a network drop it asks for the current offset
+(HEAD) and continues from there, so bytes already delivered are never sent
+again. Chunks are appended to a file in RESUMABLE_UPLOAD_DIR. That area is
+private and swept by `manage.py purge_expired_uploads`.
+
+A finished upload is referenced from InquiryCreateForm by id and moved
+into `question_audio` when the inquiry is saved.
+"""
+
+import base64
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .audio import probe_stream, sniff_format
+from .models import AudioUpload
+from .upload_handlers import audio_limits
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,expiration,termination'
+CHECKSUM_ALGORITHMS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256, 'md5': hashlib.md5}
+
+MAX_BYTES = getattr(settings, 'RESUMABLE_UPLOAD_MAX_BYTES', audio_limits()['max_bytes'])
+EXPIRY = timedelta(hours=getattr(settings, 'RESUMABLE_UPLOAD_EXPIRY_HOURS', 24))
+
+
+class UploadError(Exception):
+    """A protocol violation; carries the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _upload_dir():
+    return getattr(settings, 'RESUMABLE_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'cache', 'uploads'))
+
+
+def part_path(upload):
+    return os.path.join(_upload_dir(), f'{upload.pk}.part')
+
+
+def parse_metadata(header):
+    """Decode `Upload-Metadata: key base64value,key2 base64value2`."""
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value).decode() if value else ''
+        except (ValueError, UnicodeDecodeError):
+            raise UploadError('Upload-Metadata غير صالح')
+    return metadata
+
+
+def create(user, length, metadata):
+    if length > MAX_BYTES:
+        raise UploadError('الملف أكبر من الحد المسموح', status=413)
+
+    filename = os.path.basename(metadata.get('filename', '')) or 'recording'
+    upload = AudioUpload.objects.create(
+        user=user,
+        filename=filename[:255],
+        length=length,
+        sha256=metadata.get('sha256', '').lower()[:64],
+        expires_at=timezone.now() + EXPIRY,
+    )
+    os.makedirs(_upload_dir(), exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def active_uploads(user):
+    return AudioUpload.objects.filter(user=user, expires_at__gt=timezone.now())
+
+
+def _parse_checksum(header):
+    if not header:
+        return None
+    algorithm, _, value = header.partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError('خوارزمية البصمة غير مدعومة')
+    try:
+        return algorithm, base64.b64decode(value)
+    except ValueError:
+        raise UploadError('Upload-Checksum غير صالح')
+
+
+def append(upload_id, user, offset, stream, checksum_header=None):
+    """
+    Append one chunk read from `stream` at `offset`.
+
+    The row is locked for the duration so two requests for the same upload
+    cannot interleave. A chunk whose checksum does not match is discarded
+    and the offset stays where it was.
+    """
+    checksum = _parse_checksum(checksum_header)
+    with transaction.atomic():
+        upload = active_uploads(user).select_for_update().filter(pk=upload_id).first()
+        if upload is None:
+            raise UploadError('الرفع غير موجود أو انتهت صلاحيته', status=404)
+        if upload.is_complete:
+            raise UploadError('اكتمل الرفع مسبقاً', status=409)
+        if offset != upload.offset:
+            raise UploadError('Upload-Offset لا يطابق ما تم استلامه', status=409)
+        if offset == 0:
+            # Refuse non-audio before storing anything
+            head = stream.read(64)
+            if len(head) >= min(upload.length, 64) and sniff_format(head) is None:
+                raise UploadError('صيغة الملف غير معروفة، يرجى رفع ملف صوتي', status=415)
+            stream = _Prefixed(head, stream)
+
+        digest = CHECKSUM_ALGORITHMS[checksum[0]]() if checksum else None
+        remaining = upload.length - upload.offset
+        written = 0
+        with open(part_path(upload), 'r+b') as part:
+            part.seek(upload.offset)
+            while written <= remaining:
+                block = stream.read(min(64 * 1024, remaining - written + 1))
+                if not block:
+                    break
+                written += len(block)
+                if written > remaining:
+                    part.truncate(upload.offset)
+                    raise UploadError('الجزء يتجاوز الحجم المعلن', status=413)
+                part.write(block)
+                if digest:
+                    digest.update(block)
+
+            if digest and digest.digest() != checksum[1]:
+                part.truncate(upload.offset)
+                # 460 Checksum Mismatch (tus checksum extension)
+                raise UploadError('بصمة الجزء غير مطابقة', status=460)
+            part.truncate(upload.offset + written)
+
+        upload.offset += written
+        upload.expires_at = timezone.now() + EXPIRY
+        corrupt = upload.offset == upload.length and not _finish(upload)
+        upload.save()
+
+    if corrupt:
+        raise UploadError('بصمة الملف غير مطابقة، أعد الرفع', status=460)
+    return upload
+
+
+def _finish(upload):
+    """
+    Verify the assembled file against the SHA-256 announced at creation.
+
+    On a mismatch the file is emptied and the offset reset so the client
+    starts over rather than keeping bad bytes. Returns False in that case.
+    """
+    digest = hashlib.sha256()
+    with open(part_path(upload), 'rb') as part:
+        for block in iter(lambda: part.read(64 * 1024), b''):
+            digest.update(block)
+    if upload.sha256 and digest.hexdigest() != upload.sha256:
+        open(part_path(upload), 'wb').close()
+        upload.offset = 0
+        return False
+    upload.sha256 = digest.hexdigest()
+    upload.completed_at = timezone.now()
+    return True
+
+
+def probe(upload):
+    """Probe the assembled file; raises AudioProbeError if it is unusable."""
+    with open(part_path(upload), 'rb') as part:
+        return probe_stream(part, **audio_limits())
+
+
+class _Prefixed:
+    """A stream that yields `head` before the rest of `stream`."""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size):
+        if self.head:
+            data, self.head = self.head[:size], self.head[size:]
+            return data
+        return self.stream.read(size)
+
+
+def terminate(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def attach(upload, inquiry):
+    """
+    Copy a completed upload into inquiry.question_audio (not saved).
+    Call terminate() once the inquiry itself has been saved.
+    """
+    with open(part_path(upload), 'rb') as part:
+        inquiry.question_audio.save(upload.filename, File(part), save=False)
+
+
+def purge_expired():
+    """Delete expired uploads and their partial files; returns how many."""
+    expired = list(AudioUpload.objects.filter(expires_at__lte=timezone.now()))
+    for upload in expired:
+        terminate(upload)
+    return len(expired)
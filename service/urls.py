@@ -7,15 +7,26 @@ app_name = 'service'
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('stats/', views.dashboard_stats, name='dashboard_stats'),
 
     # Inquiries
     path('inquiry/new/', views.inquiry_new, name='inquiry_new'),
+    path('inquiry/bulk/', views.inquiry_bulk, name='inquiry_bulk'),
     path('inquiry/<int:pk>/', views.inquiry_detail, name='inquiry_detail'),
     path('inquiry/<int:pk>/transcribe/', views.inquiry_transcribe, name='inquiry_transcribe'),
     path('inquiry/<int:pk>/answer/', views.inquiry_answer, name='inquiry_answer'),
     path('inquiry/<int:pk>/status/', views.inquiry_update_status, name='inquiry_update_status'),
     path('inquiry/<int:pk>/close/', views.inquiry_close, name='inquiry_close'),
 
+    # Archive of closed inquiries
+    path('archive/', views.archive_list, name='archive_list'),
+    path('archive/<int:pk>/', views.archive_detail, name='archive_detail'),
+
+    # Librarian work queue
+    path('queue/next/', views.queue_next, name='queue_next'),
+    path('queue/<int:pk>/renew/', views.queue_renew, name='queue_renew'),
+    path('queue/<int:pk>/release/', views.queue_release, name='queue_release'),
+
     # Glossary categories
     path('categories/', views.category_list, name='category_list'),
     path('categories/new/', views.category_new, name='category_new'),
@@ -41,4 +52,8 @@ urlpatterns = [
     # STT (Speech-to-Text)
     path('stt/transcribe/', views.stt_transcribe, name='stt_transcribe'),
     path('stt/status/', views.stt_status, name='stt_status'),
+
+    # Resumable uploads (tus)
+    path('uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
 ]
@@ -1,24 +1,32 @@
 import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Case, Count, Q, When
+from django.db.models.functions import Substr
 from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import http_date
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 
 from .forms import (
     AnswerForm,
     GlossaryCategoryForm,
     GlossaryTermForm,
+    InquiryBulkForm,
     InquiryCreateForm,
     InquiryFilterForm,
     TranscribeForm,
 )
-from .models import GlossaryCategory, GlossaryTerm, Inquiry
+from . import bulk, counters, events, read_receipts, search as inquiry_search, stats, stt_jobs, uploads, work_queue
+from .digest import latest_digest
+from .models import ArchivedInquiry, GlossaryCategory, GlossaryTerm, Inquiry, TranscriptionJob
+from .pagination import KeysetPaginator, capped_count
 from .tts_service import get_tts_service, get_audio_url
 
 
@@ -35,39 +43,59 @@ def _is_blind(user) -> bool:
 
 
 def _get_user_stats(user):
-    if _is_librarian(user):
-        return {
-            'total': Inquiry.objects.count(),
-            'pending': Inquiry.objects.filter(status__in=['new', 'transcribed', 'in_progress']).count(),
-            'answered_today': Inquiry.objects.filter(
-                answered_at__date=timezone.now().date()
-            ).count(),
-            'my_answers': Inquiry.objects.filter(answered_by=user).count(),
-        }
-    else:
-        user_inquiries = Inquiry.objects.filter(created_by=user)
-        return {
-            'total': user_inquiries.count(),
-            'pending': user_inquiries.filter(status__in=['new', 'transcribed', 'in_progress']).count(),
-            'answered': user_inquiries.filter(status='answered').count(),
-            'unread': user_inquiries.filter(status='answered', is_read_by_user=False).count(),
-        }
+    return stats.user_stats(user, librarian=_is_librarian(user))
 
 
 # ============================================
 # Inquiry views
 # ============================================
 
+# Columns the inquiry list renders; the long texts stay in the database
+INQUIRY_LIST_FIELDS = (
+    'title', 'status', 'priority', 'created_at', 'is_read_by_user', 'question_audio', 'created_by',
+)
+ARCHIVE_LIST_FIELDS = ('title', 'status', 'priority', 'created_at', 'question_audio', 'created_by')
+OWNER_LIST_FIELDS = tuple(
+    f'created_by__{name}' for name in ('username', 'first_name', 'last_name', 'full_name_ar')
+)
+PREVIEW_CHARS = 200
+
+
+def _inquiry_total(user, librarian, status):
+    """Size of the unfiltered (or status-filtered) list, from the counters."""
+    scope = counters.GLOBAL if librarian else counters.user_scope(user.pk)
+    row = counters.get_counters([scope])[scope]
+    return getattr(row, counters.STATUS_FIELDS[status]) if status else row.total
+
+
+def _page_query(request):
+    """The current query string without the pagination cursors."""
+    params = request.GET.copy()
+    for name in ('page', 'after', 'before'):
+        params.pop(name, None)
+    return params.urlencode()
+
+
 @login_required
 def dashboard(request):
     user = request.user
+    is_librarian = _is_librarian(user)
     filter_form = InquiryFilterForm(request.GET)
-
-    if _is_librarian(user):
-        inquiries = Inquiry.objects.select_related('created_by', 'answered_by').all()
+    # Before reading the page, so the live feed replays anything newer
+    last_event_id = events.latest_id()
+
+    inquiries = Inquiry.objects.only(*INQUIRY_LIST_FIELDS).annotate(
+        preview=Substr(
+            Case(When(~Q(transcription_text=''), then='transcription_text'), default='question_text'),
+            1, PREVIEW_CHARS,
+        ),
+    )
+    if is_librarian:
+        inquiries = inquiries.select_related('created_by').only(*INQUIRY_LIST_FIELDS, *OWNER_LIST_FIELDS)
     else:
-        inquiries = Inquiry.objects.filter(created_by=user)
+        inquiries = inquiries.filter(created_by=user)
 
+    search = status = priority = ''
     if filter_form.is_valid():
         status = filter_form.cleaned_data.get('status')
         priority = filter_form.cleaned_data.get('priority')
@@ -77,30 +105,54 @@ def dashboard(request):
             inquiries = inquiries.filter(status=status)
         if priority:
             inquiries = inquiries.filter(priority=priority)
-        if search:
-            inquiries = inquiries.filter(
-                Q(title__icontains=search) |
-                Q(question_text__icontains=search) |
-                Q(transcription_text__icontains=search)
-            )
 
-    inquiries = inquiries.order_by('-created_at')
+    if search:
+        # Ranked by relevance (see search.py)
+        inquiries = inquiry_search.search(inquiries, search)
+    else:
+        inquiries = inquiries.order_by('-created_at', '-pk')
+
+    # Keyset pages cost the same at any depth (see pagination.py)
+    paginator = KeysetPaginator(inquiries, 10)
+    inquiries_page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+    if not is_librarian:
+        read_receipts.overlay(inquiries_page)
 
-    paginator = Paginator(inquiries, 10)
-    page = request.GET.get('page', 1)
-    inquiries_page = paginator.get_page(page)
+    if search:
+        snippets = inquiry_search.snippets([i.pk for i in inquiries_page], search)
+        for inquiry in inquiries_page:
+            inquiry.search_snippet = snippets.get(inquiry.pk)
+
+    cap = settings.DASHBOARD_COUNT_CAP
+    if search or priority:
+        total, total_exact = capped_count(inquiries, cap) if cap else (None, False)
+    else:
+        total, total_exact = _inquiry_total(user, is_librarian, status), True
 
     stats = _get_user_stats(user)
 
     context = {
         'inquiries': inquiries_page,
+        'total': total,
+        'total_exact': total_exact,
+        'page_query': _page_query(request),
         'filter_form': filter_form,
         'stats': stats,
-        'is_librarian': _is_librarian(user),
+        'is_librarian': is_librarian,
+        'digest': latest_digest(user) if stats.get('unread') else None,
+        'last_event_id': last_event_id,
     }
     return render(request, 'service/dashboard.html', context)
 
 
+@login_required
+@require_GET
+def dashboard_stats(request):
+    """Dashboard figures as JSON, refetched by the page on live events."""
+    return JsonResponse(_get_user_stats(request.user))
+
+
 @login_required
 def inquiry_new(request):
     if not _is_blind(request.user) and not _is_librarian(request.user):
@@ -108,50 +160,83 @@ def inquiry_new(request):
         return HttpResponseForbidden()
 
     if request.method == 'POST':
-        form = InquiryCreateForm(request.POST, request.FILES)
+        form = InquiryCreateForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             inquiry = form.save(commit=False)
             inquiry.created_by = request.user
+            if form.upload:
+                uploads.attach(form.upload, inquiry)
 
             if inquiry.question_text.strip():
                 inquiry.status = Inquiry.Status.TRANSCRIBED
                 inquiry.transcription_text = inquiry.question_text.strip()
 
-            inquiry.save()
+            with transaction.atomic():
+                inquiry.save()
+            if form.upload:
+                uploads.terminate(form.upload)
+
+            if settings.STT_AUTO_TRANSCRIBE and stt_jobs.needs_transcription(inquiry):
+                stt_jobs.enqueue(inquiry)
+
             messages.success(request, 'تم إرسال استفسارك بنجاح')
             return redirect('service:inquiry_detail', pk=inquiry.pk)
     else:
-        form = InquiryCreateForm()
+        form = InquiryCreateForm(user=request.user)
 
     return render(request, 'service/inquiry_new.html', {'form': form})
 
 
 @login_required
 def inquiry_detail(request, pk: int):
-    inquiry = get_object_or_404(
-        Inquiry.objects.select_related('created_by', 'answered_by'),
-        pk=pk
-    )
+    inquiry = Inquiry.objects.select_related('created_by', 'answered_by').filter(pk=pk).first()
+    if inquiry is None:
+        # Old links keep working once an inquiry has been archived
+        get_object_or_404(ArchivedInquiry.objects.only('pk'), pk=pk)
+        return redirect('service:archive_detail', pk=pk)
 
     is_librarian = _is_librarian(request.user)
     if not is_librarian and inquiry.created_by != request.user:
         messages.error(request, 'ليس لديك صلاحية لعرض هذا الاستفسار.')
         return HttpResponseForbidden()
 
-    if is_librarian and not inquiry.is_read_by_librarian:
-        inquiry.is_read_by_librarian = True
-        inquiry.save(update_fields=['is_read_by_librarian'])
-    elif not is_librarian and not inquiry.is_read_by_user and inquiry.status == Inquiry.Status.ANSWERED:
-        inquiry.is_read_by_user = True
-        inquiry.save(update_fields=['is_read_by_user'])
+    # Buffered and written in batches, so viewing stays write-free
+    read_receipts.overlay([inquiry])
+    read_receipts.mark_read(inquiry, librarian=is_librarian)
 
     context = {
         'inquiry': inquiry,
         'is_librarian': is_librarian,
+        'transcription_job': TranscriptionJob.objects.filter(inquiry=inquiry).first(),
     }
+    if is_librarian:
+        claim = work_queue.holder(inquiry)
+        context['claim'] = claim
+        if claim and claim.claimed_by_id == request.user.pk:
+            # Lets the browser fetch the next recording while this one is handled
+            context['following'] = work_queue.peek(after=inquiry.pk)
     return render(request, 'service/inquiry_detail.html', context)
 
 
+def _claim_or_redirect(request, inquiry):
+    """
+    Claim `inquiry` for the requesting librarian (see work_queue.py).
+    Returns a redirect to the detail page if someone else holds it.
+    """
+    claimed, claim = work_queue.claim(inquiry, request.user)
+    if claimed:
+        return None
+    if claim is None:
+        messages.warning(request, 'يعمل أخصائي آخر على هذا الاستفسار الآن. حاول مرة أخرى بعد قليل.')
+    else:
+        messages.warning(
+            request,
+            f'يعمل {claim.claimed_by.get_display_name()} على هذا الاستفسار '
+            f'حتى {timezone.localtime(claim.expires_at):%H:%M}.',
+        )
+    return redirect('service:inquiry_detail', pk=inquiry.pk)
+
+
 @login_required
 def inquiry_transcribe(request, pk: int):
     inquiry = get_object_or_404(Inquiry, pk=pk)
@@ -160,12 +245,17 @@ def inquiry_transcribe(request, pk: int):
         messages.error(request, 'فقط أخصائيي المكتبة يمكنهم تفريغ الأسئلة.')
         return HttpResponseForbidden()
 
+    held_elsewhere = _claim_or_redirect(request, inquiry)
+    if held_elsewhere:
+        return held_elsewhere
+
     if request.method == 'POST':
         form = TranscribeForm(request.POST, instance=inquiry)
         if form.is_valid():
             obj = form.save(commit=False)
             obj.status = Inquiry.Status.TRANSCRIBED
-            obj.save()
+            with transaction.atomic():
+                obj.save()
             messages.success(request, 'تم حفظ التفريغ بنجاح')
             return redirect('service:inquiry_detail', pk=pk)
     else:
@@ -174,10 +264,16 @@ def inquiry_transcribe(request, pk: int):
     context = {
         'form': form,
         'inquiry': inquiry,
+        'transcription_job': TranscriptionJob.objects.filter(inquiry=inquiry).first(),
+        'lease_seconds': work_queue.LEASE_SECONDS,
     }
     return render(request, 'service/inquiry_transcribe.html', context)
 
 
+def _version(updated_at):
+    return str(updated_at.timestamp())
+
+
 @login_required
 def inquiry_answer(request, pk: int):
     inquiry = get_object_or_404(Inquiry, pk=pk)
@@ -190,23 +286,37 @@ def inquiry_answer(request, pk: int):
         messages.warning(request, 'يرجى تفريغ السؤال الصوتي أولاً.')
         return redirect('service:inquiry_transcribe', pk=pk)
 
+    held_elsewhere = _claim_or_redirect(request, inquiry)
+    if held_elsewhere:
+        return held_elsewhere
+
     if request.method == 'POST':
         form = AnswerForm(request.POST, instance=inquiry)
         if form.is_valid():
-            obj = form.save(commit=False)
-            obj.answered_by = request.user
-            obj.answered_at = timezone.now()
-            obj.status = Inquiry.Status.ANSWERED
-            obj.is_read_by_user = False
-            obj.save()
-            messages.success(request, 'تم إرسال الإجابة بنجاح')
-            return redirect('service:inquiry_detail', pk=pk)
+            with transaction.atomic():
+                # Refuse to overwrite a change made since the form was loaded
+                current = Inquiry.objects.select_for_update().values_list('updated_at', flat=True).get(pk=pk)
+                if request.POST.get('version') != _version(current):
+                    form.add_error(None, 'تم تعديل هذا الاستفسار أثناء كتابتك. راجع الإجابة الحالية ثم أعد الإرسال.')
+                else:
+                    obj = form.save(commit=False)
+                    obj.answered_by = request.user
+                    obj.answered_at = timezone.now()
+                    obj.status = Inquiry.Status.ANSWERED
+                    obj.is_read_by_user = False
+                    obj.save()
+            if not form.errors:
+                messages.success(request, 'تم إرسال الإجابة بنجاح')
+                return redirect('service:inquiry_detail', pk=pk)
+            inquiry.refresh_from_db()
     else:
         form = AnswerForm(instance=inquiry)
 
     context = {
         'form': form,
         'inquiry': inquiry,
+        'version': _version(inquiry.updated_at),
+        'lease_seconds': work_queue.LEASE_SECONDS,
     }
     return render(request, 'service/inquiry_answer.html', context)
 
@@ -222,7 +332,8 @@ def inquiry_update_status(request, pk: int):
     new_status = request.POST.get('status')
     if new_status in dict(Inquiry.Status.choices):
         inquiry.status = new_status
-        inquiry.save(update_fields=['status', 'updated_at'])
+        with transaction.atomic():
+            inquiry.save(update_fields=['status', 'updated_at'])
         return JsonResponse({
             'success': True,
             'status': new_status,
@@ -241,13 +352,201 @@ def inquiry_close(request, pk: int):
 
     if request.method == 'POST':
         inquiry.status = Inquiry.Status.CLOSED
-        inquiry.save(update_fields=['status', 'updated_at'])
+        with transaction.atomic():
+            inquiry.save(update_fields=['status', 'updated_at'])
         messages.success(request, 'تم إغلاق الاستفسار.')
         return redirect('service:dashboard')
 
     return render(request, 'service/inquiry_close.html', {'inquiry': inquiry})
 
 
+def _bulk_targets(cleaned):
+    inquiries = Inquiry.objects.all()
+    if cleaned['ids']:
+        inquiries = inquiries.filter(pk__in=cleaned['ids'])
+    if cleaned['filter_status']:
+        inquiries = inquiries.filter(status=cleaned['filter_status'])
+    if cleaned['filter_priority']:
+        inquiries = inquiries.filter(priority=cleaned['filter_priority'])
+    if cleaned['created_after']:
+        inquiries = inquiries.filter(created_at__gte=counters.day_start(cleaned['created_after']))
+    if cleaned['created_before']:
+        inquiries = inquiries.filter(created_at__lt=counters.day_start(cleaned['created_before']))
+    if cleaned['search']:
+        inquiries = inquiry_search.search(inquiries, cleaned['search'])
+    return inquiries
+
+
+@login_required
+@require_POST
+def inquiry_bulk(request):
+    """
+    Apply one operation to many inquiries (see bulk.py): those listed in
+    `ids`, or those matching the filters. JSON or form body, e.g.
+
+        {"action": "close", "filter": {"status": "answered", "created_before": "2026-07-01"}}
+        {"action": "priority", "priority": "urgent", "ids": [12, 15]}
+        {"action": "reassign", "librarian": 4, "ids": [12, 15]}
+    """
+    if not _is_librarian(request.user):
+        return JsonResponse({'error': 'غير مصرح'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError
+    except (json.JSONDecodeError, ValueError):
+        data = request.POST.dict()
+        data['ids'] = ','.join(request.POST.getlist('ids'))
+    else:
+        # {"filter": {"status": ...}} names the form's filter_status, and so on
+        for name, value in (data.pop('filter', None) or {}).items():
+            data[f'filter_{name}' if name in ('status', 'priority') else name] = value
+        if isinstance(data.get('ids'), list):
+            data['ids'] = ','.join(str(pk) for pk in data['ids'])
+
+    form = InquiryBulkForm(data)
+    if not form.is_valid():
+        return JsonResponse({'error': 'طلب غير صالح', 'errors': form.errors}, status=400)
+
+    inquiries = _bulk_targets(form.cleaned_data)
+    limit = settings.BULK_MAX_INQUIRIES
+    _, within_limit = capped_count(inquiries, limit)
+    if not within_limit:
+        return JsonResponse({'error': f'العملية تشمل أكثر من {limit} استفسار، يرجى تضييق التصفية.'}, status=400)
+
+    results = bulk.run(
+        form.cleaned_data['action'], inquiries, form.value(),
+        user=request.user, ids=form.cleaned_data['ids'] or None,
+    )
+    return JsonResponse({'success': True, 'summary': bulk.summary(results), 'results': results})
+
+
+# ============================================
+# Archive of closed inquiries (see archive.py)
+# ============================================
+
+@login_required
+def archive_list(request):
+    is_librarian = _is_librarian(request.user)
+    search = request.GET.get('search', '').strip()
+
+    inquiries = ArchivedInquiry.objects.only(*ARCHIVE_LIST_FIELDS).annotate(
+        preview=Substr(
+            Case(When(~Q(transcription_text=''), then='transcription_text'), default='question_text'),
+            1, PREVIEW_CHARS,
+        ),
+    )
+    if is_librarian:
+        inquiries = inquiries.select_related('created_by').only(*ARCHIVE_LIST_FIELDS, *OWNER_LIST_FIELDS)
+    else:
+        inquiries = inquiries.filter(created_by=request.user)
+
+    if search:
+        inquiries = inquiry_search.search(inquiries, search)
+    else:
+        inquiries = inquiries.order_by('-created_at', '-pk')
+
+    paginator = KeysetPaginator(inquiries, 10)
+    inquiries_page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    if search:
+        snippets = inquiry_search.snippets([i.pk for i in inquiries_page], search, ArchivedInquiry)
+        for inquiry in inquiries_page:
+            inquiry.search_snippet = snippets.get(inquiry.pk)
+
+    context = {
+        'inquiries': inquiries_page,
+        'page_query': _page_query(request),
+        'search': search,
+        'is_librarian': is_librarian,
+    }
+    return render(request, 'service/archive_list.html', context)
+
+
+@login_required
+def archive_detail(request, pk: int):
+    inquiry = get_object_or_404(
+        ArchivedInquiry.objects.select_related('created_by', 'answered_by'),
+        pk=pk
+    )
+
+    is_librarian = _is_librarian(request.user)
+    if not is_librarian and inquiry.created_by != request.user:
+        messages.error(request, 'ليس لديك صلاحية لعرض هذا الاستفسار.')
+        return HttpResponseForbidden()
+
+    return render(request, 'service/archive_detail.html', {'inquiry': inquiry, 'is_librarian': is_librarian})
+
+
+# ============================================
+# Librarian work queue (see work_queue.py)
+# ============================================
+
+def _queue_item(inquiry):
+    return {
+        'id': inquiry.pk,
+        'title': inquiry.title,
+        'status': inquiry.status,
+        'priority': inquiry.priority,
+        'created_at': inquiry.created_at.isoformat(),
+        'question_text': inquiry.question_text,
+        'transcription_text': inquiry.transcription_text,
+        'audio_url': inquiry.question_audio.url if inquiry.question_audio else None,
+        'url': reverse('service:inquiry_detail', args=[inquiry.pk]),
+    }
+
+
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
+
+
+@login_required
+@require_POST
+def queue_next(request):
+    """Claim the next inquiry in the queue, releasing the current one."""
+    if not _is_librarian(request.user):
+        return HttpResponseForbidden()
+
+    claim = work_queue.claim_next(request.user)
+    if claim is None:
+        if _wants_json(request):
+            return JsonResponse({'inquiry': None})
+        messages.info(request, 'لا توجد استفسارات بانتظار المعالجة.')
+        return redirect('service:dashboard')
+
+    if _wants_json(request):
+        following = work_queue.peek(after=claim.inquiry_id)
+        return JsonResponse({
+            'inquiry': _queue_item(claim.inquiry),
+            'expires_at': claim.expires_at.isoformat(),
+            # Shown straight away by the next call if still unclaimed by then
+            'following': _queue_item(following) if following else None,
+        })
+    return redirect('service:inquiry_detail', pk=claim.inquiry_id)
+
+
+@login_required
+@require_POST
+def queue_renew(request, pk: int):
+    if not _is_librarian(request.user):
+        return HttpResponseForbidden()
+    expires_at = work_queue.renew(pk, request.user)
+    if expires_at is None:
+        return JsonResponse({'error': 'انتهى الحجز أو انتقل إلى أخصائي آخر'}, status=409)
+    return JsonResponse({'expires_at': expires_at.isoformat()})
+
+
+@login_required
+@require_POST
+def queue_release(request, pk: int):
+    if not _is_librarian(request.user):
+        return HttpResponseForbidden()
+    released = work_queue.release(pk, request.user)
+    if _wants_json(request):
+        return JsonResponse({'released': released})
+    return redirect('service:dashboard')
+
+
 # ============================================
 # Glossary term views
 # ============================================
@@ -256,17 +555,20 @@ def glossary_list(request):
     q = request.GET.get('q', '').strip()
     cat_id = request.GET.get('category', '').strip()
 
-    terms = GlossaryTerm.objects.select_related('category').all()
+    terms = GlossaryTerm.objects.select_related('category').only(
+        'term', 'view_count', 'tts_play_count', 'category__name', 'category__icon',
+    ).annotate(
+        definition_preview=Substr('definition', 1, PREVIEW_CHARS),
+    )
     if q:
         terms = terms.filter(
             Q(term__icontains=q) | Q(definition__icontains=q)
         )
-    if cat_id:
+    if cat_id.isdigit():
         terms = terms.filter(category_id=cat_id)
 
-    paginator = Paginator(terms, 20)
-    page = request.GET.get('page', 1)
-    terms_page = paginator.get_page(page)
+    paginator = KeysetPaginator(terms, 20, ordering=('term', 'pk'))
+    terms_page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
 
     categories = GlossaryCategory.objects.annotate(
         num_terms=Count('terms')
@@ -274,6 +576,7 @@ def glossary_list(request):
 
     context = {
         'terms': terms_page,
+        'page_query': _page_query(request),
         'q': q,
         'categories': categories,
         'selected_category': cat_id,
@@ -456,7 +759,7 @@ def tts_synthesize(request):
             }, status=400)
 
         tts = get_tts_service()
-        audio_path = tts.synthesize(text, voice, speed)
+        audio_path, tier = tts.synthesize_with_tier(text, voice, speed)
         audio_url = get_audio_url(audio_path)
 
         return JsonResponse({
@@ -464,6 +767,7 @@ def tts_synthesize(request):
             'audio_url': audio_url,
             'voice': voice,
             'speed': speed,
+            'quality': tier,
         })
 
     except Exception as e:
@@ -516,9 +820,9 @@ def tts_inquiry_answer(request, pk: int):
 
     try:
         tts = get_tts_service()
-        audio_path = tts.synthesize(inquiry.answer_text, voice)
+        audio_path, tier = tts.synthesize_with_tier(inquiry.answer_text, voice)
         audio_url = get_audio_url(audio_path)
-        return JsonResponse({'success': True, 'audio_url': audio_url})
+        return JsonResponse({'success': True, 'audio_url': audio_url, 'quality': tier})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
@@ -543,7 +847,7 @@ def tts_glossary_term(request, pk: int):
 
     try:
         tts = get_tts_service()
-        audio_path = tts.synthesize(text, voice)
+        audio_path, tier = tts.synthesize_with_tier(text, voice)
         audio_url = get_audio_url(audio_path)
 
         term.tts_play_count = (term.tts_play_count or 0) + 1
@@ -552,7 +856,8 @@ def tts_glossary_term(request, pk: int):
         return JsonResponse({
             'success': True,
             'audio_url': audio_url,
-            'play_count': term.tts_play_count
+            'play_count': term.tts_play_count,
+            'quality': tier,
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -571,7 +876,7 @@ def stt_transcribe(request):
     Content-Type: multipart/form-data
 
     Parameters:
-        audio: Audio file (WAV format preferred)
+        audio: Audio file (WAV, or webm/ogg/m4a/mp3 when ffmpeg is installed)
         language: Language code (ar-SA, en-US). Default: ar-SA
     """
     from .stt_service import get_stt_service
@@ -583,6 +888,10 @@ def stt_transcribe(request):
             'error': 'الملف الصوتي مطلوب'
         }, status=400)
 
+    # Probed while streaming in by AudioUploadHandler
+    if getattr(audio_file, 'audio_error', None):
+        return JsonResponse({'success': False, 'error': audio_file.audio_error}, status=400)
+
     language = request.POST.get('language', 'ar-SA')
 
     stt = get_stt_service()
@@ -592,6 +901,13 @@ def stt_transcribe(request):
             'error': 'خدمة التعرف على الصوت غير متاحة حالياً. استخدم الإملاء الصوتي عبر المتصفح.'
         }, status=503)
 
+    info = getattr(audio_file, 'audio_info', None)
+    if info and info['format'] not in stt.get_status()['formats']:
+        return JsonResponse({
+            'success': False,
+            'error': f'صيغة {info["format"]} غير مدعومة للتفريغ على هذا الخادم. استخدم WAV.'
+        }, status=415)
+
     result = stt.transcribe_audio_file(audio_file, language)
     status_code = 200 if result['success'] else 422
     return JsonResponse(result, status=status_code)
@@ -604,3 +920,104 @@ def stt_status(request):
 
     stt = get_stt_service()
     return JsonResponse(stt.get_status())
+
+
+# ============================================
+# Resumable uploads (tus protocol, see uploads.py)
+# ============================================
+
+def _tus_response(status=204, **headers):
+    response = HttpResponse(status=status)
+    response['Tus-Resumable'] = uploads.TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _tus_error(error):
+    response = _tus_response(status=error.status)
+    response.content = str(error).encode()
+    response['Content-Type'] = 'text/plain; charset=utf-8'
+    return response
+
+
+def _upload_headers(upload):
+    return {
+        'Upload_Offset': str(upload.offset),
+        'Upload_Length': str(upload.length),
+        'Upload_Expires': http_date(upload.expires_at.timestamp()),
+    }
+
+
+@login_required
+@require_http_methods(['POST', 'OPTIONS'])
+def upload_create(request):
+    """
+    Create a resumable upload.
+
+    POST /service/uploads/
+    Headers:
+        Upload-Length: total size in bytes
+        Upload-Metadata: filename <base64>[,sha256 <base64 of hex digest>]
+
+    Returns 201 with the upload URL in Location.
+    """
+    if request.method == 'OPTIONS':
+        return _tus_response(
+            Tus_Version=uploads.TUS_VERSION,
+            Tus_Extension=uploads.TUS_EXTENSIONS,
+            Tus_Max_Size=str(uploads.MAX_BYTES),
+            Tus_Checksum_Algorithm=','.join(uploads.CHECKSUM_ALGORITHMS),
+        )
+
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        return _tus_error(uploads.UploadError('Upload-Length مطلوب'))
+
+    try:
+        metadata = uploads.parse_metadata(request.headers.get('Upload-Metadata'))
+        upload = uploads.create(request.user, length, metadata)
+    except uploads.UploadError as e:
+        return _tus_error(e)
+
+    return _tus_response(
+        status=201,
+        Location=request.build_absolute_uri(f'{upload.pk}/'),
+        **_upload_headers(upload),
+    )
+
+
+@login_required
+@require_http_methods(['HEAD', 'PATCH', 'PUT', 'DELETE'])
+def upload_detail(request, upload_id):
+    """
+    HEAD   -> current Upload-Offset, to resume after a drop
+    PATCH  -> append a chunk (PUT is accepted too); headers Upload-Offset
+              and optionally Upload-Checksum: <sha1|sha256|md5> <base64>
+    DELETE -> abandon the upload
+    """
+    if request.method in ('PATCH', 'PUT'):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return _tus_error(uploads.UploadError('Upload-Offset مطلوب'))
+        try:
+            upload = uploads.append(
+                upload_id, request.user, offset, request,
+                request.headers.get('Upload-Checksum'),
+            )
+        except uploads.UploadError as e:
+            return _tus_error(e)
+        return _tus_response(**_upload_headers(upload))
+
+    upload = uploads.active_uploads(request.user).filter(pk=upload_id).first()
+    if upload is None:
+        return _tus_response(status=404)
+
+    if request.method == 'DELETE':
+        uploads.terminate(upload)
+        return _tus_response()
+
+    return _tus_response(status=200, **_upload_headers(upload))
@@ -0,0 +1,222 @@
+"""
+Librarian work queue.
+
+Open inquiries (new, transcribed, in progress) are served urgent first,
+then high, normal and low priority, oldest first within a priority. A
+librarian takes the next one with `claim_next()`, which gives them an
+InquiryClaim lease of QUEUE_LEASE_SECONDS. While the lease runs no other
+librarian is handed that inquiry or can transcribe or answer it. Working
+on it renews the lease. An expired lease returns the inquiry to the
+queue, so nothing stays stuck when a librarian walks away.
+
+Claiming is a single transaction. On databases with SKIP LOCKED
+(PostgreSQL, MySQL) concurrent claims lock different candidate rows
+instead of queueing behind each other. Everywhere else the unique
+InquiryClaim row decides: the loser of a race gets an IntegrityError and
+moves on to the next candidate.
+
+Staff can also assign inquiries to a librarian (`assign()`, used by the
+bulk operations): a claim held for QUEUE_ASSIGN_SECONDS instead of the
+lease. `claim_next()` serves a librarian's assignments before the general
+queue, turning each into an ordinary lease as it is served.
+
+Claims end when the inquiry leaves the open statuses (see
+`inquiry_saved`) or when the librarian releases them.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, DateTimeField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Inquiry, InquiryClaim
+
+LEASE_SECONDS = getattr(settings, 'QUEUE_LEASE_SECONDS', 600)
+ASSIGN_SECONDS = getattr(settings, 'QUEUE_ASSIGN_SECONDS', 8 * 3600)
+
+OPEN_STATUSES = (Inquiry.Status.NEW, Inquiry.Status.TRANSCRIBED, Inquiry.Status.IN_PROGRESS)
+
+PRIORITY_RANK = Case(
+    When(priority=Inquiry.Priority.URGENT, then=Value(0)),
+    When(priority=Inquiry.Priority.HIGH, then=Value(1)),
+    When(priority=Inquiry.Priority.NORMAL, then=Value(2)),
+    default=Value(3),
+    output_field=IntegerField(),
+)
+
+# Candidates locked and tried per claim attempt
+_BATCH = 5
+
+
+def _lease_end(now, seconds=LEASE_SECONDS):
+    return now + timedelta(seconds=seconds)
+
+
+def available(now=None, exclude=()):
+    """Open inquiries nobody holds a live claim on, in queue order."""
+    now = now or timezone.now()
+    return (
+        Inquiry.objects.filter(status__in=OPEN_STATUSES)
+        .exclude(claim__expires_at__gt=now)
+        .exclude(pk__in=exclude)
+        .annotate(priority_rank=PRIORITY_RANK)
+        .order_by('priority_rank', 'created_at', 'pk')
+    )
+
+
+def _take(inquiry_id, user, now):
+    """Claim `inquiry_id` for `user` unless someone else holds a live claim."""
+    # Taking over the user's own assignment never cuts it short
+    expires_at = Greatest(F('expires_at'), Value(_lease_end(now), output_field=DateTimeField()))
+    taken = InquiryClaim.objects.filter(inquiry_id=inquiry_id).filter(
+        Q(expires_at__lte=now) | Q(claimed_by=user),
+    ).update(claimed_by=user, claimed_at=now, expires_at=expires_at, assigned_by=None)
+    if taken:
+        return True
+    try:
+        with transaction.atomic():
+            InquiryClaim.objects.create(
+                inquiry_id=inquiry_id, claimed_by=user, claimed_at=now, expires_at=_lease_end(now),
+            )
+    except IntegrityError:
+        # A live claim by someone else, or a race we lost
+        return False
+    return True
+
+
+def _serve_assigned(user, now):
+    """Turn `user`'s next assignment into an ordinary lease. Returns its inquiry id."""
+    inquiry_id = (
+        Inquiry.objects.filter(
+            claim__claimed_by=user, claim__assigned_by__isnull=False, claim__expires_at__gt=now,
+        )
+        .annotate(priority_rank=PRIORITY_RANK)
+        .order_by('priority_rank', 'created_at', 'pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if inquiry_id is None:
+        return None
+    served = InquiryClaim.objects.filter(inquiry_id=inquiry_id, claimed_by=user).update(
+        assigned_by=None, claimed_at=now, expires_at=_lease_end(now),
+    )
+    return inquiry_id if served else None
+
+
+def claim_next(user):
+    """
+    Release `user`'s current claim and claim the next inquiry: their next
+    assignment, else the next in the queue. Returns the InquiryClaim, or
+    None when there is nothing left.
+    """
+    now = timezone.now()
+    release_all(user)
+    inquiry_id = _serve_assigned(user, now)
+    if inquiry_id is not None:
+        return InquiryClaim.objects.select_related('inquiry').get(inquiry_id=inquiry_id)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    tried = []
+    while True:
+        with transaction.atomic():
+            candidates = available(now, exclude=tried).values_list('pk', flat=True)
+            if skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True, of=('self',))
+            batch = list(candidates[:_BATCH])
+            if not batch:
+                return None
+            for inquiry_id in batch:
+                if _take(inquiry_id, user, now):
+                    return InquiryClaim.objects.select_related('inquiry').get(inquiry_id=inquiry_id)
+        tried.extend(batch)
+
+
+def claim(inquiry, user, attempts=3):
+    """
+    Claim (or renew) one inquiry for `user`. Returns (True, claim) on
+    success, or (False, claim) with the other librarian's live claim.
+    The claim is None if it kept changing hands for `attempts` tries.
+    """
+    for _ in range(attempts):
+        now = timezone.now()
+        if _take(inquiry.pk, user, now):
+            return True, InquiryClaim.objects.get(inquiry_id=inquiry.pk)
+        held = InquiryClaim.objects.select_related('claimed_by').filter(inquiry_id=inquiry.pk).first()
+        if held is not None:
+            return False, held
+        # Released between the two queries; try again
+    return False, None
+
+
+def renew(inquiry_id, user):
+    """Extend `user`'s live claim on `inquiry_id`. Returns the new expiry or None."""
+    now = timezone.now()
+    expires_at = _lease_end(now)
+    renewed = InquiryClaim.objects.filter(
+        inquiry_id=inquiry_id, claimed_by=user, expires_at__gt=now,
+    ).update(expires_at=expires_at)
+    return expires_at if renewed else None
+
+
+def release(inquiry_id, user):
+    return InquiryClaim.objects.filter(inquiry_id=inquiry_id, claimed_by=user).delete()[0] > 0
+
+
+def release_all(user):
+    """Release `user`'s claims, except assignments not yet served."""
+    InquiryClaim.objects.filter(claimed_by=user, assigned_by__isnull=True).delete()
+
+
+def assign(inquiry_ids, librarian, assigned_by=None):
+    """
+    Hand the open inquiries `inquiry_ids` to `librarian`, replacing any
+    claims on them. Returns the ids assigned.
+    """
+    now = timezone.now()
+    inquiry_ids = list(
+        Inquiry.objects.filter(pk__in=inquiry_ids, status__in=OPEN_STATUSES).values_list('pk', flat=True)
+    )
+    values = {
+        'claimed_by': librarian,
+        'claimed_at': now,
+        'expires_at': _lease_end(now, ASSIGN_SECONDS),
+        'assigned_by': assigned_by,
+    }
+    with transaction.atomic():
+        InquiryClaim.objects.filter(inquiry_id__in=inquiry_ids).update(**values)
+        InquiryClaim.objects.bulk_create(
+            [InquiryClaim(inquiry_id=pk, **values) for pk in inquiry_ids],
+            ignore_conflicts=True,
+        )
+    return inquiry_ids
+
+
+def release_inquiries(inquiry_ids):
+    """Drop every claim on `inquiry_ids` (e.g. after they were closed in bulk)."""
+    InquiryClaim.objects.filter(inquiry_id__in=inquiry_ids).delete()
+
+
+def holder(inquiry):
+    """The live claim on `inquiry`, or None."""
+    return (
+        InquiryClaim.objects.select_related('claimed_by')
+        .filter(inquiry_id=inquiry.pk, expires_at__gt=timezone.now())
+        .first()
+    )
+
+
+def peek(after=None):
+    """The inquiry next in line after `after` (an id), without claiming it."""
+    return available(exclude=[after] if after else []).first()
+
+
+# --------------------------------------------------
+# Signal receivers (connected in apps.py)
+# --------------------------------------------------
+
+def inquiry_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.status in OPEN_STATUSES or (update_fields and 'status' not in update_fields):
+        return
+    InquiryClaim.objects.filter(inquiry_id=instance.pk).delete()
@@ -0,0 +1,20 @@
+/**
+ * Transcript segments - مقاطع التسجيل
+ * static/js/transcript_segments.js
+ *
+ * Jumps the question audio to a transcript segment
+ * (templates/service/_transcript_segments.html).
+ *
+ *   <audio id="question-audio"></audio>
+ *   <button data-seek="12.5">...</button>
+ */
+
+(function() {
+    document.addEventListener('click', function(e) {
+        const btn = e.target.closest('[data-seek]');
+        const audio = document.getElementById('question-audio');
+        if (!btn || !audio) return;
+        audio.currentTime = parseFloat(btn.dataset.seek) || 0;
+        audio.play();
+    });
+})();
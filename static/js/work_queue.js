@@ -0,0 +1,43 @@
+/**
+ * Librarian work queue - حجز الاستفسارات
+ * static/js/work_queue.js
+ *
+ * Keeps the lease on the inquiry being worked on alive (see
+ * service/work_queue.py) and warns when it has been lost.
+ *
+ *   <div data-lease-renew="/service/queue/7/renew/" data-lease-seconds="600"></div>
+ */
+
+(function() {
+    function csrfToken() {
+        for (let c of document.cookie.split(';')) {
+            c = c.trim();
+            if (c.startsWith('csrftoken=')) return decodeURIComponent(c.substring(10));
+        }
+        return '';
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const el = document.querySelector('[data-lease-renew]');
+        if (!el) return;
+
+        // Renew at half the lease so one failed request does not lose it
+        const interval = Math.max(parseInt(el.dataset.leaseSeconds, 10) || 600, 60) * 500;
+        const timer = setInterval(async function() {
+            try {
+                const res = await fetch(el.dataset.leaseRenew, {
+                    method: 'POST',
+                    headers: {'X-CSRFToken': csrfToken(), 'Accept': 'application/json'},
+                    credentials: 'same-origin'
+                });
+                if (res.status === 409) {
+                    clearInterval(timer);
+                    el.hidden = false;
+                    el.textContent = '⚠ انتهى حجزك لهذا الاستفسار وقد يعمل عليه أخصائي آخر الآن.';
+                }
+            } catch (e) {
+                // Offline for a moment; the next tick retries
+            }
+        }, interval);
+    });
+})();
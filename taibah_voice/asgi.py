@@ -2,4 +2,30 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taibah_voice.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup so the app registry is ready
+from service.dictation import dictation_socket  # noqa: E402
+from service.events import event_stream  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/stt/': dictation_socket,
+}
+
+# Long-lived HTTP responses served outside Django's request cycle
+HTTP_ROUTES = {
+    '/service/events/': event_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    if scope['type'] == 'http' and scope['path'] in HTTP_ROUTES:
+        return await HTTP_ROUTES[scope['path']](scope, receive, send)
+    return await django_application(scope, receive, send)
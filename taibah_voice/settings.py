@@ -78,6 +78,46 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Speech-to-text results keyed by audio content hash; shared by all
+    # worker processes and culled once it holds MAX_ENTRIES results
+    'stt': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'stt',
+        'TIMEOUT': 60 * 60 * 24 * 30,
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Seconds the dashboard statistics are cached (default cache) before one
+# request recomputes them; saving an inquiry invalidates them immediately
+DASHBOARD_STATS_TTL = 30
+
+# Searched or priority-filtered dashboard lists count at most this many
+# matches ("more than N" beyond it); None hides their total
+DASHBOARD_COUNT_CAP = 1000
+
+# Read receipts from opening an inquiry are written in batches this often
+# (service/read_receipts.py); 0 writes each one immediately
+READ_RECEIPT_FLUSH_SECONDS = 5
+
+# Closed inquiries move to the archive table after this many days, this
+# many per transaction (manage.py archive_inquiries; service/archive.py)
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 500
+
+# Most inquiries one bulk operation may change (service/bulk.py)
+BULK_MAX_INQUIRIES = 5000
+
+# Librarians claim inquiries from the work queue for this long; working on
+# one renews the lease, an expired lease returns it to the queue
+QUEUE_LEASE_SECONDS = 600
+# Inquiries assigned to a librarian in bulk are held for them this long
+QUEUE_ASSIGN_SECONDS = 8 * 3600
+
 AUTH_USER_MODEL = 'accounts.User'
 
 LOGIN_URL = 'accounts:login'
@@ -97,6 +137,94 @@ import os
 # Directory for cached TTS audio files
 TTS_OUTPUT_DIR = os.path.join(MEDIA_ROOT, 'tts_audio')
 
+# Serve a fast gTTS draft on a cache miss and upgrade it to the neural voice
+# in the background (requires both edge-tts and gTTS). Off by default.
+TTS_PROGRESSIVE = False
+# A draft superseded by its neural version is kept this long for clients
+# still replaying or downloading it, then pruned
+TTS_DRAFT_GRACE_SECONDS = 3600
+
+# Timeout in seconds for a single request to the speech recognition API
+STT_REQUEST_TIMEOUT = 30
+
+# Speech recognition backends in fallback order (see service/stt_backends.py).
+# 'vosk' runs offline (vosk is in requirements.txt) once STT_VOSK_MODELS names
+# a downloaded model directory per language, e.g.
+# {'ar-SA': BASE_DIR / 'models' / 'vosk-model-ar-mgb2-0.4'}; until then it is
+# skipped and Google has no fallback. 'stub' is a deterministic stand-in.
+# STT_LANGUAGE_BACKENDS overrides the order per language, e.g.
+# {'en-US': ['vosk', 'google']}. A backend failing
+# STT_BACKEND_FAILURE_THRESHOLD times in a row moves to the end of the chain
+# for STT_BACKEND_COOLDOWN_SECONDS.
+STT_BACKENDS = ['google', 'vosk']
+STT_LANGUAGE_BACKENDS = {}
+STT_VOSK_MODELS = {}
+STT_BACKEND_FAILURE_THRESHOLD = 3
+STT_BACKEND_COOLDOWN_SECONDS = 60
+
+# Recordings longer than this are split on silence and the chunks are
+# recognised concurrently by up to STT_CHUNK_WORKERS threads (needs NumPy)
+STT_LONG_AUDIO_SECONDS = 30
+STT_CHUNK_WORKERS = 4
+
+# Streaming dictation (ws://<host>/ws/stt/, needs an ASGI server): a pause of
+# STT_STREAM_MIN_SILENCE_MS ends a segment, the segment in progress is
+# re-recognised every STT_STREAM_PARTIAL_SECONDS, sessions end after
+# STT_STREAM_MAX_SECONDS of audio
+STT_STREAM_MIN_SILENCE_MS = 600
+STT_STREAM_PARTIAL_SECONDS = 1.0
+STT_STREAM_MAX_SECONDS = 300
+
+# Live dashboard updates (/service/events/, Server-Sent Events, needs an
+# ASGI server): each worker process polls for new inquiry events every
+# EVENTS_POLL_SECONDS, streams send a heartbeat every
+# EVENTS_HEARTBEAT_SECONDS, and events are kept EVENTS_RETENTION_SECONDS
+# for clients resuming with Last-Event-ID. Each poll re-reads the last
+# EVENTS_OVERLAP_SECONDS of events, which catches ids committed out of order.
+EVENTS_POLL_SECONDS = 1.0
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETENTION_SECONDS = 3600
+EVENTS_OVERLAP_SECONDS = 5
+
+# Default corpus for `manage.py bench_stt`: audio files each with a .txt
+# reference transcript of the same name (None = pass --corpus)
+STT_BENCH_CORPUS_DIR = None
+
+# Uploads are decoded to trimmed 16 kHz mono WAV in a process pool before
+# recognition. Ogg Opus is decoded in-process when opuslib (requirements.txt)
+# and the system libopus are installed; other formats besides WAV need the
+# ffmpeg binary. The recorder only sends Opus when one of them is available,
+# otherwise it falls back to (much larger) WAV.
+AUDIO_NORMALIZE_WORKERS = 2
+AUDIO_NORMALIZE_TIMEOUT = 120
+FFMPEG_BINARY = 'ffmpeg'
+
+# Transcribe audio-only inquiries in the background and retry failures
+# with exponential backoff (STT_JOB_BACKOFF_SECONDS * 2 ** attempt)
+STT_AUTO_TRANSCRIBE = True
+STT_JOB_MAX_ATTEMPTS = 5
+STT_JOB_BACKOFF_SECONDS = 30
+
+# Audio uploads (question_audio, STT) are streamed through AudioUploadHandler,
+# which sniffs the format and rejects non-audio or over-limit files early
+FILE_UPLOAD_HANDLERS = [
+    'service.upload_handlers.AudioUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+AUDIO_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+AUDIO_UPLOAD_MAX_SECONDS = 600
+
+# Resumable (tus) uploads of question audio: partial files are assembled in
+# RESUMABLE_UPLOAD_DIR and purged by `manage.py purge_expired_uploads` once
+# untouched for RESUMABLE_UPLOAD_EXPIRY_HOURS
+RESUMABLE_UPLOAD_DIR = os.path.join(BASE_DIR, 'cache', 'uploads')
+RESUMABLE_UPLOAD_MAX_BYTES = AUDIO_UPLOAD_MAX_BYTES
+RESUMABLE_UPLOAD_EXPIRY_HOURS = 24
+
+# Threads available for background work (TTS upgrades, STT jobs, ...)
+BACKGROUND_WORKERS = 4
+
 # Directory for voice sample files (male_arabic.wav, female_arabic.wav)
 TTS_VOICES_DIR = os.path.join(BASE_DIR, 'service', 'tts_voices')
 